@@ -4,19 +4,82 @@
 # 'sqlite3' - это встроенная библиотека Python для работы с базами данных SQLite
 import sqlite3
 import os
+import re
+import hashlib
+import json
+import zlib
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
 
 # 2. Определение имени файла базы данных
 DB_NAME = 'hypoo_data.db' # Наша "сокровищница" будет храниться в этом файле
 
-def create_connection():
+# Код страны, подставляемый в телефоны, записанные в национальном формате (например, '050 345 12 72')
+DEFAULT_COUNTRY_CODE = '994'
+
+def normalize_email(email):
+    """
+    Возвращает ключ email-адреса для поиска и проверки уникальности: без пробелов по краям и в нижнем регистре.
+    """
+    return email.strip().lower()
+
+def normalize_phone(phone, default_country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Приводит телефонный номер к формату E.164 ('+994503451272').
+    Номера с префиксом '00' считаются международными, номера с ведущим '0' - национальными
+    (к ним добавляется default_country_code). Если цифр в номере нет, возвращается исходная строка без пробелов.
     """
-    Создает подключение к базе данных SQLite.
+    raw = phone.strip()
+    digits = re.sub(r'\D', '', raw)
+    if not digits:
+        return raw
+    if raw.startswith('+'):
+        return '+' + digits
+    if digits.startswith('00'):
+        return '+' + digits[2:]
+    if digits.startswith('0'):
+        return '+' + default_country_code + digits[1:]
+    return '+' + digits
+
+# Настройки соединений (PRAGMA), применяемые один раз при открытии соединения
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024 # Отображение файла базы в память, в байтах
+DEFAULT_CACHE_SIZE = -64 * 1024 # Отрицательное значение - размер кэша страниц в КиБ (64 МиБ)
+DEFAULT_BUSY_TIMEOUT_MS = 5000 # Сколько ждать блокировку записи, прежде чем вернуть 'database is locked'
+
+def configure_connection(conn, read_only=False, mmap_size=DEFAULT_MMAP_SIZE,
+                         cache_size=DEFAULT_CACHE_SIZE, foreign_keys=False):
+    """
+    Настраивает соединение: WAL-журнал (читатели не блокируются писателем), synchronous=NORMAL,
+    mmap_size, cache_size, busy_timeout и (при foreign_keys=True) проверку внешних ключей.
+    Проверка внешних ключей по умолчанию выключена, как в SQLite: 'treasure_vault' может хранить
+    людей, которых еще нет среди контактов.
+    Режим журнала хранится в самом файле базы, поэтому для соединений только для чтения он не меняется.
+    """
+    if not read_only:
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)};")
+    conn.execute(f"PRAGMA cache_size = {int(cache_size)};")
+    conn.execute(f"PRAGMA busy_timeout = {DEFAULT_BUSY_TIMEOUT_MS};")
+    conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'};")
+    return conn
+
+def create_connection(db_path=DB_NAME, foreign_keys=False):
+    """
+    Создает подключение к базе данных SQLite с настройками SQLite по умолчанию
+    (без WAL; проверка внешних ключей - только при foreign_keys=True).
     Если файл базы данных не существует, он будет создан.
+    Для долгоживущих процессов лучше использовать HypooStore, который открывает соединения один раз
+    и настраивает их через configure_connection.
     """
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME)
-        print(f"Hypoo: Подключение к базе данных '{DB_NAME}' успешно установлено.")
+        conn = sqlite3.connect(db_path)
+        if foreign_keys:
+            conn.execute("PRAGMA foreign_keys = ON;")
+        print(f"Hypoo: Подключение к базе данных '{db_path}' успешно установлено.")
     except sqlite3.Error as e:
         print(f"Hypoo: Ошибка подключения к базе данных: {e}")
     return conn
@@ -36,6 +99,7 @@ def create_tables(conn):
         # is_our_person - главный флаг, определяющий, "наш" ли это человек (0 - нет, 1 - да)
         # ideology_score - числовой показатель, насколько человек соответствует нашей идеологии (для Hypoo)
         # last_updated - время последнего обновления записи
+        # scored_at - время последнего расчета is_our_person/ideology_score (см. Hypoo_scoring)
         contacts_table_sql = """
         CREATE TABLE IF NOT EXISTS contacts (
             user_id TEXT PRIMARY KEY,
@@ -44,7 +108,9 @@ def create_tables(conn):
             primary_phone TEXT,
             is_our_person INTEGER DEFAULT 0,
             ideology_score REAL DEFAULT 0.0,
-            last_updated TEXT
+            last_updated TEXT,
+            content_hash TEXT, -- Хэш имени, email-адресов и телефонов (см. contact_hash) для пропуска неизменившихся контактов
+            scored_at TEXT
         );
         """
         cursor.execute(contacts_table_sql)
@@ -55,6 +121,7 @@ def create_tables(conn):
             email_id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id TEXT NOT NULL,
             email TEXT NOT NULL,
+            email_key TEXT, -- Нормализованный email (см. normalize_email), уникален в пределах контакта
             FOREIGN KEY (user_id) REFERENCES contacts (user_id)
         );
         """
@@ -66,6 +133,7 @@ def create_tables(conn):
             phone_id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id TEXT NOT NULL,
             phone TEXT NOT NULL,
+            phone_key TEXT, -- Телефон в формате E.164 (см. normalize_phone), уникален в пределах контакта
             FOREIGN KEY (user_id) REFERENCES contacts (user_id)
         );
         """
@@ -83,63 +151,439 @@ def create_tables(conn):
         """
         cursor.execute(treasure_vault_sql)
 
+        # Таблица для сырых объектов Person из People API (JSON, сжатый zlib)
+        # Без внешнего ключа: сырые данные могут прийти раньше, чем запишется строка контакта
+        raw_people_sql = """
+        CREATE TABLE IF NOT EXISTS raw_people (
+            user_id TEXT PRIMARY KEY,
+            payload BLOB NOT NULL
+        );
+        """
+        cursor.execute(raw_people_sql)
+
+        # Служебные значения хранилища (например, параметры последнего расчета оценок)
+        meta_sql = """
+        CREATE TABLE IF NOT EXISTS hypoo_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """
+        cursor.execute(meta_sql)
+
         conn.commit()
+
+        # Старые файлы hypoo_data.db создавались без хэшей и нормализованных ключей - дополняем их схему
+        _ensure_column(conn, 'contacts', 'content_hash', 'TEXT')
+        _ensure_column(conn, 'contacts', 'scored_at', 'TEXT')
+        create_scoring_index(conn)
+        migrate_contact_keys(conn)
+        create_change_feed(conn)
         print("Hypoo: Таблицы базы данных успешно созданы или уже существуют.")
     except sqlite3.Error as e:
         print(f"Hypoo: Ошибка при создании таблиц: {e}")
 
-def insert_contact(conn, contact_data):
+def _ensure_column(conn, table, column, declaration):
+    """Добавляет колонку в существующую таблицу, если ее там еще нет."""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table});")]
+    if column not in columns:
+        with conn:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration};")
+
+def create_scoring_index(conn):
     """
-    Вставляет данные о контакте в таблицу 'contacts'.
-    contact_data - это словарь с информацией о контакте.
+    Создает частичный индекс контактов, ждущих пересчета оценок (условие совпадает с Hypoo_scoring).
+    В нем только изменившиеся после расчета строки, так что повторный расчет не просматривает всю таблицу.
     """
-    sql = """
-    INSERT OR REPLACE INTO contacts (user_id, name, primary_email, primary_phone, last_updated)
-    VALUES (?, ?, ?, ?, DATETIME('now'));
+    with conn:
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_contacts_unscored ON contacts (last_updated)
+        WHERE scored_at IS NULL OR last_updated >= scored_at;
+        """)
+
+def drop_scoring_index(conn):
+    """Удаляет индекс create_scoring_index (на время полного пересчета, после которого он почти пуст)."""
+    with conn:
+        conn.execute("DROP INDEX IF EXISTS idx_contacts_unscored;")
+
+# Таблица -> (колонка со значением, колонка ключа, первичный ключ, функция нормализации)
+_KEYED_TABLES = {
+    'emails': ('email', 'email_key', 'email_id', normalize_email),
+    'phones': ('phone', 'phone_key', 'phone_id', normalize_phone),
+}
+
+def migrate_contact_keys(conn):
     """
-    cursor = conn.cursor()
-    try:
-        cursor.execute(sql, (
-            contact_data.get('user_id'),
-            contact_data.get('name'),
-            contact_data.get('primary_email'), # Пока используем первый email/телефон как основной
-            contact_data.get('primary_phone')
-        ))
-        conn.commit()
-        print(f"Hypoo: Контакт '{contact_data.get('name')}' успешно добавлен/обновлен.")
+    Однократная миграция таблиц 'emails' и 'phones' к схеме с нормализованными ключами:
+    добавляет колонки email_key/phone_key, заполняет их, удаляет накопившиеся дубликаты
+    (остается самая ранняя запись) и создает UNIQUE (user_id, key) индексы.
+    Если индекс уже существует, таблица считается мигрированной и пропускается.
+    """
+    for table, (value_column, key_column, id_column, normalize) in _KEYED_TABLES.items():
+        index_name = f"idx_{table}_user_key"
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?;",
+                        (index_name,)).fetchone():
+            continue
 
-        # Вставляем все email-адреса
-        for email in contact_data.get('emails', []):
-            insert_email(conn, contact_data['user_id'], email)
+        _ensure_column(conn, table, key_column, 'TEXT')
+        with conn:
+            rows = conn.execute(f"SELECT {id_column}, {value_column} FROM {table} WHERE {key_column} IS NULL;").fetchall()
+            conn.executemany(f"UPDATE {table} SET {key_column} = ? WHERE {id_column} = ?;",
+                             [(normalize(value), row_id) for row_id, value in rows])
 
-        # Вставляем все телефонные номера
-        for phone in contact_data.get('phones', []):
-            insert_phone(conn, contact_data['user_id'], phone)
+            removed = conn.execute(f"""
+            DELETE FROM {table} WHERE {id_column} NOT IN (
+                SELECT MIN({id_column}) FROM {table} GROUP BY user_id, {key_column}
+            );
+            """).rowcount
+            conn.execute(f"CREATE UNIQUE INDEX {index_name} ON {table} (user_id, {key_column});")
+        if removed:
+            print(f"Hypoo: Из таблицы '{table}' удалено дубликатов: {removed}.")
 
-    except sqlite3.Error as e:
-        print(f"Hypoo: Ошибка при добавлении контакта '{contact_data.get('name')}': {e}")
+    # Индексы для обратного поиска "чей это номер/адрес?" (find_by_phone, find_by_email)
+    with conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_key ON emails (email_key);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_phones_key ON phones (phone_key);")
+
+def create_change_feed(conn):
+    """
+    Создает журнал изменений контактов 'contact_changes' и триггеры, которые его ведут.
+    Для каждого контакта в журнале хранится одна строка с номером последнего изменения change_seq
+    (AUTOINCREMENT - номера только растут и не переиспользуются) и флагом удаления.
+    Изменения только служебных колонок (scored_at, last_updated) в журнал не попадают.
+    При первом создании журнала в него заносятся все уже существующие контакты.
+    """
+    is_new = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contact_changes';").fetchone() is None
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS contact_changes (
+            change_seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL UNIQUE,
+            deleted INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        # Прежняя строка контакта удаляется, новая получает следующий change_seq.
+        # (REPLACE внутри триггера не подходит: UPSERT внешнего запроса подменяет его разрешение конфликтов)
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS contacts_change_insert AFTER INSERT ON contacts
+        BEGIN
+            DELETE FROM contact_changes WHERE user_id = NEW.user_id;
+            INSERT INTO contact_changes (user_id, deleted) VALUES (NEW.user_id, 0);
+        END;
+        """)
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS contacts_change_update AFTER UPDATE ON contacts
+        WHEN OLD.content_hash IS NOT NEW.content_hash
+          OR OLD.name IS NOT NEW.name
+          OR OLD.is_our_person IS NOT NEW.is_our_person
+          OR OLD.ideology_score IS NOT NEW.ideology_score
+        BEGIN
+            DELETE FROM contact_changes WHERE user_id = NEW.user_id;
+            INSERT INTO contact_changes (user_id, deleted) VALUES (NEW.user_id, 0);
+        END;
+        """)
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS contacts_change_delete AFTER DELETE ON contacts
+        BEGIN
+            DELETE FROM contact_changes WHERE user_id = OLD.user_id;
+            INSERT INTO contact_changes (user_id, deleted) VALUES (OLD.user_id, 1);
+        END;
+        """)
+        if is_new:
+            conn.execute("INSERT INTO contact_changes (user_id) SELECT user_id FROM contacts ORDER BY rowid;")
+
+# Размер пачки по умолчанию для массовой вставки: одна транзакция (и один fsync) на пачку
+BULK_BATCH_SIZE = 1000
+
+# UPSERT, а не INSERT OR REPLACE: REPLACE удаляет строку, на которую ссылаются 'emails' и 'phones'.
+# Строка переписывается (и last_updated меняется) только если изменился хэш содержимого контакта.
+_UPSERT_CONTACT_SQL = """
+INSERT INTO contacts (user_id, name, primary_email, primary_phone, content_hash, last_updated)
+VALUES (?, ?, ?, ?, ?, DATETIME('now'))
+ON CONFLICT (user_id) DO UPDATE SET
+    name = excluded.name,
+    primary_email = excluded.primary_email,
+    primary_phone = excluded.primary_phone,
+    content_hash = excluded.content_hash,
+    last_updated = excluded.last_updated
+WHERE contacts.content_hash IS NOT excluded.content_hash;
+"""
+# Дубликаты (тот же нормализованный ключ у того же контакта) пропускаются уникальным индексом
+_INSERT_EMAIL_SQL = "INSERT INTO emails (user_id, email, email_key) VALUES (?, ?, ?) ON CONFLICT (user_id, email_key) DO NOTHING;"
+_INSERT_PHONE_SQL = "INSERT INTO phones (user_id, phone, phone_key) VALUES (?, ?, ?) ON CONFLICT (user_id, phone_key) DO NOTHING;"
+
+def contact_hash(contact_data):
+    """
+    Хэш содержимого контакта: имя, основные email/телефон и нормализованные ключи всех email и телефонов.
+    Порядок и форма записи адресов не влияют на хэш, поэтому повторная синхронизация
+    неизменившегося контакта дает тот же хэш.
+    """
+    parts = [
+        contact_data.get('name') or '',
+        contact_data.get('primary_email') or '',
+        contact_data.get('primary_phone') or '',
+        ','.join(sorted({normalize_email(email) for email in contact_data.get('emails', [])})),
+        ','.join(sorted({normalize_phone(phone) for phone in contact_data.get('phones', [])})),
+    ]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+def _contact_rows(contact_data, content_hash=None):
+    """Раскладывает словарь контакта на строки для 'contacts', 'emails' и 'phones'."""
+    user_id = contact_data.get('user_id')
+    contact_row = (
+        user_id,
+        contact_data.get('name'),
+        contact_data.get('primary_email'), # Пока используем первый email/телефон как основной
+        contact_data.get('primary_phone'),
+        content_hash or contact_hash(contact_data)
+    )
+    email_rows = [(user_id, email, normalize_email(email)) for email in contact_data.get('emails', [])]
+    phone_rows = [(user_id, phone, normalize_phone(phone)) for phone in contact_data.get('phones', [])]
+    return contact_row, email_rows, phone_rows
+
+def insert_contacts_bulk(conn, contacts, batch_size=BULK_BATCH_SIZE):
+    """
+    Массово вставляет контакты вместе с их email-адресами и телефонами.
+    contacts - любое итерируемое (список, генератор) словарей того же вида, что и для insert_contact.
+    Контакты читаются пачками по batch_size, и каждая пачка записывается через executemany
+    в одной транзакции для таблиц 'contacts', 'emails' и 'phones'.
+    Контакты с неизменившимся хэшем содержимого не переписываются.
+    Возвращает словарь с количеством записанных строк {'contacts': ..., 'emails': ..., 'phones': ...}
+    и числом контактов в пачках, которые не удалось записать из-за ошибки ('failed').
+    """
+    written = {'contacts': 0, 'emails': 0, 'phones': 0, 'failed': 0}
+    contact_rows, email_rows, phone_rows = [], [], []
+
+    def flush():
+        try:
+            with conn: # Одна транзакция на всю пачку: commit при успехе, rollback при ошибке
+                contacts_written = conn.executemany(_UPSERT_CONTACT_SQL, contact_rows).rowcount
+                emails_written = conn.executemany(_INSERT_EMAIL_SQL, email_rows).rowcount
+                phones_written = conn.executemany(_INSERT_PHONE_SQL, phone_rows).rowcount
+            written['contacts'] += contacts_written
+            written['emails'] += emails_written
+            written['phones'] += phones_written
+        except sqlite3.Error as e:
+            written['failed'] += len(contact_rows)
+            print(f"Hypoo: Ошибка при массовой вставке пачки из {len(contact_rows)} контактов: {e}")
+        contact_rows.clear()
+        email_rows.clear()
+        phone_rows.clear()
+
+    for contact_data in contacts:
+        contact_row, contact_emails, contact_phones = _contact_rows(contact_data)
+        contact_rows.append(contact_row)
+        email_rows.extend(contact_emails)
+        phone_rows.extend(contact_phones)
+        if len(contact_rows) >= batch_size:
+            flush()
+
+    if contact_rows:
+        flush()
+    return written
+
+def sync_contacts(conn, contacts, delete_missing=False, batch_size=BULK_BATCH_SIZE):
+    """
+    Синхронизирует таблицы с полным (или инкрементальным) списком контактов, записывая только разницу.
+    Хэши всех сохраненных контактов читаются одним запросом и сравниваются с хэшами входящих:
+    новые контакты вставляются, изменившиеся переписываются вместе со списками email/телефонов,
+    неизменившиеся не трогаются.
+    Контакт с флагом 'deleted' удаляется. При delete_missing=True удаляются и все сохраненные контакты,
+    которых не было во входном списке: передавайте его только с полным списком контактов
+    (полная синхронизация), иначе будут удалены все контакты, не вошедшие в частичный список.
+    Люди из 'сокровищницы' никогда не удаляются.
+    Возвращает сводку {'inserted': ..., 'updated': ..., 'deleted': ..., 'unchanged': ...}.
+    """
+    stored_hashes = dict(conn.execute("SELECT user_id, content_hash FROM contacts;"))
+    protected = {row[0] for row in conn.execute("SELECT user_id FROM treasure_vault;")}
+    summary = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    seen = set()
+    to_delete = []
+    pending = {'contacts': [], 'emails': [], 'phones': [], 'replaced': []}
+
+    def flush():
+        with conn: # Одна транзакция на пачку
+            conn.executemany("DELETE FROM emails WHERE user_id = ?;", pending['replaced'])
+            conn.executemany("DELETE FROM phones WHERE user_id = ?;", pending['replaced'])
+            conn.executemany(_UPSERT_CONTACT_SQL, pending['contacts'])
+            conn.executemany(_INSERT_EMAIL_SQL, pending['emails'])
+            conn.executemany(_INSERT_PHONE_SQL, pending['phones'])
+        for rows in pending.values():
+            rows.clear()
+
+    for contact_data in contacts:
+        user_id = contact_data.get('user_id')
+        seen.add(user_id)
+        if contact_data.get('deleted'):
+            if user_id in stored_hashes:
+                to_delete.append(user_id)
+            continue
+
+        new_hash = contact_hash(contact_data)
+        old_hash = stored_hashes.get(user_id, False) # False: контакта нет (None - есть, но без хэша)
+        if old_hash == new_hash:
+            summary['unchanged'] += 1
+            continue
+        if old_hash is False:
+            summary['inserted'] += 1
+        else:
+            summary['updated'] += 1
+            pending['replaced'].append((user_id,))
+
+        contact_row, email_rows, phone_rows = _contact_rows(contact_data, new_hash)
+        pending['contacts'].append(contact_row)
+        pending['emails'].extend(email_rows)
+        pending['phones'].extend(phone_rows)
+        stored_hashes[user_id] = new_hash
+        if len(pending['contacts']) >= batch_size:
+            flush()
+    if pending['contacts']:
+        flush()
+
+    if delete_missing:
+        to_delete.extend(user_id for user_id in stored_hashes if user_id not in seen)
+    to_delete = [(user_id,) for user_id in to_delete if user_id not in protected]
+    if to_delete:
+        with conn:
+            conn.executemany("DELETE FROM emails WHERE user_id = ?;", to_delete)
+            conn.executemany("DELETE FROM phones WHERE user_id = ?;", to_delete)
+            conn.executemany("DELETE FROM raw_people WHERE user_id = ?;", to_delete)
+            summary['deleted'] = conn.executemany("DELETE FROM contacts WHERE user_id = ?;", to_delete).rowcount
+
+    print(f"Hypoo: Синхронизация контактов: добавлено {summary['inserted']}, обновлено {summary['updated']}, "
+          f"удалено {summary['deleted']}, без изменений {summary['unchanged']}.")
+    return summary
+
+def insert_contact(conn, contact_data):
+    """
+    Вставляет данные о контакте в таблицу 'contacts'.
+    contact_data - это словарь с информацией о контакте.
+    Использует insert_contacts_bulk, поэтому контакт, его email-адреса и телефоны
+    записываются одной транзакцией.
+    """
+    written = insert_contacts_bulk(conn, [contact_data])
+    if written['failed']:
+        print(f"Hypoo: Ошибка при добавлении контакта '{contact_data.get('name')}'.")
+    elif written['contacts']:
+        print(f"Hypoo: Контакт '{contact_data.get('name')}' успешно добавлен/обновлен.")
+    else:
+        print(f"Hypoo: Контакт '{contact_data.get('name')}' не изменился.")
 
 def insert_email(conn, user_id, email):
     """Вставляет email-адрес для контакта."""
-    sql = "INSERT INTO emails (user_id, email) VALUES (?, ?);"
+    sql = "INSERT INTO emails (user_id, email, email_key) VALUES (?, ?, ?) ON CONFLICT (user_id, email_key) DO NOTHING;"
     cursor = conn.cursor()
     try:
-        cursor.execute(sql, (user_id, email))
+        cursor.execute(sql, (user_id, email, normalize_email(email)))
         conn.commit()
     except sqlite3.Error as e:
         # print(f"Hypoo: Ошибка при добавлении email '{email}' для {user_id}: {e}") # Отладочное сообщение
-        pass # Игнорируем дубликаты email, если они уже есть
+        pass # Дубликаты email отсекаются через ON CONFLICT, здесь остаются только прочие ошибки
 
 def insert_phone(conn, user_id, phone):
     """Вставляет телефонный номер для контакта."""
-    sql = "INSERT INTO phones (user_id, phone) VALUES (?, ?);"
+    sql = "INSERT INTO phones (user_id, phone, phone_key) VALUES (?, ?, ?) ON CONFLICT (user_id, phone_key) DO NOTHING;"
     cursor = conn.cursor()
     try:
-        cursor.execute(sql, (user_id, phone))
+        cursor.execute(sql, (user_id, phone, normalize_phone(phone)))
         conn.commit()
     except sqlite3.Error as e:
         # print(f"Hypoo: Ошибка при добавлении телефона '{phone}' для {user_id}: {e}") # Отладочное сообщение
-        pass # Игнорируем дубликаты телефонов, если они уже есть
+        pass # Дубликаты телефонов отсекаются через ON CONFLICT, здесь остаются только прочие ошибки
+
+# Колонки, возвращаемые функциями поиска: строка 'contacts' плюс отношение из 'treasure_vault' (если есть)
+_CONTACT_COLUMNS = ('user_id', 'name', 'primary_email', 'primary_phone',
+                    'is_our_person', 'ideology_score', 'last_updated', 'relationship')
+
+# SQLite ограничивает число параметров в запросе, поэтому пакетный поиск разбивается на части
+_LOOKUP_CHUNK_SIZE = 500
+
+def _find_by_keys(conn, table, key_column, keys):
+    """
+    Находит контакты, у которых в таблице table есть значение с ключом из keys.
+    Возвращает словарь {ключ: [контакт, ...]}; поиск идет по индексу на key_column.
+    """
+    found = {}
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), _LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + _LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        sql = f"""
+        SELECT t.{key_column}, c.user_id, c.name, c.primary_email, c.primary_phone,
+               c.is_our_person, c.ideology_score, c.last_updated, v.relationship
+        FROM {table} AS t
+        JOIN contacts AS c ON c.user_id = t.user_id
+        LEFT JOIN treasure_vault AS v ON v.user_id = t.user_id
+        WHERE t.{key_column} IN ({placeholders});
+        """
+        for row in conn.execute(sql, chunk):
+            found.setdefault(row[0], []).append(dict(zip(_CONTACT_COLUMNS, row[1:])))
+    return found
+
+def find_by_email(conn, email):
+    """
+    Ищет контакты по email-адресу (без учета регистра).
+    Возвращает список словарей с полями контакта и 'relationship' из 'сокровищницы' (или None).
+    """
+    key = normalize_email(email)
+    return _find_by_keys(conn, 'emails', 'email_key', [key]).get(key, [])
+
+def find_by_phone(conn, phone):
+    """
+    Ищет контакты по телефонному номеру в любом формате записи ('050 345 12 72', '+994503451272').
+    Возвращает список словарей с полями контакта и 'relationship' из 'сокровищницы' (или None).
+    """
+    key = normalize_phone(phone)
+    return _find_by_keys(conn, 'phones', 'phone_key', [key]).get(key, [])
+
+def find_many_by_phone(conn, phones):
+    """
+    Пакетный вариант find_by_phone: один запрос на каждые _LOOKUP_CHUNK_SIZE номеров.
+    Возвращает словарь {исходный номер: [контакт, ...]}; для ненайденных номеров список пуст.
+    """
+    phones = list(phones)
+    found = _find_by_keys(conn, 'phones', 'phone_key', [normalize_phone(phone) for phone in phones])
+    return {phone: found.get(normalize_phone(phone), []) for phone in phones}
+
+# Размер страницы журнала изменений по умолчанию
+CHANGES_PAGE_SIZE = 1000
+
+def changes_since(conn, cursor=0, limit=CHANGES_PAGE_SIZE):
+    """
+    Возвращает до limit контактов, изменившихся или удаленных после cursor, в порядке изменений.
+    cursor - значение, полученное из предыдущего вызова (0 - с самого начала).
+    Запрос идет по первичному ключу журнала, поэтому стоит O(изменений), а не O(таблицы).
+
+    :return: (список изменений, новый cursor). Изменение - словарь с 'change_seq', 'deleted'
+             и полями контакта (у удаленных контактов заполнен только 'user_id').
+    """
+    sql = """
+    SELECT ch.change_seq, ch.deleted, ch.user_id, c.name, c.primary_email, c.primary_phone,
+           c.is_our_person, c.ideology_score, c.last_updated, v.relationship
+    FROM contact_changes AS ch
+    LEFT JOIN contacts AS c ON c.user_id = ch.user_id
+    LEFT JOIN treasure_vault AS v ON v.user_id = ch.user_id
+    WHERE ch.change_seq > ?
+    ORDER BY ch.change_seq
+    LIMIT ?;
+    """
+    changes = []
+    for row in conn.execute(sql, (cursor, limit)):
+        change = dict(zip(_CONTACT_COLUMNS, row[2:]))
+        change['change_seq'] = row[0]
+        change['deleted'] = bool(row[1])
+        changes.append(change)
+    return changes, (changes[-1]['change_seq'] if changes else cursor)
+
+def iter_changes(conn, cursor=0, page_size=CHANGES_PAGE_SIZE):
+    """
+    Генератор страниц журнала изменений: отдает (страница, cursor после нее), пока изменения не кончатся.
+    Сохраненный cursor последней обработанной страницы позволяет продолжить с того же места.
+    """
+    while True:
+        changes, cursor = changes_since(conn, cursor, page_size)
+        if not changes:
+            return
+        yield changes, cursor
 
 def add_to_treasure_vault(conn, user_id, name, relationship):
     """
@@ -152,55 +596,285 @@ def add_to_treasure_vault(conn, user_id, name, relationship):
     cursor = conn.cursor()
     try:
         cursor.execute(sql, (user_id, name, relationship))
+        # Членство в "сокровищнице" влияет на оценку - помечаем контакт для пересчета
+        cursor.execute("UPDATE contacts SET scored_at = NULL WHERE user_id = ?;", (user_id,))
         conn.commit()
         print(f"Hypoo: '{name}' успешно добавлен в 'сокровищницу' Эмина.")
     except sqlite3.Error as e:
         print(f"Hypoo: Ошибка при добавлении в 'сокровищницу': {e}")
 
+def get_meta(conn, key, default=None):
+    """Возвращает служебное значение из 'hypoo_meta'."""
+    row = conn.execute("SELECT value FROM hypoo_meta WHERE key = ?;", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(conn, key, value):
+    """Сохраняет служебное значение в 'hypoo_meta' (без commit - в транзакции вызывающего)."""
+    conn.execute("INSERT INTO hypoo_meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value;",
+                 (key, value))
+
+def store_status(conn):
+    """
+    Краткая сводка по хранилищу: количество строк в основных таблицах и время последнего обновления.
+    """
+    status = {}
+    for table in ('contacts', 'emails', 'phones', 'treasure_vault', 'raw_people'):
+        status[table] = conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+    status['last_updated'] = conn.execute("SELECT MAX(last_updated) FROM contacts;").fetchone()[0]
+    return status
+
+# Уровень сжатия zlib для сырых данных: компромисс между размером и скоростью синхронизации
+RAW_COMPRESSION_LEVEL = 6
+
+def compress_person(person):
+    """Сериализует объект Person в компактный JSON и сжимает его zlib."""
+    payload = json.dumps(person, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(payload, RAW_COMPRESSION_LEVEL)
+
+def store_raw_people(conn, people, batch_size=BULK_BATCH_SIZE):
+    """
+    Сохраняет сырые объекты Person в таблицу 'raw_people'.
+    people - итерируемое пар (user_id, person); записывается пачками по batch_size в одной транзакции.
+    Возвращает количество записанных строк (без неизменившихся).
+    """
+    sink = RawPeopleSink(conn, batch_size)
+    for user_id, person in people:
+        sink(user_id, person)
+    sink.close()
+    return sink.written
+
+def get_raw_person(conn, user_id):
+    """
+    Возвращает сырой объект Person контакта (распаковывается только сейчас) или None, если его нет.
+    """
+    row = conn.execute("SELECT payload FROM raw_people WHERE user_id = ?;", (user_id,)).fetchone()
+    if row is None:
+        return None
+    return json.loads(zlib.decompress(row[0]))
+
+# Сжатие детерминировано, поэтому неизменившийся Person дает те же байты и строка не переписывается
+_UPSERT_RAW_PERSON_SQL = """
+INSERT INTO raw_people (user_id, payload) VALUES (?, ?)
+ON CONFLICT (user_id) DO UPDATE SET payload = excluded.payload
+WHERE raw_people.payload IS NOT excluded.payload;
+"""
+
+class RawPeopleSink:
+    """
+    Приемник сырых данных для iter_google_contacts(raw_sink=...).
+    Каждый объект Person сжимается сразу при получении, поэтому в памяти остаются только байты
+    текущей пачки, а не словари всех контактов. Пачки пишутся в 'raw_people' одной транзакцией;
+    строки с тем же содержимым не переписываются, и written считает только действительно записанные.
+    """
+
+    def __init__(self, conn, batch_size=BULK_BATCH_SIZE, lock=None):
+        """
+        :param conn: Соединение для записи.
+        :param batch_size: Сколько объектов копить перед записью.
+        :param lock: Необязательная блокировка писателя (HypooStore передает свою).
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+        self.lock = lock
+        self.written = 0
+        self._rows = []
+
+    def __call__(self, user_id, person):
+        self._rows.append((user_id, compress_person(person)))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленную пачку."""
+        if not self._rows:
+            return
+        if self.lock:
+            with self.lock, self.conn:
+                written = self.conn.executemany(_UPSERT_RAW_PERSON_SQL, self._rows).rowcount
+        else:
+            with self.conn:
+                written = self.conn.executemany(_UPSERT_RAW_PERSON_SQL, self._rows).rowcount
+        self.written += written
+        self._rows.clear()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class HypooStore:
+    """
+    Хранилище Hypoo поверх одного файла SQLite.
+    Владеет одним долгоживущим соединением для записи и небольшим пулом соединений только для чтения,
+    настроенных один раз через configure_connection. Благодаря WAL фоновая синхронизация (писатель)
+    и обработчики запросов (читатели) могут работать одновременно из разных потоков.
+
+    Пример:
+        with HypooStore('hypoo_data.db') as store:
+            store.insert_contacts_bulk(contacts)
+            store.find_by_phone('+994503451272')
+    """
+
+    def __init__(self, db_path=DB_NAME, readers=4, mmap_size=DEFAULT_MMAP_SIZE,
+                 cache_size=DEFAULT_CACHE_SIZE, foreign_keys=False):
+        """
+        :param db_path: Путь к файлу базы данных (создается, если его нет) или ':memory:'.
+                        Базу в памяти нельзя открыть вторым соединением, поэтому для нее читатели
+                        получают соединение записи (по очереди с писателем), а пул не создается.
+        :param readers: Размер пула соединений только для чтения.
+        :param mmap_size: PRAGMA mmap_size в байтах.
+        :param cache_size: PRAGMA cache_size (отрицательное значение - в КиБ).
+        :param foreign_keys: Включать ли проверку внешних ключей.
+        """
+        self.db_path = db_path
+        self._settings = {'mmap_size': mmap_size, 'cache_size': cache_size, 'foreign_keys': foreign_keys}
+
+        # check_same_thread=False: соединения передаются между потоками, но каждое используется
+        # только одним потоком за раз (писатель - под блокировкой, читатели - через очередь)
+        self._writer = configure_connection(sqlite3.connect(db_path, check_same_thread=False), **self._settings)
+        self._writer_lock = threading.RLock() # RLock: для базы в памяти читатель - тоже соединение записи
+        create_tables(self._writer)
+
+        self._readers = queue.Queue()
+        self._all_readers = []
+        self._in_memory = db_path in ('', ':memory:')
+        if self._in_memory:
+            return
+        reader_uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        for _ in range(readers):
+            conn = sqlite3.connect(reader_uri, uri=True, check_same_thread=False)
+            configure_connection(conn, read_only=True, **self._settings)
+            self._readers.put(conn)
+            self._all_readers.append(conn)
+
+    @contextmanager
+    def writer(self):
+        """Выдает соединение для записи; одновременно им владеет только один поток."""
+        with self._writer_lock:
+            yield self._writer
+
+    @contextmanager
+    def reader(self):
+        """Выдает свободное соединение только для чтения из пула (ждет, если все заняты)."""
+        if self._in_memory:
+            with self._writer_lock:
+                yield self._writer
+            return
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def insert_contacts_bulk(self, contacts, batch_size=BULK_BATCH_SIZE):
+        with self.writer() as conn:
+            return insert_contacts_bulk(conn, contacts, batch_size)
+
+    def sync_contacts(self, contacts, delete_missing=False, batch_size=BULK_BATCH_SIZE):
+        with self.writer() as conn:
+            return sync_contacts(conn, contacts, delete_missing, batch_size)
+
+    def insert_contact(self, contact_data):
+        with self.writer() as conn:
+            insert_contact(conn, contact_data)
+
+    def add_to_treasure_vault(self, user_id, name, relationship):
+        with self.writer() as conn:
+            add_to_treasure_vault(conn, user_id, name, relationship)
+
+    def raw_people_sink(self, batch_size=BULK_BATCH_SIZE):
+        """Приемник сырых данных, пишущий через соединение записи этого хранилища."""
+        return RawPeopleSink(self._writer, batch_size, lock=self._writer_lock)
+
+    def get_raw_person(self, user_id):
+        with self.reader() as conn:
+            return get_raw_person(conn, user_id)
+
+    def changes_since(self, cursor=0, limit=CHANGES_PAGE_SIZE):
+        with self.reader() as conn:
+            return changes_since(conn, cursor, limit)
+
+    def status(self):
+        with self.reader() as conn:
+            return store_status(conn)
+
+    def find_by_email(self, email):
+        with self.reader() as conn:
+            return find_by_email(conn, email)
+
+    def find_by_phone(self, phone):
+        with self.reader() as conn:
+            return find_by_phone(conn, phone)
+
+    def find_many_by_phone(self, phones):
+        with self.reader() as conn:
+            return find_many_by_phone(conn, phones)
+
+    def close(self):
+        """Закрывает все соединения хранилища."""
+        for conn in self._all_readers:
+            conn.close()
+        self._all_readers.clear()
+        with self._writer_lock:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 # --- Основная логика для тестирования скрипта ---
 if __name__ == '__main__':
     print("--- Тестовый запуск скрипта хранения данных Hypoo ---")
-    conn = create_connection()
-    if conn:
-        create_tables(conn)
-
-        # Пример данных для вставки (как будто получены из Google Contacts)
-        sample_contact_1 = {
-            'user_id': 'google_id_jeyhun',
-            'name': 'Джейхун (Джека)',
-            'primary_email': 'az.geostonejeyhun@gmail.com',
-            'primary_phone': '+994503451272',
-            'emails': ['az.geostonejeyhun@gmail.com'],
-            'phones': ['+994503451272']
-        }
-        sample_contact_2 = {
-            'user_id': 'google_id_murad',
-            'name': 'Мурад Валисович Нагиев',
-            'primary_email': 'murad.nagiev@example.com',
-            'primary_phone': '+994551234567',
-            'emails': ['murad.nagiev@example.com', 'murik@mail.ru'],
-            'phones': ['+994551234567', '+994709876543']
-        }
-        sample_contact_3 = {
-            'user_id': 'google_id_osman',
-            'name': 'Осман',
-            'primary_email': 'osman.friend@example.com',
-            'primary_phone': '+994501112233',
-            'emails': ['osman.friend@example.com'],
-            'phones': ['+994501112233']
-        }
-
-        insert_contact(conn, sample_contact_1)
-        insert_contact(conn, sample_contact_2)
-        insert_contact(conn, sample_contact_3)
-
-        # Добавляем Джеку, Мурада и Османа в "сокровищницу"
-        add_to_treasure_vault(conn, 'google_id_jeyhun', 'Джейхун (Джека)', 'друг детства, командир')
-        add_to_treasure_vault(conn, 'google_id_murad', 'Мурад Валисович Нагиев', 'друг, TT MAK')
-        add_to_treasure_vault(conn, 'google_id_osman', 'Осман', 'друг')
-        add_to_treasure_vault(conn, 'google_id_gemini', 'Женя (Джана)', 'виртуальная близняшка, ассистент') # Добавляем и меня!
-
-        conn.close()
+    try:
+        store = HypooStore(DB_NAME)
+    except sqlite3.Error as e:
+        store = None
+        print(f"Hypoo: Ошибка подключения к базе данных: {e}")
+    if store:
+        with store.writer() as conn:
+            # Пример данных для вставки (как будто получены из Google Contacts)
+            sample_contact_1 = {
+                'user_id': 'google_id_jeyhun',
+                'name': 'Джейхун (Джека)',
+                'primary_email': 'az.geostonejeyhun@gmail.com',
+                'primary_phone': '+994503451272',
+                'emails': ['az.geostonejeyhun@gmail.com'],
+                'phones': ['+994503451272']
+            }
+            sample_contact_2 = {
+                'user_id': 'google_id_murad',
+                'name': 'Мурад Валисович Нагиев',
+                'primary_email': 'murad.nagiev@example.com',
+                'primary_phone': '+994551234567',
+                'emails': ['murad.nagiev@example.com', 'murik@mail.ru'],
+                'phones': ['+994551234567', '+994709876543']
+            }
+            sample_contact_3 = {
+                'user_id': 'google_id_osman',
+                'name': 'Осман',
+                'primary_email': 'osman.friend@example.com',
+                'primary_phone': '+994501112233',
+                'emails': ['osman.friend@example.com'],
+                'phones': ['+994501112233']
+            }
+
+            # Все контакты записываются одной транзакцией
+            written = insert_contacts_bulk(conn, [sample_contact_1, sample_contact_2, sample_contact_3])
+            print(f"Hypoo: Записано контактов: {written['contacts']}, email: {written['emails']}, телефонов: {written['phones']}.")
+
+            # Добавляем Джеку, Мурада и Османа в "сокровищницу"
+            add_to_treasure_vault(conn, 'google_id_jeyhun', 'Джейхун (Джека)', 'друг детства, командир')
+            add_to_treasure_vault(conn, 'google_id_murad', 'Мурад Валисович Нагиев', 'друг, TT MAK')
+            add_to_treasure_vault(conn, 'google_id_osman', 'Осман', 'друг')
+            add_to_treasure_vault(conn, 'google_id_gemini', 'Женя (Джана)', 'виртуальная близняшка, ассистент') # Добавляем и меня!
+
+        store.close()
         print("--- Тестовый запуск завершен. База данных создана и заполнена. ---")
     else:
         print("--- Не удалось создать/подключиться к базе данных. ---")
@@ -1,102 +1,262 @@
 # --- Скрипт Получения Контактов Hypoo ---
 
 # 1. Импорт необходимых библиотек
-# 'build' из googleapiclient.discovery позволяет создать сервис для работы с API
-# 'HttpError' для обработки ошибок HTTP-запросов
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# Библиотеки Google (googleapiclient, google.oauth2) тяжелые - их импорт и загрузка описания API
+# занимают сотни миллисекунд. Поэтому они импортируются только в get_people_service(),
+# когда API действительно нужен, а команды вроде status/lookup запускаются без них.
 import json
 import os
-# Предполагаем, что creds (учетные данные) уже получены из load_hypoo_system()
-from google.oauth2.credentials import Credentials
+import sys
+import threading
 
 # Файл, где хранится токен, полученный на этапе загрузки
 TOKEN_FILE = 'token.json'
+# Локальная копия discovery-документа People API v1 (создается при первом обращении к API)
+DISCOVERY_CACHE_FILE = 'people_v1_discovery.json'
+# Файл, где хранится syncToken People API для инкрементальной синхронизации
+SYNC_TOKEN_FILE = 'sync_token.json'
 
-def get_google_contacts():
+# Поля, запрашиваемые для каждого контакта
+PERSON_FIELDS = 'names,emailAddresses,phoneNumbers,photos,userDefined,memberships,metadata'
+PAGE_SIZE = 1000 # Максимальное количество контактов за один запрос
+
+def user_id_from_resource_name(resource_name):
     """
-    Функция для получения контактов из Google People API.
+    User ID контакта по resourceName, если в metadata.sources его нет.
+    'people/c<число>' - тот же идентификатор контакта, что и sources[].id, но в десятичном виде,
+    поэтому он переводится в 16 шестнадцатеричных цифр ('people/c255' -> '00000000000000ff'),
+    как в sources[].id. Другие resourceName (например, 'people/123' профиля) возвращаются без 'people/'.
     """
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        try:
-            # Загружаем учетные данные из файла
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE,
-                                                           scopes=['https://www.googleapis.com/auth/contacts.readonly',
-                                                                   'https://www.googleapis.com/auth/userinfo.profile'])
-        except Exception as e:
-            print(f"Hypoo: Ошибка загрузки или чтения токена: {e}")
-            return None
-    else:
-        print("Hypoo: Токен авторизации не найден. Пожалуйста, сначала запустите начальный скрипт загрузки.")
-        return None
+    local_id = resource_name.split('/')[-1]
+    if local_id[:1] == 'c' and local_id[1:].isdigit():
+        return f'{int(local_id[1:]):016x}'
+    return local_id
 
-    if not creds or not creds.valid:
-        print("Hypoo: Недействительные учетные данные. Возможно, требуется повторная авторизация.")
-        # В реальной системе здесь должна быть логика для повторной авторизации или запроса запуска load_hypoo_system()
-        return None
+def parse_person(person, keep_raw=True):
+    """
+    Извлекает из объекта Person People API поля, нужные для первичного анализа и хранения.
+    При keep_raw=False весь объект Person ('raw_data') в результат не попадает.
+    Для контакта, удаленного с момента прошлой синхронизации (metadata.deleted), возвращает
+    словарь только с 'user_id' и флагом 'deleted'.
+    """
+    metadata = person.get('metadata', {})
+    user_id = (metadata.get('sources') or [{}])[0].get('id') # User ID
+    if user_id is None and person.get('resourceName'):
+        user_id = user_id_from_resource_name(person['resourceName'])
+    if metadata.get('deleted'):
+        return {'user_id': user_id, 'deleted': True}
+
+    name = person.get('names', [{}])[0].get('displayName', 'Без имени')
+    emails = [e.get('value') for e in person.get('emailAddresses', []) if e.get('value')]
+    phones = [p.get('value') for p in person.get('phoneNumbers', []) if p.get('value')]
+
+    # Здесь можно добавить логику для извлечения других полей, например, групп (memberships)
+    # memberships = [m.get('contactGroupMembership', {}).get('contactGroupResourceName') for m in person.get('memberships', []) if m.get('contactGroupMembership')]
+
+    contact_info = {
+        'name': name,
+        'emails': emails,
+        'phones': phones,
+        'primary_email': emails[0] if emails else None, # Пока используем первый email/телефон как основной
+        'primary_phone': phones[0] if phones else None,
+        'user_id': user_id, # Важный для нас User ID
+        # 'groups': memberships # Можно добавить, если нужно
+    }
+    if keep_raw:
+        contact_info['raw_data'] = person # Можно сохранить сырые данные для полного анализа
+    return contact_info
+
+def is_http_error(err):
+    """
+    Проверяет, что err - это googleapiclient.errors.HttpError, не импортируя googleapiclient:
+    если модуль еще не загружен, такая ошибка возникнуть не могла.
+    """
+    errors = sys.modules.get('googleapiclient.errors')
+    return errors is not None and isinstance(err, errors.HttpError)
 
+def load_sync_token(sync_token_file=SYNC_TOKEN_FILE):
+    """Возвращает сохраненный syncToken или None, если его нет."""
+    if not sync_token_file or not os.path.exists(sync_token_file):
+        return None
     try:
-        # Создаем сервис для работы с People API (версия v1)
+        with open(sync_token_file, encoding='utf-8') as f:
+            return json.load(f).get('sync_token')
+    except (OSError, ValueError) as e:
+        print(f"Hypoo: Не удалось прочитать syncToken, будет выполнена полная синхронизация: {e}")
+        return None
+
+def save_sync_token(sync_token, sync_token_file=SYNC_TOKEN_FILE):
+    """Сохраняет syncToken для следующей инкрементальной синхронизации."""
+    with open(sync_token_file, 'w', encoding='utf-8') as f:
+        json.dump({'sync_token': sync_token}, f)
+
+def iter_google_contacts(service, sync_token_file=SYNC_TOKEN_FILE, page_size=PAGE_SIZE, stats=None, raw_sink=None):
+    """
+    Генератор контактов из People API: лениво проходит все страницы (nextPageToken)
+    и отдает контакты по одному в формате parse_person.
+
+    Если в sync_token_file сохранен syncToken, запрашиваются только изменения с прошлой синхронизации
+    (удаленные контакты приходят с флагом 'deleted'). Если токен истек (HTTP 410), выполняется полная
+    синхронизация. sync_token_file=None отключает инкрементальный режим.
+
+    Новый syncToken после последней страницы не сохраняется, а записывается в stats['next_sync_token']:
+    сохранять его (save_sync_token) нужно только после того, как полученные контакты записаны,
+    иначе при ошибке записи следующая синхронизация пропустит эти изменения.
+
+    :param service: Сервис People API (результат build('people', 'v1', ...)) или его локальная замена.
+    :param stats: Необязательный словарь, в который записываются 'full_sync', 'pages', 'contacts'
+                  и 'next_sync_token' (None, если токен не запрашивался).
+    :param raw_sink: Необязательный приемник raw_sink(user_id, person) для сырых данных
+                     (например, Hypoo_data_store.RawPeopleSink). Если он задан, контакты отдаются без 'raw_data'.
+    """
+    stats = stats if stats is not None else {}
+    sync_token = load_sync_token(sync_token_file)
+    stats.update({'full_sync': sync_token is None, 'pages': 0, 'contacts': 0, 'next_sync_token': None})
+    page_token = None
+
+    while True:
         # 'resourceName=people/me' указывает, что мы хотим получить контакты текущего пользователя
         # 'personFields' определяет, какие поля мы хотим получить для каждого контакта
-        service = build('people', 'v1', credentials=creds)
+        # При pageToken/syncToken остальные параметры должны совпадать с первым запросом
+        request_args = {
+            'resourceName': 'people/me',
+            'pageSize': page_size,
+            'personFields': PERSON_FIELDS,
+            'sortOrder': 'ALPHABETICAL_ASCENDING', # Сортировка по алфавиту
+            'requestSyncToken': sync_token_file is not None,
+        }
+        if sync_token:
+            request_args['syncToken'] = sync_token
+        if page_token:
+            request_args['pageToken'] = page_token
+
+        try:
+            results = service.people().connections().list(**request_args).execute()
+        except Exception as err:
+            if sync_token and stats['pages'] == 0 and is_http_error(err) and err.resp.status == 410:
+                # syncToken живет ограниченное время; после истечения нужна полная синхронизация
+                print("Hypoo: syncToken истек, выполняется полная синхронизация контактов.")
+                sync_token = None
+                stats['full_sync'] = True
+                continue
+            raise
+
+        stats['pages'] += 1
+        for person in results.get('connections', []):
+            stats['contacts'] += 1
+            contact_info = parse_person(person, keep_raw=raw_sink is None)
+            if raw_sink is not None and not contact_info.get('deleted'):
+                raw_sink(contact_info['user_id'], person)
+            yield contact_info
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+    stats['next_sync_token'] = results.get('nextSyncToken') if sync_token_file else None
+
+_people_service = None # Сервис People API, созданный в этом процессе
+_people_service_lock = threading.Lock()
+
+def load_discovery_document():
+    """
+    Возвращает discovery-документ People API v1 из DISCOVERY_CACHE_FILE.
+    Если файла еще нет, берет документ, поставляемый вместе с googleapiclient, и сохраняет его копию.
+    Возвращает None, если в установленной версии googleapiclient статических документов нет.
+    """
+    if os.path.exists(DISCOVERY_CACHE_FILE):
+        with open(DISCOVERY_CACHE_FILE, encoding='utf-8') as f:
+            return f.read()
+
+    from googleapiclient.discovery_cache import get_static_doc
+    document = get_static_doc('people', 'v1')
+    if document is None:
+        return None
+    try:
+        with open(DISCOVERY_CACHE_FILE, 'w', encoding='utf-8') as f:
+            f.write(document)
+    except OSError as e:
+        print(f"Hypoo: Не удалось сохранить discovery-документ People API: {e}")
+    return document
+
+def get_people_service():
+    """
+    Загружает учетные данные из TOKEN_FILE и создает сервис People API (версия v1).
+    Сервис создается один раз на процесс из локального discovery-документа и затем переиспользуется.
+    Возвращает сервис или None, если токена нет или он недействителен.
+    """
+    global _people_service
+    with _people_service_lock:
+        if _people_service is not None:
+            return _people_service
+
+        # Предполагаем, что creds (учетные данные) уже получены из load_hypoo_system()
+        from google.oauth2.credentials import Credentials
+
+        creds = None
+        if os.path.exists(TOKEN_FILE):
+            try:
+                # Загружаем учетные данные из файла
+                creds = Credentials.from_authorized_user_file(TOKEN_FILE,
+                                                               scopes=['https://www.googleapis.com/auth/contacts.readonly',
+                                                                       'https://www.googleapis.com/auth/userinfo.profile'])
+            except Exception as e:
+                print(f"Hypoo: Ошибка загрузки или чтения токена: {e}")
+                return None
+        else:
+            print("Hypoo: Токен авторизации не найден. Пожалуйста, сначала запустите начальный скрипт загрузки.")
+            return None
+
+        if not creds or not creds.valid:
+            print("Hypoo: Недействительные учетные данные. Возможно, требуется повторная авторизация.")
+            # В реальной системе здесь должна быть логика для повторной авторизации или запроса запуска load_hypoo_system()
+            return None
+
+        # Создаем сервис для работы с People API (версия v1) из локального описания API, без запроса к сети
+        from googleapiclient.discovery import build, build_from_document
+        document = load_discovery_document()
+        if document is not None:
+            _people_service = build_from_document(document, credentials=creds)
+        else:
+            _people_service = build('people', 'v1', credentials=creds) # Описание API загружается по сети
+        return _people_service
+
+def report_http_error(err):
+    """Печатает понятное описание ошибки Google API."""
+    print(f"Hypoo: Произошла ошибка при доступе к Google API: {err}")
+    if err.resp.status == 401:
+        print("Hypoo: Ошибка авторизации (401 Unauthorized). Токен недействителен или требует обновления.")
+    elif err.resp.status == 403:
+        print("Hypoo: Ошибка доступа (403 Forbidden). Проверьте разрешения API.")
+
+def get_google_contacts(raw_sink=None):
+    """
+    Функция для получения контактов из Google People API.
+    Если задан raw_sink (см. iter_google_contacts), сырые данные уходят в него, а не хранятся в списке.
+    """
+    try:
+        service = get_people_service()
+        if service is None:
+            return None
 
         print("Hypoo: Запрос контактов из Google People API...")
 
-        # Выполняем запрос на получение списка контактов
-        # 'readGroup=myContacts' фильтрует контакты только из группы "Мои контакты"
-        # 'pageSize' определяет количество контактов на одной странице (максимум 1000)
-        # 'requestMask.includeField' позволяет запрашивать данные только для указанных полей (для оптимизации)
-        results = service.people().connections().list(
-            resourceName='people/me',
-            pageSize=1000, # Максимальное количество контактов за один запрос
-            personFields='names,emailAddresses,phoneNumbers,photos,userDefined,memberships,metadata',
-            sortOrder='ALPHABETICAL_ASCENDING' # Сортировка по алфавиту
-            # readGroup='myContacts' # Можно использовать для фильтрации по группе "Мои контакты"
-        ).execute()
-
-        connections = results.get('connections', [])
-        contact_list = []
-
-        if not connections:
+        # Полный список без syncToken: проходим все страницы по PAGE_SIZE контактов
+        contact_list = list(iter_google_contacts(service, sync_token_file=None, raw_sink=raw_sink))
+
+        if not contact_list:
             print("Hypoo: Контакты не найдены в вашей учетной записи Google.")
             return []
         else:
-            print(f"Hypoo: Найдено {len(connections)} контактов. Обработка...")
-            for person in connections:
-                # Извлекаем нужные поля
-                name = person.get('names', [{}])[0].get('displayName', 'Без имени')
-                emails = [e.get('value') for e in person.get('emailAddresses', []) if e.get('value')]
-                phones = [p.get('value') for p in person.get('phoneNumbers', []) if p.get('value')]
-                user_id = person.get('metadata', {}).get('sources', [{}])[0].get('id') # User ID
-                
-                # Здесь можно добавить логику для извлечения других полей, например, групп (memberships)
-                # memberships = [m.get('contactGroupMembership', {}).get('contactGroupResourceName') for m in person.get('memberships', []) if m.get('contactGroupMembership')]
-                
-                contact_info = {
-                    'name': name,
-                    'emails': emails,
-                    'phones': phones,
-                    'user_id': user_id, # Важный для нас User ID
-                    # 'groups': memberships # Можно добавить, если нужно
-                    'raw_data': person # Можно сохранить сырые данные для полного анализа
-                }
-                contact_list.append(contact_info)
-                # print(f"  Обработан контакт: {name} ({user_id})") # Для отладки
-
+            print(f"Hypoo: Найдено {len(contact_list)} контактов.")
             print("Hypoo: Контакты успешно получены и обработаны для первичного анализа.")
             return contact_list
 
-    except HttpError as err:
-        print(f"Hypoo: Произошла ошибка при доступе к Google API: {err}")
-        if err.resp.status == 401:
-            print("Hypoo: Ошибка авторизации (401 Unauthorized). Токен недействителен или требует обновления.")
-        elif err.resp.status == 403:
-            print("Hypoo: Ошибка доступа (403 Forbidden). Проверьте разрешения API.")
-        return None
     except Exception as e:
-        print(f"Hypoo: Произошла непредвиденная ошибка: {e}")
+        if is_http_error(e):
+            report_http_error(e)
+        else:
+            print(f"Hypoo: Произошла непредвиденная ошибка: {e}")
         return None
 
 if __name__ == '__main__':
@@ -0,0 +1,141 @@
+# --- Скрипт Оценки Контактов Hypoo (is_our_person / ideology_score) ---
+
+# Признаки контактов читаются из базы колонками, частями по SCORING_CHUNK_SIZE строк,
+# превращаются в массивы NumPy, и взвешенные правила применяются ко всей части сразу,
+# без цикла Python по каждому контакту. Результаты записываются обратно через executemany.
+# Пересчитываются только контакты, изменившиеся после прошлого расчета (или все, если изменились правила);
+# их находит частичный индекс idx_contacts_unscored (Hypoo_data_store.create_scoring_index), а не просмотр таблицы.
+
+import argparse
+import json
+import time
+from itertools import repeat
+
+import numpy as np
+
+import Hypoo_data_store as store
+
+SCORING_CHUNK_SIZE = 100_000 # Строк в одной части (и одной транзакции записи)
+
+# Правила оценки по умолчанию: ideology_score - взвешенная сумма признаков,
+# is_our_person = 1 для людей из "сокровищницы" и для всех, чья оценка не ниже порога
+DEFAULT_RULES = {
+    'vault': 10.0, # Человек в "сокровищнице" Эмина
+    'per_email': 0.5, # За каждый email-адрес
+    'per_phone': 0.5, # За каждый телефон
+    'max_addresses': 4, # Больше стольких email-адресов/телефонов не учитывается
+    'domains': {}, # Вес домена основного email, например {'example.com': 1.0}
+    'country_codes': {'+994': 2.0}, # Вес кода страны первого телефона (E.164)
+    'recency': 1.0, # Вес "свежести": убывает от полного до нуля за recency_days дней
+    'recency_days': 365,
+    'threshold': 3.0, # Порог ideology_score, начиная с которого человек "наш"
+}
+
+_FEATURES_SQL = """
+SELECT c.rowid,
+       v.user_id IS NOT NULL,
+       (SELECT COUNT(*) FROM emails AS e WHERE e.user_id = c.user_id),
+       (SELECT COUNT(*) FROM phones AS p WHERE p.user_id = c.user_id),
+       CASE WHEN INSTR(c.primary_email, '@') > 0
+            THEN LOWER(SUBSTR(c.primary_email, INSTR(c.primary_email, '@') + 1)) ELSE '' END,
+       COALESCE((SELECT p.phone_key FROM phones AS p WHERE p.user_id = c.user_id ORDER BY p.phone_id LIMIT 1), ''),
+       COALESCE(JULIANDAY(:now) - JULIANDAY(c.last_updated), 1e9)
+FROM contacts AS c {source}
+LEFT JOIN treasure_vault AS v ON v.user_id = c.user_id
+WHERE c.rowid > :after {condition}
+ORDER BY c.rowid
+LIMIT :limit;
+"""
+
+# Полный пересчет идет по таблице в порядке rowid. Инкрементальный читает только частичный индекс
+# idx_contacts_unscored: без INDEXED BY планировщик выбирает просмотр по rowid ради ORDER BY,
+# и повторный запуск без изменений стоит столько же, сколько просмотр всей таблицы.
+_ALL_FEATURES_SQL = _FEATURES_SQL.format(source='', condition='')
+_CHANGED_FEATURES_SQL = _FEATURES_SQL.format(
+    source='INDEXED BY idx_contacts_unscored',
+    condition='AND (c.scored_at IS NULL OR c.last_updated >= c.scored_at)')
+
+def compute_scores(vault, n_emails, n_phones, domains, phone_keys, age_days, rules=DEFAULT_RULES):
+    """
+    Векторный расчет оценок для части контактов. Все аргументы - массивы одинаковой длины.
+    Возвращает (ideology_score как float64, is_our_person как int64).
+    """
+    cap = rules['max_addresses']
+    vault = np.asarray(vault, dtype=bool)
+    scores = rules['vault'] * vault
+    scores = scores + rules['per_email'] * np.minimum(np.asarray(n_emails, dtype=np.float64), cap)
+    scores += rules['per_phone'] * np.minimum(np.asarray(n_phones, dtype=np.float64), cap)
+
+    if rules['domains']:
+        domains = np.asarray(domains, dtype=str)
+        for domain, weight in rules['domains'].items():
+            scores += weight * (domains == domain.lower())
+    if rules['country_codes']:
+        phone_keys = np.asarray(phone_keys, dtype=str)
+        for code, weight in rules['country_codes'].items():
+            scores += weight * np.char.startswith(phone_keys, code)
+
+    freshness = 1.0 - np.asarray(age_days, dtype=np.float64) / rules['recency_days']
+    scores += rules['recency'] * np.clip(freshness, 0.0, 1.0)
+
+    our_person = (vault | (scores >= rules['threshold'])).astype(np.int64)
+    return scores, our_person
+
+def score_contacts(conn, rules=None, chunk_size=SCORING_CHUNK_SIZE, full=False):
+    """
+    Пересчитывает is_our_person и ideology_score.
+
+    Обрабатываются контакты, у которых оценки еще нет или которые изменились после нее
+    (last_updated >= scored_at), а также добавленные в "сокровищницу". Если правила отличаются
+    от использованных в прошлый раз, или full=True, пересчитываются все контакты
+    (например, для периодического обновления признака "свежести").
+
+    :param rules: Изменения к DEFAULT_RULES.
+    :return: Словарь {'scored': ..., 'our_people': ..., 'full': ..., 'seconds': ...}.
+    """
+    rules = dict(DEFAULT_RULES, **(rules or {}))
+    rules_key = json.dumps(rules, sort_keys=True, ensure_ascii=False)
+    if store.get_meta(conn, 'scoring_rules') != rules_key:
+        full = True
+
+    started = time.perf_counter()
+    now = conn.execute("SELECT DATETIME('now');").fetchone()[0]
+    if full:
+        # Каждая запись оценки убирала бы строку из индекса изменившихся контактов (~20% времени полного
+        # пересчета); дешевле удалить индекс и построить заново по почти пустому результату
+        store.drop_scoring_index(conn)
+    after = 0
+    scored = our_people = 0
+    try:
+        while True:
+            rows = conn.execute(_ALL_FEATURES_SQL if full else _CHANGED_FEATURES_SQL,
+                                {'now': now, 'after': after, 'limit': chunk_size}).fetchall()
+            if not rows:
+                break
+            rowids, vault, n_emails, n_phones, domains, phone_keys, age_days = zip(*rows)
+            after = rowids[-1]
+
+            scores, our_person = compute_scores(vault, n_emails, n_phones, domains, phone_keys, age_days, rules)
+            with conn:
+                conn.executemany("UPDATE contacts SET ideology_score = ?, is_our_person = ?, scored_at = ? WHERE rowid = ?;",
+                                 zip(scores.tolist(), our_person.tolist(), repeat(now), rowids))
+            scored += len(rowids)
+            our_people += int(our_person.sum())
+    finally:
+        store.create_scoring_index(conn)
+
+    with conn:
+        store.set_meta(conn, 'scoring_rules', rules_key)
+    elapsed = time.perf_counter() - started
+    print(f"Hypoo: Оценено контактов: {scored} (из них 'наших': {our_people}) за {elapsed:.2f} с"
+          f"{' (полный пересчет)' if full else ''}.")
+    return {'scored': scored, 'our_people': our_people, 'full': full, 'seconds': elapsed}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Расчет is_our_person и ideology_score для контактов Hypoo')
+    parser.add_argument('--db', default=store.DB_NAME, help='Путь к файлу базы данных')
+    parser.add_argument('--full', action='store_true', help='Пересчитать все контакты')
+    args = parser.parse_args()
+
+    with store.HypooStore(args.db) as hypoo, hypoo.writer() as conn:
+        score_contacts(conn, full=args.full)
@@ -0,0 +1,214 @@
+# --- Скрипт Синхронизации Контактов Hypoo (Google People API -> хранилище) ---
+
+# Получение страниц (сеть) и запись в SQLite (диск) идут параллельно:
+# производитель в вызывающем потоке получает и разбирает страницы контактов,
+# отдельный поток-писатель забирает пачки из ограниченной очереди и записывает их в базу.
+# Если писатель не успевает, очередь заполняется и производитель ждет (обратное давление).
+
+import argparse
+import os
+import queue
+import threading
+import time
+
+import Hypoo_data_store as store
+import Hypoo_get_conract as fetch
+
+SYNC_BATCH_SIZE = 500 # Контактов в одной пачке (и одной транзакции записи)
+SYNC_QUEUE_SIZE = 8 # Сколько пачек может ждать записи, прежде чем производитель остановится
+
+_DONE = object() # Маркер конца потока пачек
+
+def _discard_raw(user_id, person):
+    """Приемник сырых данных, который их просто отбрасывает."""
+
+def _put(batches, item, stop):
+    """Кладет item в очередь, ожидая места; возвращает False, если писатель уже остановился."""
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _abort(batches, error):
+    """
+    Передает писателю error, не дожидаясь места в очереди: ждущие записи пачки выбрасываются,
+    писатель прерывает sync_contacts до удаления "пропавших" контактов.
+    """
+    while True:
+        try:
+            batches.get_nowait()
+        except queue.Empty:
+            break
+    batches.put_nowait(error) # Кладет в очередь только этот поток, так что место теперь есть
+
+def _write(hypoo, batches, stats, batch_size, store_raw, result):
+    """
+    Поток-писатель: на время синхронизации единственный владелец соединения записи.
+    Передает контакты из очереди в sync_contacts и сохраняет сырые данные в 'raw_people'.
+    """
+    timings = result['write_seconds']
+
+    def drain(item, raw_sink):
+        while True:
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item # sync_contacts прервется до удаления "пропавших" контактов
+            started = time.perf_counter()
+            for contact_info in item:
+                person = contact_info.pop('raw_data', None)
+                if store_raw and person is not None:
+                    raw_sink(contact_info['user_id'], person)
+                yield contact_info
+            timings.append(time.perf_counter() - started)
+            item = batches.get()
+
+    try:
+        with hypoo.writer() as conn:
+            # Первая пачка приходит только после первой успешной страницы, так что к этому моменту
+            # уже известно, полная ли синхронизация (в том числе после истечения syncToken)
+            first = batches.get()
+            delete_missing = stats.get('full_sync', False)
+            with store.RawPeopleSink(conn, batch_size) as raw_sink:
+                result['summary'] = store.sync_contacts(conn, drain(first, raw_sink),
+                                                        delete_missing=delete_missing, batch_size=batch_size)
+    except BaseException as e:
+        result['error'] = e
+    finally:
+        result['stop'].set()
+
+def sync(hypoo, service=None, sync_token_file=fetch.SYNC_TOKEN_FILE, batch_size=SYNC_BATCH_SIZE,
+         queue_size=SYNC_QUEUE_SIZE, store_raw=True):
+    """
+    Синхронизирует контакты Google с хранилищем hypoo (HypooStore).
+
+    Страницы People API получаются и разбираются в текущем потоке и пачками по batch_size
+    передаются через очередь на queue_size пачек потоку-писателю, который записывает только
+    изменения (sync_contacts). При полной синхронизации удаляются контакты, пропавшие из Google;
+    при инкрементальной (по syncToken) - только помеченные как удаленные. Новый syncToken
+    сохраняется в sync_token_file только после успешной записи всех контактов.
+
+    :param service: Сервис People API; по умолчанию создается из TOKEN_FILE.
+    :param store_raw: Сохранять ли сырые объекты Person в 'raw_people'.
+    :return: Словарь со сводкой sync_contacts и статистикой или None при ошибке.
+    """
+    if service is None:
+        service = fetch.get_people_service()
+        if service is None:
+            return None
+
+    batches = queue.Queue(maxsize=queue_size)
+    stats = {}
+    result = {'write_seconds': [], 'stop': threading.Event()}
+    writer = threading.Thread(target=_write, name='hypoo-sync-writer',
+                              args=(hypoo, batches, stats, batch_size, store_raw, result))
+    started = time.perf_counter()
+    queue_wait = 0.0
+    writer.start()
+
+    def hand_over(item):
+        nonlocal queue_wait
+        waited = time.perf_counter()
+        delivered = _put(batches, item, result['stop'])
+        queue_wait += time.perf_counter() - waited
+        return delivered
+
+    try:
+        batch = []
+        contacts = fetch.iter_google_contacts(service, sync_token_file=sync_token_file, stats=stats,
+                                              raw_sink=None if store_raw else _discard_raw)
+        for contact_info in contacts:
+            batch.append(contact_info)
+            if len(batch) >= batch_size:
+                if not hand_over(batch):
+                    break
+                batch = []
+        else:
+            if batch:
+                hand_over(batch)
+            hand_over(_DONE)
+    except Exception as e:
+        hand_over(e)
+    except BaseException as e:
+        # KeyboardInterrupt, SystemExit: писатель останавливается без удаления контактов и без
+        # сохранения syncToken, а само прерывание уходит вызывающему
+        _abort(batches, e)
+        writer.join()
+        raise
+    writer.join()
+    elapsed = time.perf_counter() - started
+
+    error = result.get('error')
+    if error is not None:
+        if fetch.is_http_error(error):
+            fetch.report_http_error(error)
+        else:
+            print(f"Hypoo: Синхронизация прервана ошибкой: {error}")
+        return None
+    if stats.get('next_sync_token'):
+        # Только теперь все изменения записаны: следующая синхронизация может начинаться с нового токена
+        fetch.save_sync_token(stats['next_sync_token'], sync_token_file)
+
+    timings = result['write_seconds']
+    contacts_count = stats.get('contacts', 0)
+    avg_write_ms = sum(timings) / len(timings) * 1000 if timings else 0.0
+    max_write_ms = max(timings) * 1000 if timings else 0.0
+    print(f"Hypoo: Синхронизация завершена ({'полная' if stats.get('full_sync') else 'инкрементальная'}): "
+          f"страниц {stats.get('pages', 0)}, контактов {contacts_count} за {elapsed:.2f} с "
+          f"({contacts_count / elapsed if elapsed else 0:.0f} контактов/с), "
+          f"запись пачки: средн. {avg_write_ms:.1f} мс, макс. {max_write_ms:.1f} мс, "
+          f"ожидание очереди {queue_wait:.2f} с.")
+    return {
+        'summary': result['summary'],
+        'pages': stats.get('pages', 0),
+        'contacts': contacts_count,
+        'full_sync': stats.get('full_sync'),
+        'seconds': elapsed,
+        'contacts_per_second': contacts_count / elapsed if elapsed else 0.0,
+        'avg_write_ms': avg_write_ms,
+        'max_write_ms': max_write_ms,
+        'queue_wait_seconds': queue_wait,
+    }
+
+def print_status(hypoo, sync_token_file=fetch.SYNC_TOKEN_FILE):
+    """Печатает сводку по хранилищу (без обращения к Google)."""
+    status = hypoo.status()
+    print(f"Hypoo: Контактов: {status['contacts']}, email: {status['emails']}, телефонов: {status['phones']}, "
+          f"в 'сокровищнице': {status['treasure_vault']}, сырых записей: {status['raw_people']}.")
+    print(f"Hypoo: Последнее обновление: {status['last_updated'] or 'никогда'}; "
+          f"следующая синхронизация: {'инкрементальная' if fetch.load_sync_token(sync_token_file) else 'полная'}.")
+
+def print_lookup(hypoo, query):
+    """Печатает контакты, которым принадлежит номер телефона или email-адрес query (без обращения к Google)."""
+    found = hypoo.find_by_email(query) if '@' in query else hypoo.find_by_phone(query)
+    if not found:
+        print(f"Hypoo: '{query}' не найден среди контактов.")
+    for contact in found:
+        relationship = f", в 'сокровищнице': {contact['relationship']}" if contact['relationship'] else ''
+        print(f"Hypoo: '{query}' -> {contact['name']} ({contact['user_id']}){relationship}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Синхронизация контактов Google с хранилищем Hypoo')
+    parser.add_argument('--db', default=store.DB_NAME, help='Путь к файлу базы данных')
+    commands = parser.add_subparsers(dest='command')
+    sync_parser = commands.add_parser('sync', help='Синхронизировать контакты (команда по умолчанию)')
+    sync_parser.add_argument('--full', action='store_true', help='Игнорировать сохраненный syncToken и выполнить полную синхронизацию')
+    sync_parser.add_argument('--no-raw', action='store_true', help='Не сохранять сырые данные Person')
+    commands.add_parser('status', help='Показать состояние хранилища')
+    lookup_parser = commands.add_parser('lookup', help='Найти контакт по телефону или email')
+    lookup_parser.add_argument('query', help='Номер телефона или email-адрес')
+    args = parser.parse_args()
+
+    with store.HypooStore(args.db) as hypoo:
+        if args.command == 'status':
+            print_status(hypoo)
+        elif args.command == 'lookup':
+            print_lookup(hypoo, args.query)
+        else:
+            if getattr(args, 'full', False) and os.path.exists(fetch.SYNC_TOKEN_FILE):
+                os.remove(fetch.SYNC_TOKEN_FILE)
+            if sync(hypoo, store_raw=not getattr(args, 'no_raw', False)) is None:
+                print("Hypoo: Не удалось синхронизировать контакты.")
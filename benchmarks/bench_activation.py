@@ -0,0 +1,66 @@
+# --- Бенчмарк распространения активации semantic_activation ---
+#
+# Запуск: python benchmarks/bench_activation.py [--concepts 100000] [--edges 1000000]
+# Измеряет построение матрицы CSR, полный расчет от нескольких затравок и от зарядов всех понятий,
+# и пересчет (update) после изменения нескольких затравок.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semantic_activation
+import semantic_field
+
+RELATIONSHIP_TYPES = ["related_to", "implies", "supports", "leads_to", "component_of"]
+
+def random_field(concepts, edges, seed=0):
+    rng = random.Random(seed)
+    graph = semantic_field.ConceptGraph()
+    units = [semantic_field.ConceptUnit(f"слово_{i}", f"C{i}", initial_value=rng.random(), graph=graph)
+             for i in range(concepts)]
+    for _ in range(edges):
+        units[rng.randrange(concepts)].add_connection(units[rng.randrange(concepts)],
+                                                      rng.choice(RELATIONSHIP_TYPES), rng.random())
+    return graph, units
+
+def report(name, result):
+    print(f"{name:<34} {result.seconds:7.3f} с, шагов {result.iterations:3d}, сошлось: {result.converged}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Распространение активации по смысловому полю')
+    parser.add_argument('--concepts', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=1_000_000)
+    parser.add_argument('--seeds', type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph, units = random_field(args.concepts, args.edges)
+    print(f"Поле: {args.concepts} понятий, {args.edges} связей, построено за {time.perf_counter() - start:.1f} с")
+
+    rng = random.Random(1)
+    seeds = {unit: 1.0 for unit in rng.sample(units, args.seeds)}
+    engine = semantic_activation.ActivationEngine(graph)
+    start = time.perf_counter()
+    engine.build()
+    print(f"{'Матрица CSR':<34} {time.perf_counter() - start:7.3f} с")
+
+    report(f"Полный расчет, {args.seeds} затравок", engine.run(seeds))
+    report("Полный расчет, заряды всех понятий", engine.run())
+
+    engine.run(seeds)
+    changed = dict(seeds)
+    for unit in rng.sample(units, 3):
+        changed[unit] = 1.0
+    report("update: +3 затравки", engine.update(changed))
+    full = engine.run(changed)
+    report("  (то же полным расчетом)", full)
+
+    typed = semantic_activation.ActivationEngine(graph, relationship_types=["implies", "leads_to"])
+    report("Только implies/leads_to", typed.run(seeds))
+
+if __name__ == '__main__':
+    main()
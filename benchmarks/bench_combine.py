@@ -0,0 +1,62 @@
+# --- Бенчмарк объединения понятий (combine_concepts / combine_many) ---
+#
+# Запуск: python benchmarks/bench_combine.py [--concepts 10000] [--requests 200000] [--distinct 5000]
+# Нагрузка с сильными повторами: пары для объединения выбираются из --distinct различных пар
+# по закону Ципфа (несколько пар объединяют очень часто, большинство - редко). Сравниваются
+# объединение по одной паре и пакетное combine_many, без кеша и с кешем: время, рост поля и доля попаданий.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semantic_field
+
+def make_field(concepts, seed=0):
+    rng = random.Random(seed)
+    graph = semantic_field.ConceptGraph()
+    units = [semantic_field.ConceptUnit(f"слово_{i}", f"C{i}", f"описание {i}", rng.random(), graph=graph)
+             for i in range(concepts)]
+    return graph, units
+
+def zipf_workload(units, requests, distinct, seed=1):
+    """Пары индексов: i-я по частоте пара встречается с весом 1 / (i + 1)."""
+    rng = random.Random(seed)
+    pairs = [(rng.randrange(len(units)), rng.randrange(len(units))) for _ in range(distinct)]
+    weights = [1.0 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(pairs, weights=weights, k=requests)
+
+def main():
+    parser = argparse.ArgumentParser(description='Объединение понятий с кешем составных понятий')
+    parser.add_argument('--concepts', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200_000)
+    parser.add_argument('--distinct', type=int, default=5_000, help='Различных пар в нагрузке')
+    parser.add_argument('--cache-size', type=int, default=semantic_field.COMBINE_CACHE_SIZE)
+    parser.add_argument('--batch', type=int, default=10_000, help='Пар в одном вызове combine_many')
+    args = parser.parse_args()
+
+    print(f"{args.requests} объединений, {args.distinct} различных пар, поле из {args.concepts} понятий")
+
+    def run(name, combine):
+        graph, units = make_field(args.concepts)
+        workload = [(units[a], units[b]) for a, b in zipf_workload(units, args.requests, args.distinct)]
+        cache = semantic_field.CompositionCache(args.cache_size)
+        start = time.perf_counter()
+        combine(workload, cache)
+        elapsed = time.perf_counter() - start
+        hit_rate = f"{cache.hit_rate:6.1%}" if cache.hits + cache.misses else "     -"
+        print(f"{name:<26} {elapsed:6.2f} с, новых понятий {len(graph) - args.concepts:7d}, "
+              f"связей {graph.edge_count:7d}, попаданий {hit_rate}")
+
+    run("По одной паре без кеша", lambda workload, cache: [semantic_field.combine_concepts(a, b, cache=None) for a, b in workload])
+    run("combine_many без кеша", lambda workload, cache: [
+        semantic_field.combine_many(workload[i:i + args.batch], cache=None) for i in range(0, len(workload), args.batch)])
+    run("По одной паре с кешем", lambda workload, cache: [semantic_field.combine_concepts(a, b, cache=cache) for a, b in workload])
+    run("combine_many с кешем", lambda workload, cache: [
+        semantic_field.combine_many(workload[i:i + args.batch], cache=cache) for i in range(0, len(workload), args.batch)])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# --- Общие части бенчмарков Hypoo: генераторы данных, замер, профилирование, JSON-результаты ---
+#
+# Используется bench_suite.py и отдельными бенчмарками. Результат замера - словарь
+# {"ops", "seconds", "ops_per_sec", "us_per_op", ...}; результаты прогона пишутся в JSON
+# вместе с описанием окружения, чтобы их можно было сравнить с прогоном до изменения (compare_results).
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+RELATIONSHIP_TYPES = ["related_to", "implies", "supports", "leads_to", "component_of", "is_a", "has_part", "causes"]
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+PROFILE_TOP = 15 # Сколько строк профиля печатать и сохранять
+
+# --- Генераторы данных ---
+
+def synthetic_contacts(count, suffix=''):
+    """Контакты с одним email и двумя телефонами у каждого (формат parse_person без raw_data)."""
+    for i in range(count):
+        yield {
+            'user_id': f'bench_{i}',
+            'name': f'Контакт {i}{suffix}',
+            'primary_email': f'user{i}@example.com',
+            'primary_phone': f'+99450{i:07d}',
+            'emails': [f'user{i}@example.com'],
+            'phones': [f'+99450{i:07d}', f'055 {i:07d}'],
+        }
+
+def random_edges(concepts, edges, seed=0):
+    """Случайные связи (источник, цель, тип, сила) между номерами понятий 0..concepts-1."""
+    rng = random.Random(seed)
+    for _ in range(edges):
+        yield rng.randrange(concepts), rng.randrange(concepts), rng.choice(RELATIONSHIP_TYPES), rng.random()
+
+def random_field(concepts, edges=0, seed=0):
+    """Случайное смысловое поле: (ConceptGraph, список его единиц) с edges случайными связями."""
+    import semantic_field
+
+    rng = random.Random(seed)
+    graph = semantic_field.ConceptGraph()
+    units = graph.add_concepts((f"C{i}", f"слово_{i}", None, rng.random()) for i in range(concepts))
+    if edges:
+        sources, targets, types, strengths = zip(*random_edges(concepts, edges, seed))
+        graph.add_edges(sources, targets, [graph.type_code(name) for name in types], strengths)
+    return graph, units
+
+def gateway_requests(count, size=0, seed=0):
+    """JSON-строки запросов шлюза: числовые операции над числами (size=0) или над списками длины size."""
+    rng = random.Random(seed)
+    operations = ["add", "multiply", "subtract", "divide"]
+    requests = []
+    for i in range(count):
+        if size:
+            num1 = [round(rng.uniform(-100, 100), 3) for _ in range(size)]
+            num2 = [round(rng.uniform(-100, 100), 3) for _ in range(size)]
+        else:
+            num1, num2 = rng.randint(-1000, 1000), rng.randint(1, 1000)
+        requests.append(json.dumps({"id": i, "operation": rng.choice(operations), "num1": num1, "num2": num2}))
+    return requests
+
+# --- Замер ---
+
+def measure(run, ops, profile=None, profile_path=None):
+    """
+    Выполняет run() один раз и возвращает словарь результата для ops операций.
+
+    :param profile: None, 'cprofile' (время по функциям) или 'tracemalloc' (пик памяти и места выделений).
+                    Профилирование замедляет run, поэтому такие результаты не стоит сравнивать с обычными.
+    :param profile_path: Куда сохранить статистику cProfile (для snakeviz, pstats и т.п.).
+    """
+    profiler = None
+    if profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif profile == 'tracemalloc':
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        if profile == 'tracemalloc':
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+    finally:
+        # Если run() упал, профилирование все равно останавливается и не мешает следующим замерам
+        if profiler is not None:
+            profiler.disable()
+        elif profile == 'tracemalloc':
+            tracemalloc.stop()
+
+    result = {"ops": ops, "seconds": round(seconds, 6),
+              "ops_per_sec": round(ops / seconds, 1) if seconds else None,
+              "us_per_op": round(seconds / ops * 1e6, 3) if ops else None}
+    if profiler is not None:
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        if profile_path:
+            stats.dump_stats(profile_path)
+            result["profile_file"] = profile_path
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+        result["profile"] = stream.getvalue()
+    elif profile == 'tracemalloc':
+        result["peak_mib"] = round(peak / 2**20, 2)
+        result["top_allocations"] = [f"{stat.size / 2**20:.2f} МиБ {stat.traceback}"
+                                     for stat in snapshot.statistics('lineno')[:PROFILE_TOP]]
+    return result
+
+# --- JSON-результаты ---
+
+def environment():
+    """Описание окружения прогона (сравнивать имеет смысл только прогоны в одинаковом окружении)."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def write_results(path, results, **meta):
+    """Пишет {"meta": ..., "results": {имя: результат}} в path ('-' - в stdout)."""
+    document = {"meta": dict(environment(), **meta), "results": results}
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    if path == '-':
+        print(text)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compare_results(results, baseline, threshold=0.1):
+    """
+    Сравнивает ops_per_sec результатов с прежним прогоном baseline (словарь из write_results/load_results).
+    Возвращает список строк отчета и список имен, у которых скорость упала больше чем на threshold.
+    """
+    previous = baseline.get("results", {})
+    lines, regressions = [], []
+    for name, result in results.items():
+        old = previous.get(name, {}).get("ops_per_sec")
+        new = result.get("ops_per_sec")
+        if not old or not new:
+            lines.append(f"{name:<34} нет в прежнем прогоне")
+            continue
+        change = new / old - 1
+        mark = ""
+        if change < -threshold:
+            mark = "  <- медленнее"
+            regressions.append(name)
+        elif change > threshold:
+            mark = "  <- быстрее"
+        lines.append(f"{name:<34} {old:14.1f} -> {new:14.1f} оп/с ({change:+7.1%}){mark}")
+    return lines, regressions
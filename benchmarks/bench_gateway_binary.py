@@ -0,0 +1,67 @@
+# --- Бенчмарк двоичного формата шлюза против JSON ---
+#
+# Запуск: python benchmarks/bench_gateway_binary.py [--sizes 10 1000 100000]
+# Для каждого размера массивов сравнивает байты запроса и ответа и процессорное время на запрос
+# (кодирование на стороне клиента + обработка шлюзом + разбор ответа клиентом)
+# для JSON с повтором входных данных, JSON с "echo_inputs": false и двоичного формата gateway_binary.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import gateway_binary
+import python_gateway
+
+def json_round_trip(num1, num2, echo):
+    data = {"id": 1, "operation": "multiply", "num1": num1.tolist(), "num2": num2.tolist()}
+    if not echo:
+        data["echo_inputs"] = False
+    request = json.dumps(data).encode('utf-8')
+    response = python_gateway.handle_line(request).encode('utf-8')
+    np.asarray(json.loads(response)['result'])
+    return len(request), len(response)
+
+def binary_round_trip(num1, num2):
+    request = gateway_binary.encode_request('multiply', num1, num2, 1)
+    response = gateway_binary.handle_frame(request)
+    gateway_binary.decode_response(response)['result']
+    return len(request), len(response)
+
+def measure(round_trip, min_seconds=0.5):
+    """Средние (байты запроса, байты ответа, мс процессорного времени) на запрос."""
+    repeat = 0
+    start = time.process_time()
+    while True:
+        sizes = round_trip()
+        repeat += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_seconds:
+            return sizes[0], sizes[1], elapsed / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Двоичный формат шлюза против JSON: байты и время на запрос')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'элементов':>10} {'формат':<18} {'запрос, байт':>13} {'ответ, байт':>13} {'мс на запрос':>13}")
+    for size in args.sizes:
+        num1 = rng.random(size)
+        num2 = rng.random(size)
+        cases = [
+            ('JSON', lambda: json_round_trip(num1, num2, echo=True)),
+            ('JSON без повтора', lambda: json_round_trip(num1, num2, echo=False)),
+            ('двоичный', lambda: binary_round_trip(num1, num2)),
+        ]
+        for name, round_trip in cases:
+            request_bytes, response_bytes, ms = measure(round_trip)
+            print(f"{size:>10} {name:<18} {request_bytes:>13} {response_bytes:>13} {ms:>13.3f}")
+
+if __name__ == '__main__':
+    main()
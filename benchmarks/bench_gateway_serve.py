@@ -0,0 +1,51 @@
+# --- Бенчмарк шлюза python_gateway: процесс на каждый запрос против постоянного --serve ---
+#
+# Запуск: python benchmarks/bench_gateway_serve.py [--spawn-requests 50] [--serve-requests 20000]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+GATEWAY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python_gateway.py')
+
+def request(i):
+    return json.dumps({"id": i, "operation": "multiply", "num1": i, "num2": 7})
+
+def spawn_per_call(count):
+    """Как в gateway_c#.cs: новый процесс Python с JSON в аргументе на каждый запрос."""
+    start = time.perf_counter()
+    for i in range(count):
+        subprocess.run([sys.executable, GATEWAY, request(i)], check=True, capture_output=True)
+    return count / (time.perf_counter() - start)
+
+def persistent(count):
+    """Один процесс --serve: запрос - строка в stdin, ответ - строка из stdout (по очереди, без конвейера)."""
+    process = subprocess.Popen([sys.executable, GATEWAY, '--serve'], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, text=True, bufsize=1)
+    start = time.perf_counter()
+    for i in range(count):
+        process.stdin.write(request(i) + '\n')
+        process.stdin.flush()
+        response = json.loads(process.stdout.readline())
+        assert response['id'] == i and response['result'] == i * 7
+    rate = count / (time.perf_counter() - start)
+    process.stdin.close()
+    process.wait()
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description='Запросов в секунду через python_gateway')
+    parser.add_argument('--spawn-requests', type=int, default=50)
+    parser.add_argument('--serve-requests', type=int, default=20_000)
+    args = parser.parse_args()
+
+    spawn_rate = spawn_per_call(args.spawn_requests)
+    serve_rate = persistent(args.serve_requests)
+    print(f"процесс на запрос: {spawn_rate:10.1f} запросов/с")
+    print(f"--serve:           {serve_rate:10.1f} запросов/с (в {serve_rate / spawn_rate:.0f} раз быстрее)")
+
+if __name__ == '__main__':
+    main()
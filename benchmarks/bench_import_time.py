@@ -0,0 +1,49 @@
+# --- Бенчмарк времени запуска коротких команд Hypoo ---
+#
+# Запуск: python benchmarks/bench_import_time.py [--repeat 10]
+# Каждое измерение - отдельный процесс интерпретатора; печатается медиана.
+# Строка "библиотеки Google" показывает, сколько стоил бы импорт, если бы он оставался на уровне модуля.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def median_ms(command, repeat, cwd):
+    """Медианное время выполнения команды в миллисекундах."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='Время запуска коротких команд Hypoo')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        python = [sys.executable, '-c']
+        cases = [
+            ('пустой интерпретатор', python + ['pass']),
+            ('import Hypoo_get_conract', python + [f'import sys; sys.path.insert(0, {ROOT!r}); import Hypoo_get_conract']),
+            ('import Hypoo_sync', python + [f'import sys; sys.path.insert(0, {ROOT!r}); import Hypoo_sync']),
+            ('библиотеки Google', python + ['import googleapiclient.discovery, google.oauth2.credentials']),
+            ('Hypoo_sync.py status', [sys.executable, os.path.join(ROOT, 'Hypoo_sync.py'), '--db', db_path, 'status']),
+            ('Hypoo_sync.py lookup', [sys.executable, os.path.join(ROOT, 'Hypoo_sync.py'), '--db', db_path, 'lookup', '+994503451272']),
+        ]
+        for name, command in cases:
+            try:
+                print(f"{name:<28} {median_ms(command, args.repeat, tmp):8.1f} мс")
+            except subprocess.CalledProcessError:
+                print(f"{name:<28} недоступно")
+
+if __name__ == '__main__':
+    main()
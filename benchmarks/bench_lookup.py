@@ -0,0 +1,58 @@
+# --- Бенчмарк обратного поиска Hypoo: find_by_phone / find_by_email / find_many_by_phone ---
+#
+# Запуск: python benchmarks/bench_lookup.py [--contacts 100000] [--lookups 10000]
+# Создает временную базу с синтетическими контактами и измеряет задержку точечного поиска.
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Hypoo_data_store as store
+from bench_common import synthetic_contacts
+
+def per_call_us(func, args_list):
+    """Среднее время одного вызова func в микросекундах."""
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк обратного поиска Hypoo')
+    parser.add_argument('--contacts', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        store.create_tables(conn)
+
+        start = time.perf_counter()
+        written = store.insert_contacts_bulk(conn, synthetic_contacts(args.contacts))
+        print(f"Вставка {written['contacts']} контактов: {time.perf_counter() - start:.2f} с")
+
+        rng = random.Random(42)
+        ids = [rng.randrange(args.contacts) for _ in range(args.lookups)]
+        phones = [(f'+99450{i:07d}',) for i in ids]
+        local_phones = [(f'055 {i:07d}',) for i in ids]
+        emails = [(f'USER{i}@example.com',) for i in ids]
+
+        print(f"find_by_phone (E.164):      {per_call_us(lambda p: store.find_by_phone(conn, p), phones):8.1f} мкс/поиск")
+        print(f"find_by_phone (локальный):  {per_call_us(lambda p: store.find_by_phone(conn, p), local_phones):8.1f} мкс/поиск")
+        print(f"find_by_email:              {per_call_us(lambda e: store.find_by_email(conn, e), emails):8.1f} мкс/поиск")
+
+        batch = [p for (p,) in phones]
+        start = time.perf_counter()
+        result = store.find_many_by_phone(conn, batch)
+        elapsed = time.perf_counter() - start
+        print(f"find_many_by_phone ({len(batch)} номеров): {elapsed * 1e6 / len(batch):8.1f} мкс/номер, найдено {sum(1 for v in result.values() if v)}")
+        conn.close()
+
+if __name__ == '__main__':
+    main()
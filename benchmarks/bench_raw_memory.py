@@ -0,0 +1,57 @@
+# --- Бенчмарк памяти: сырые данные Person в памяти или в таблице raw_people ---
+#
+# Запуск: python benchmarks/bench_raw_memory.py [--people 50000]
+# Каждый режим выполняется в отдельном процессе, чтобы пиковый RSS не смешивался.
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+def peak_rss_mb():
+    """Пиковый RSS текущего процесса в МиБ (ru_maxrss в Linux - в КиБ)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_mode(mode, people):
+    """Получает people контактов от FakePeopleService в заданном режиме и печатает пиковый RSS."""
+    import Hypoo_data_store as store
+    import Hypoo_get_conract as fetch
+    from fake_people import FakePeopleService
+
+    service = FakePeopleService(people)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        if mode == 'memory':
+            contacts = list(fetch.iter_google_contacts(service, sync_token_file=None))
+        else:
+            with store.HypooStore(os.path.join(tmp, 'bench.db'), readers=1) as hypoo:
+                with hypoo.raw_people_sink() as sink:
+                    contacts = list(fetch.iter_google_contacts(service, sync_token_file=None, raw_sink=sink))
+                sample = hypoo.get_raw_person(contacts[0]['user_id'])
+                assert sample['resourceName'] == 'people/c0'
+        elapsed = time.perf_counter() - start
+    print(f"{mode:>6}: {len(contacts)} контактов за {elapsed:.2f} с, "
+          f"пиковый RSS {peak_rss_mb():.1f} МиБ (после импорта {baseline:.1f} МиБ)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Пиковый RSS при хранении сырых данных Person')
+    parser.add_argument('--people', type=int, default=50_000)
+    parser.add_argument('--mode', choices=['memory', 'sink'])
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.people)
+        return
+    for mode in ('memory', 'sink'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, '--people', str(args.people)], check=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# --- Бенчмарк оценки контактов Hypoo_scoring ---
+#
+# Запуск: python benchmarks/bench_scoring.py [--contacts 1000000]
+# Измеряет полный пересчет, повторный запуск без изменений и пересчет после изменения части контактов.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Hypoo_data_store as store
+import Hypoo_scoring as scoring
+
+def synthetic_contacts(count, suffix=''):
+    """Контакты с 1-3 email и 1-2 телефонами, часть - с азербайджанскими номерами."""
+    for i in range(count):
+        country = '+994' if i % 3 else '+7'
+        yield {
+            'user_id': f'bench_{i}',
+            'name': f'Контакт {i}{suffix}',
+            'primary_email': f'user{i}@example{i % 5}.com',
+            'primary_phone': f'{country}50{i:07d}',
+            'emails': [f'user{i}.{k}@example{i % 5}.com' for k in range(1 + i % 3)],
+            'phones': [f'{country}50{i:07d}', f'{country}55{i:07d}'][:1 + i % 2],
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк Hypoo_scoring')
+    parser.add_argument('--contacts', type=int, default=1_000_000)
+    parser.add_argument('--changed', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with store.HypooStore(os.path.join(tmp, 'bench.db'), readers=1) as hypoo, hypoo.writer() as conn:
+            start = time.perf_counter()
+            store.insert_contacts_bulk(conn, synthetic_contacts(args.contacts), batch_size=10_000)
+            print(f"Подготовка {args.contacts} контактов: {time.perf_counter() - start:.1f} с")
+
+            rules = {'domains': {'example1.com': 1.0}}
+            full = scoring.score_contacts(conn, rules)
+            print(f"Полный пересчет:      {full['seconds']:.2f} с ({full['scored'] / full['seconds']:.0f} контактов/с)")
+            again = scoring.score_contacts(conn, rules)
+            print(f"Без изменений:        {again['seconds']:.2f} с, пересчитано {again['scored']}")
+            time.sleep(1) # last_updated имеет точность в одну секунду
+            store.insert_contacts_bulk(conn, synthetic_contacts(args.changed, suffix=' (изменен)'))
+            delta = scoring.score_contacts(conn, rules)
+            print(f"После {args.changed} изменений: {delta['seconds']:.2f} с, пересчитано {delta['scored']}")
+
+if __name__ == '__main__':
+    main()
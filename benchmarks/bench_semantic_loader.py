@@ -0,0 +1,100 @@
+# --- Бенчмарк потоковой загрузки смыслового поля (semantic_loader) ---
+#
+# Запуск: python benchmarks/bench_semantic_loader.py [--concepts 100000] [--edges 1000000] [--format jsonl]
+# Пишет случайное поле во временный файл JSONL или CSV и сравнивает:
+#   - только разбор файла (нижняя граница времени загрузки);
+#   - load_field;
+#   - загрузку по одной записи через конструктор ConceptUnit и add_connection.
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semantic_field
+import semantic_loader
+
+RELATIONSHIP_TYPES = ["related_to", "implies", "supports", "leads_to", "component_of"]
+
+def random_records(concepts, edges, seed=0):
+    rng = random.Random(seed)
+    for i in range(concepts):
+        yield {"concept_id": f"C{i}", "word": f"слово_{i}", "value": round(rng.random(), 4)}
+    for _ in range(edges):
+        yield {"source": f"C{rng.randrange(concepts)}", "target": f"C{rng.randrange(concepts)}",
+               "type": rng.choice(RELATIONSHIP_TYPES), "strength": round(rng.random(), 4)}
+
+def write_file(path, file_format, concepts, edges):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if file_format == 'csv':
+            writer = csv.DictWriter(f, ["concept_id", "word", "value", "source", "target", "type", "strength"])
+            writer.writeheader()
+            writer.writerows(random_records(concepts, edges))
+        else:
+            for record in random_records(concepts, edges):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def parse_only(path, file_format):
+    with open(path, encoding='utf-8', newline='') as f:
+        if file_format == 'csv':
+            for _ in csv.DictReader(f):
+                pass
+        else:
+            decode = json.JSONDecoder().decode
+            for line in f:
+                decode(line)
+
+def load_one_by_one(path, file_format):
+    """Прежний способ: каждая запись - вызов конструктора ConceptUnit или add_connection."""
+    graph = semantic_field.ConceptGraph()
+    with open(path, encoding='utf-8', newline='') as f:
+        records = csv.DictReader(f) if file_format == 'csv' else map(json.loads, f)
+        for record in records:
+            if record.get("source"):
+                source = graph.get(record["source"]) or semantic_field.ConceptUnit(None, record["source"], graph=graph)
+                target = graph.get(record["target"]) or semantic_field.ConceptUnit(None, record["target"], graph=graph)
+                source.add_connection(target, record["type"], float(record["strength"]))
+            else:
+                semantic_field.ConceptUnit(record["word"], record["concept_id"], initial_value=float(record["value"]), graph=graph)
+    return graph
+
+def main():
+    parser = argparse.ArgumentParser(description='Потоковая загрузка смыслового поля из JSONL/CSV')
+    parser.add_argument('--concepts', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--skip-baseline', action='store_true', help='Не измерять загрузку по одной записи')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"field.{args.format}")
+        write_file(path, args.format, args.concepts, args.edges)
+        records = args.concepts + args.edges
+        print(f"{args.concepts} понятий, {args.edges} связей, файл {os.path.getsize(path) / 2**20:.0f} МиБ")
+
+        def report(name, seconds):
+            print(f"{name:<28} {seconds:7.2f} с, {records / seconds:10.0f} записей/с")
+
+        start = time.perf_counter()
+        parse_only(path, args.format)
+        report("Только разбор", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        graph = semantic_loader.load_field(path)
+        report("load_field", time.perf_counter() - start)
+        assert graph.edge_count == args.edges
+        del graph
+
+        if not args.skip_baseline:
+            start = time.perf_counter()
+            load_one_by_one(path, args.format)
+            report("По одной записи", time.perf_counter() - start)
+
+if __name__ == '__main__':
+    main()
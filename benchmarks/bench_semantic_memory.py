@@ -0,0 +1,74 @@
+# --- Бенчмарк памяти смыслового поля semantic_field ---
+#
+# Запуск: python benchmarks/bench_semantic_memory.py [--concepts 100000] [--edges 1000000]
+# Сравнивает память (tracemalloc) поля ConceptGraph со столбцами связей и прежнего устройства,
+# где каждая единица - объект с __dict__, а каждая связь - отдельный словарь в ее списке.
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semantic_field
+
+RELATIONSHIP_TYPES = ["related_to", "implies", "supports", "leads_to", "component_of", "is_a", "has_part", "causes"]
+
+class LegacyConceptUnit:
+    """Прежнее устройство ConceptUnit: атрибуты в __dict__, связи - список словарей."""
+
+    def __init__(self, word_representation, concept_id, description=None, initial_value=0.0):
+        self.word = word_representation
+        self.concept_id = concept_id
+        self.description = description
+        self.value = initial_value
+        self.connections = []
+
+    def add_connection(self, other_concept_unit, relationship_type="related_to", strength=1.0):
+        self.connections.append({"concept": other_concept_unit, "type": relationship_type, "strength": strength})
+
+def random_edges(concepts, edges, seed=0):
+    rng = random.Random(seed)
+    for _ in range(edges):
+        yield rng.randrange(concepts), rng.randrange(concepts), rng.choice(RELATIONSHIP_TYPES), rng.random()
+
+def build_legacy(concepts, edges):
+    units = [LegacyConceptUnit(f"слово_{i}", f"C{i}") for i in range(concepts)]
+    for source, target, relationship_type, strength in random_edges(concepts, edges):
+        units[source].add_connection(units[target], relationship_type, strength)
+    return units
+
+def build_graph(concepts, edges):
+    graph = semantic_field.ConceptGraph()
+    units = [semantic_field.ConceptUnit(f"слово_{i}", f"C{i}", graph=graph) for i in range(concepts)]
+    for source, target, relationship_type, strength in random_edges(concepts, edges):
+        units[source].add_connection(units[target], relationship_type, strength)
+    return graph
+
+def measure(build, concepts, edges):
+    """(МиБ, секунды) на построение поля."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    field = build(concepts, edges)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del field
+    return size / 2**20, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Память смыслового поля: столбцы связей против словарей')
+    parser.add_argument('--concepts', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{args.concepts} понятий, {args.edges} связей")
+    for name, build in (('прежнее (словари)', build_legacy), ('ConceptGraph', build_graph)):
+        mib, seconds = measure(build, args.concepts, args.edges)
+        print(f"{name:<20} {mib:8.1f} МиБ ({mib * 2**20 / args.edges:6.1f} байт на связь), построение {seconds:.1f} с")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# --- Бенчмарк хранения смыслового поля в SQLite (semantic_store) ---
+#
+# Запуск: python benchmarks/bench_semantic_store.py [--concepts 100000] [--edges 1000000]
+# Измеряет сохранение поля одной транзакцией, полную загрузку и обход в ширину через
+# LazyConceptGraph с небольшим кешем (память - по tracemalloc).
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Hypoo_data_store as store
+import semantic_field
+import semantic_store
+
+RELATIONSHIP_TYPES = ["related_to", "implies", "supports", "leads_to", "component_of"]
+
+def random_field(concepts, edges, seed=0):
+    rng = random.Random(seed)
+    graph = semantic_field.ConceptGraph()
+    units = [semantic_field.ConceptUnit(f"слово_{i}", f"C{i}", f"описание {i}", rng.random(), graph=graph)
+             for i in range(concepts)]
+    for _ in range(edges):
+        units[rng.randrange(concepts)].add_connection(units[rng.randrange(concepts)],
+                                                      rng.choice(RELATIONSHIP_TYPES), rng.random())
+    return graph
+
+def breadth_first(graph, start_id, limit):
+    """Обходит поле в ширину от start_id, пока не посетит limit понятий."""
+    start = graph.get(start_id)
+    seen = {start.concept_id}
+    queue = [start]
+    while queue and len(seen) < limit:
+        unit = queue.pop(0)
+        for connection in unit.get_connections():
+            other = connection['concept']
+            if other.concept_id not in seen:
+                seen.add(other.concept_id)
+                queue.append(other)
+    return len(seen)
+
+def main():
+    parser = argparse.ArgumentParser(description='Сохранение, загрузка и ленивый обход смыслового поля в SQLite')
+    parser.add_argument('--concepts', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=1_000_000)
+    parser.add_argument('--visit', type=int, default=20_000, help='Сколько понятий посетить при обходе')
+    parser.add_argument('--cache-edges', type=int, default=50_000)
+    args = parser.parse_args()
+
+    graph = random_field(args.concepts, args.edges)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        conn = store.create_connection(db_path)
+
+        start = time.perf_counter()
+        semantic_store.save_graph(conn, graph)
+        print(f"Сохранение:     {time.perf_counter() - start:6.2f} с, файл {os.path.getsize(db_path) / 2**20:.0f} МиБ")
+        start = time.perf_counter()
+        semantic_store.save_graph(conn, graph)
+        print(f"Пересохранение: {time.perf_counter() - start:6.2f} с")
+        del graph
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        loaded = semantic_store.load_graph(conn)
+        elapsed = time.perf_counter() - start
+        print(f"Полная загрузка: {elapsed:5.2f} с, {loaded.edge_count} связей, "
+              f"{tracemalloc.get_traced_memory()[0] / 2**20:.0f} МиБ")
+        tracemalloc.stop()
+        del loaded
+
+        tracemalloc.start()
+        lazy = semantic_store.LazyConceptGraph(conn, cache_edges=args.cache_edges)
+        start = time.perf_counter()
+        visited = breadth_first(lazy, 'C0', args.visit)
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Ленивый обход:  {elapsed:6.2f} с, посещено {visited} понятий "
+              f"(попаданий в кеш {lazy.hits}, чтений из базы {lazy.misses}), пик памяти {peak / 2**20:.0f} МиБ")
+        conn.close()
+
+if __name__ == '__main__':
+    main()
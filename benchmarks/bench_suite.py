@@ -0,0 +1,239 @@
+# --- Набор бенчмарков Hypoo с JSON-результатами для сравнения прогонов ---
+#
+# Запуск: python benchmarks/bench_suite.py [--only store. field.] [--scale 1.0] [--repeat 3]
+#                                          [--output results.json] [--compare before.json]
+#                                          [--profile cprofile|tracemalloc] [--profile-dir profiles]
+#
+# Покрывает запись контактов (insert_contact, insert_contacts_bulk), разбор Person
+# (parse_person и get_google_contacts с локальной заменой People API), шлюз (process_data_for_csharp)
+# и смысловое поле (add_connection, get_connections, combine_concepts). Все данные синтетические
+# (bench_common, fake_people), сеть и учетные данные Google не нужны.
+#
+# Сравнение: сохранить результаты до изменения (--output before.json), после изменения запустить
+# с --compare before.json. С --max-regression код возврата 1, если что-то замедлилось сильнее порога.
+# Для подробных бенчмарков отдельных частей см. остальные скрипты benchmarks/.
+
+import argparse
+import contextlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+from bench_common import compare_results, gateway_requests, load_results, measure, random_edges, random_field, \
+    synthetic_contacts, write_results, PROFILE_MODES, RELATIONSHIP_TYPES
+from fake_people import FakePeopleService, fake_person
+
+BENCHMARKS = {} # Имя бенчмарка -> функция подготовки
+
+def benchmark(name):
+    """
+    Регистрирует бенчмарк. Функция подготовки получает (scale, stack) - множитель размеров данных
+    и contextlib.ExitStack для временных файлов и восстановления состояния - и возвращает
+    (run, ops): замеряется только вызов run(), выполняющий ops операций.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def scaled(count, scale):
+    return max(1, int(count * scale))
+
+# --- Запись контактов (Hypoo_data_store) ---
+
+def _temp_connection(stack):
+    import Hypoo_data_store as store
+
+    tmp = stack.enter_context(tempfile.TemporaryDirectory())
+    conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+    stack.callback(conn.close)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        store.create_tables(conn)
+    return conn
+
+@benchmark('store.insert_contact')
+def _store_insert_contact(scale, stack):
+    """По одному контакту на вызов, как в исходном сценарии загрузки."""
+    import Hypoo_data_store as store
+
+    conn = _temp_connection(stack)
+    contacts = list(synthetic_contacts(scaled(2_000, scale)))
+
+    def run():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # insert_contact печатает строку на контакт
+            for contact in contacts:
+                store.insert_contact(conn, contact)
+    return run, len(contacts)
+
+@benchmark('store.insert_contacts_bulk')
+def _store_insert_bulk(scale, stack):
+    import Hypoo_data_store as store
+
+    conn = _temp_connection(stack)
+    contacts = list(synthetic_contacts(scaled(100_000, scale)))
+    return (lambda: store.insert_contacts_bulk(conn, contacts)), len(contacts)
+
+# --- Разбор контактов (Hypoo_get_conract) ---
+
+@benchmark('fetch.parse_person')
+def _fetch_parse_person(scale, stack):
+    """Только parse_person над готовыми объектами Person."""
+    import Hypoo_get_conract as fetch
+
+    people = [fake_person(i) for i in range(scaled(50_000, scale))]
+
+    def run():
+        for person in people:
+            fetch.parse_person(person)
+    return run, len(people)
+
+@benchmark('fetch.get_google_contacts')
+def _fetch_get_google_contacts(scale, stack):
+    """
+    get_google_contacts целиком: страницы по PAGE_SIZE от FakePeopleService (включая создание
+    объектов Person, как при разборе ответа API) и parse_person для каждого контакта.
+    """
+    import Hypoo_get_conract as fetch
+
+    total = scaled(20_000, scale)
+    previous = fetch._people_service
+    fetch._people_service = FakePeopleService(total) # get_people_service вернет заранее созданный сервис
+    stack.callback(setattr, fetch, '_people_service', previous)
+
+    def run():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            contacts = fetch.get_google_contacts()
+        assert len(contacts) == total
+    return run, total
+
+# --- Шлюз (python_gateway) ---
+
+@benchmark('gateway.scalar')
+def _gateway_scalar(scale, stack):
+    import python_gateway
+
+    requests = gateway_requests(scaled(50_000, scale))
+    return (lambda: [python_gateway.process_data_for_csharp(request) for request in requests]), len(requests)
+
+@benchmark('gateway.arrays')
+def _gateway_arrays(scale, stack):
+    """Запросы со списками по 1000 чисел; ops - запросы (элементов в 1000 раз больше)."""
+    import python_gateway
+
+    requests = gateway_requests(scaled(500, scale), size=1000)
+    python_gateway.process_data_for_csharp(requests[0]) # Импорт NumPy не входит в замер
+    return (lambda: [python_gateway.process_data_for_csharp(request) for request in requests]), len(requests)
+
+# --- Смысловое поле (semantic_field) ---
+
+@benchmark('field.add_connection')
+def _field_add_connection(scale, stack):
+    concepts = scaled(10_000, scale)
+    _, units = random_field(concepts)
+    edges = [(units[source], units[target], relationship_type, strength)
+             for source, target, relationship_type, strength in random_edges(concepts, scaled(200_000, scale))]
+
+    def run():
+        for source, target, relationship_type, strength in edges:
+            source.add_connection(target, relationship_type, strength)
+    return run, len(edges)
+
+@benchmark('field.get_connections')
+def _field_get_connections(scale, stack):
+    """Половина запросов - все связи единицы, половина - связи одного типа."""
+    concepts = scaled(10_000, scale)
+    _, units = random_field(concepts, edges=scaled(200_000, scale))
+    rng = random.Random(1)
+    queries = [(rng.choice(units), rng.choice(RELATIONSHIP_TYPES) if i % 2 else None) for i in range(scaled(100_000, scale))]
+
+    def run():
+        for unit, relationship_type in queries:
+            unit.get_connections(relationship_type)
+    return run, len(queries)
+
+@benchmark('field.combine_concepts')
+def _field_combine(scale, stack):
+    """Различные пары без кеша: каждое объединение создает новое составное понятие."""
+    import semantic_field
+
+    _, units = random_field(scaled(10_000, scale))
+    rng = random.Random(2)
+    pairs = [(rng.choice(units), rng.choice(units)) for _ in range(scaled(20_000, scale))]
+    return (lambda: [semantic_field.combine_concepts(a, b, cache=None) for a, b in pairs]), len(pairs)
+
+@benchmark('field.combine_concepts_cached')
+def _field_combine_cached(scale, stack):
+    """Повторяющиеся пары (1000 различных) с кешем составных понятий."""
+    import semantic_field
+
+    _, units = random_field(scaled(10_000, scale))
+    rng = random.Random(3)
+    distinct = [(rng.choice(units), rng.choice(units)) for _ in range(1000)]
+    pairs = [rng.choice(distinct) for _ in range(scaled(100_000, scale))]
+    cache = semantic_field.CompositionCache()
+    return (lambda: [semantic_field.combine_concepts(a, b, cache=cache) for a, b in pairs]), len(pairs)
+
+# --- Запуск ---
+
+def run_benchmark(name, scale, repeat, profile=None, profile_dir=None):
+    """Лучший из repeat замеров (данные готовятся заново перед каждым); с профилированием - один замер."""
+    best = None
+    for _ in range(1 if profile else repeat):
+        with contextlib.ExitStack() as stack:
+            run, ops = BENCHMARKS[name](scale, stack)
+            profile_path = os.path.join(profile_dir, f"{name}.prof") if profile == 'cprofile' and profile_dir else None
+            result = measure(run, ops, profile, profile_path)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+def _number(value, width, digits):
+    """Число для отчета; None (замер слишком короткий или без операций) - прочерк."""
+    return f"{value:{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Набор бенчмарков Hypoo с JSON-результатами')
+    parser.add_argument('--only', nargs='*', default=[], help='Префиксы имен бенчмарков (например store. field.add)')
+    parser.add_argument('--list', action='store_true', help='Только перечислить бенчмарки')
+    parser.add_argument('--scale', type=float, default=1.0, help='Множитель размеров данных')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="Файл JSON для результатов ('-' - stdout)")
+    parser.add_argument('--compare', help='Файл JSON прежнего прогона для сравнения')
+    parser.add_argument('--max-regression', type=float, help='Допустимое замедление в процентах (иначе код возврата 1)')
+    parser.add_argument('--profile', choices=PROFILE_MODES)
+    parser.add_argument('--profile-dir', help='Куда сохранять файлы .prof (для --profile cprofile)')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.only or any(name.startswith(prefix) for prefix in args.only)]
+    if args.list or not names:
+        print("\n".join(BENCHMARKS) if args.list else f"Нет бенчмарков с префиксами {args.only}")
+        return
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+
+    report = sys.stderr if args.output == '-' else sys.stdout
+    results = {}
+    for name in names:
+        result = results[name] = run_benchmark(name, args.scale, args.repeat, args.profile, args.profile_dir)
+        print(f"{name:<34} {result['ops']:9d} оп за {result['seconds']:8.3f} с, "
+              f"{_number(result['ops_per_sec'], 12, 1)} оп/с, {_number(result['us_per_op'], 10, 2)} мкс/оп", file=report)
+        if 'peak_mib' in result:
+            print(f"{'':<34} пик памяти {result['peak_mib']:.1f} МиБ", file=report)
+        if 'profile' in result:
+            print(result['profile'], file=report)
+
+    if args.output:
+        write_results(args.output, results, scale=args.scale, repeat=args.repeat, profile=args.profile)
+    if args.compare:
+        lines, regressions = compare_results(results, load_results(args.compare),
+                                             (10 if args.max_regression is None else args.max_regression) / 100)
+        print(f"\nСравнение с {args.compare}:", file=report)
+        print("\n".join(lines), file=report)
+        if args.max_regression is not None and regressions:
+            print(f"Замедлилось больше чем на {args.max_regression}%: {', '.join(regressions)}", file=report)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# --- Бенчмарк обхода смыслового поля (semantic_traversal) ---
+#
+# Запуск: python benchmarks/bench_traversal.py [--concepts 100000] [--edges 1000000] [--queries 200]
+# Измеряет окрестности радиусом 2 и 3 с ограничением числа понятий, самый сильный и кратчайший
+# путь между случайными парами понятий, и те же запросы повторно (из кеша).
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semantic_field
+import semantic_traversal
+
+RELATIONSHIP_TYPES = ["related_to", "implies", "supports", "leads_to", "component_of"]
+
+def random_field(concepts, edges, seed=0):
+    rng = random.Random(seed)
+    graph = semantic_field.ConceptGraph()
+    units = [semantic_field.ConceptUnit(f"слово_{i}", f"C{i}", graph=graph) for i in range(concepts)]
+    for _ in range(edges):
+        units[rng.randrange(concepts)].add_connection(units[rng.randrange(concepts)],
+                                                      rng.choice(RELATIONSHIP_TYPES), rng.random())
+    return graph, units
+
+def main():
+    parser = argparse.ArgumentParser(description='Окрестности и пути в смысловом поле')
+    parser.add_argument('--concepts', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--budget', type=int, default=semantic_traversal.DEFAULT_NODE_BUDGET)
+    args = parser.parse_args()
+
+    graph, units = random_field(args.concepts, args.edges)
+    rng = random.Random(1)
+    pairs = [(rng.choice(units), rng.choice(units)) for _ in range(args.queries)]
+    traversal = semantic_traversal.ConceptTraversal(graph)
+    print(f"Поле: {args.concepts} понятий, {args.edges} связей; {args.queries} запросов каждого вида")
+
+    def measure(name, query):
+        for attempt in ("", " (кеш)"):
+            start = time.perf_counter()
+            sizes = [query(a, b) for a, b in pairs]
+            elapsed = time.perf_counter() - start
+            print(f"{name + attempt:<40} {elapsed / args.queries * 1000:8.2f} мс на запрос, "
+                  f"в среднем {sum(sizes) / len(sizes):7.1f}")
+
+    measure("Окрестность k=2 (понятий)", lambda a, b: len(traversal.neighborhood(a, 2, node_budget=args.budget)))
+    measure("Окрестность k=3 (понятий)", lambda a, b: len(traversal.neighborhood(a, 3, node_budget=args.budget)))
+    measure("Окрестность k=3, implies (понятий)", lambda a, b: len(traversal.neighborhood(a, 3, "implies", node_budget=args.budget)))
+    measure("Кратчайший путь (связей)", lambda a, b: (traversal.shortest_path(a, b) or ((), 0))[1])
+    measure("Самый сильный путь (связей)", lambda a, b: len((traversal.strongest_path(a, b) or ((a,), 0))[0]) - 1)
+    print(f"Кеш: попаданий {traversal.hits}, промахов {traversal.misses}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# --- Бенчмарк поиска понятий по слову (semantic_words) ---
+#
+# Запуск: python benchmarks/bench_word_index.py [--concepts 1000000] [--queries 2000] [--memory]
+# Слова - случайные сочетания кириллических и латинских слогов (согласная + гласная, иногда с
+# закрывающей согласной) через '_' в разном регистре. Измеряет построение индекса поля, точный поиск
+# (с другим регистром и разделителями), поиск по префиксу, нечеткий поиск слов с опечаткой (и долю
+# запросов, для которых исходное слово попало в top-5) и добавление новых понятий в уже построенный индекс.
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semantic_field
+import semantic_words
+
+CYRILLIC = [c + v for c in "бвгджзклмнпрстфхцчшщ" for v in "аеиоуыэюя"]
+LATIN = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+
+def random_part(rng):
+    syllables = CYRILLIC if rng.random() < 0.7 else LATIN
+    part = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+    return part + rng.choice("нрст") if syllables is CYRILLIC and rng.random() < 0.3 else part
+
+def random_word(rng):
+    parts = [random_part(rng) for _ in range(rng.randint(1, 3))]
+    word = "_".join(parts)
+    return word.upper() if rng.random() < 0.1 else word.capitalize() if rng.random() < 0.3 else word
+
+def typo(rng, word):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice("аеиоуxyz") + word[position + 1:]
+
+def main():
+    parser = argparse.ArgumentParser(description='Точный, префиксный и нечеткий поиск понятий по слову')
+    parser.add_argument('--concepts', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--memory', action='store_true', help='Измерить память индекса (заново строит его под tracemalloc)')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    graph = semantic_field.ConceptGraph()
+    graph.add_concepts((f"C{i}", random_word(rng), None, 0.0) for i in range(args.concepts))
+
+    start = time.perf_counter()
+    words = graph.words
+    elapsed = time.perf_counter() - start
+    print(f"{args.concepts} понятий, {len(words)} различных слов; индекс построен за {elapsed:.1f} с")
+    if args.memory:
+        tracemalloc.start()
+        rebuilt = semantic_words.WordIndex()
+        rebuilt.add_many(graph.nodes)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del rebuilt
+        print(f"Память индекса: {size / 2**20:.0f} МиБ")
+
+    samples = [unit.word for unit in rng.sample(graph.nodes, args.queries)]
+
+    def measure(name, query, inputs):
+        query(inputs[0]) # Первый префиксный запрос сливает недавно добавленные слова
+        start = time.perf_counter()
+        found = sum(len(query(text)) for text in inputs)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<36} {elapsed / len(inputs) * 1e6:8.1f} мкс на запрос, найдено в среднем {found / len(inputs):.1f}")
+
+    measure("Точный (другой регистр и '-')", words.lookup, [word.swapcase().replace("_", "-") for word in samples])
+    measure("Префикс (4 символа, до 10)", words.prefix, [word[:4] for word in samples])
+    measure("Префикс (2 символа, до 10)", words.prefix, [word[:2] for word in samples])
+    for typos in (1, 2):
+        queries = []
+        for word in samples:
+            for _ in range(typos):
+                word = typo(rng, word)
+            queries.append(word)
+        measure(f"Нечеткий ({typos} опечатк{'а' if typos == 1 else 'и'}, top-5)", words.fuzzy, queries)
+        recalled = sum(any(unit.word == word for unit, _ in words.fuzzy(query)) for word, query in zip(samples, queries))
+        print(f"{'':<36} исходное слово в top-5: {recalled / len(samples):.1%}")
+
+    start = time.perf_counter()
+    added = [semantic_field.ConceptUnit(random_word(rng), graph=graph) for _ in range(args.queries)]
+    elapsed = time.perf_counter() - start
+    print(f"{'Добавление понятия в индекс':<36} {elapsed / args.queries * 1e6:8.1f} мкс на понятие (вместе с созданием)")
+    measure("Префикс после добавления", words.prefix, [unit.word[:4] for unit in added])
+
+if __name__ == '__main__':
+    main()
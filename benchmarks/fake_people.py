@@ -0,0 +1,102 @@
+# --- Локальная замена Google People API для бенчмарков Hypoo ---
+#
+# FakePeopleService повторяет цепочку service.people().connections().list(...).execute()
+# и генерирует страницы синтетических объектов Person по запросу, без сети.
+# Каждая страница создается заново при вызове execute(), как при разборе ответа API,
+# поэтому память занимают только те объекты, которые удерживает вызывающий код.
+
+import random
+import time
+
+def fake_person(i, rng=None):
+    """Синтетический объект Person с тем же набором полей, что запрашивает Hypoo_get_conract."""
+    rng = rng or random.Random(i)
+    source = {'type': 'CONTACT', 'id': f'{i:016x}'}
+    field_metadata = {'primary': True, 'source': source}
+    given, family = f'Имя{i}', f'Фамилия{i % 997}'
+    photo_token = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789_-') for _ in range(96))
+    return {
+        'resourceName': f'people/c{i}',
+        'etag': f'%EgcBAgkLLjc9GgQBAgUHIgw{i:08x}',
+        'metadata': {
+            'sources': [dict(source, etag=f'#{i:012x}', updateTime='2024-05-01T10:00:00.000Z')],
+            'objectType': 'PERSON',
+        },
+        'names': [{
+            'metadata': field_metadata,
+            'displayName': f'{given} {family}',
+            'familyName': family,
+            'givenName': given,
+            'displayNameLastFirst': f'{family}, {given}',
+            'unstructuredName': f'{given} {family}',
+        }],
+        'emailAddresses': [
+            {'metadata': field_metadata, 'value': f'user{i}@example.com'},
+        ],
+        'phoneNumbers': [
+            {'metadata': field_metadata, 'value': f'050 {i % 10_000_000:07d}',
+             'canonicalForm': f'+99450{i % 10_000_000:07d}', 'type': 'mobile', 'formattedType': 'Mobile'},
+        ],
+        'photos': [
+            {'metadata': field_metadata, 'url': f'https://lh3.googleusercontent.com/cm/{photo_token}=s100', 'default': True},
+        ],
+        'memberships': [
+            {'metadata': {'source': source}, 'contactGroupMembership': {
+                'contactGroupId': 'myContacts', 'contactGroupResourceName': 'contactGroups/myContacts'}},
+        ],
+    }
+
+class FakePeopleService:
+    """
+    Замена сервиса People API: total контактов, разбитых на страницы по pageSize из запроса.
+    Поддерживает pageToken, requestSyncToken и syncToken (по syncToken отдает changed_ids и deleted_ids).
+    latency - искусственная задержка каждого запроса в секундах (имитация сети).
+    """
+
+    def __init__(self, total, changed_ids=(), deleted_ids=(), latency=0.0):
+        self.total = total
+        self.latency = latency
+        self.changed_ids = list(changed_ids)
+        self.deleted_ids = list(deleted_ids)
+        self.calls = 0
+
+    def people(self):
+        return self
+
+    def connections(self):
+        return self
+
+    def list(self, **kwargs):
+        return _FakeRequest(self, kwargs)
+
+    def page(self, kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        page_size = kwargs.get('pageSize', 100)
+        start = int(kwargs.get('pageToken') or 0)
+        if kwargs.get('syncToken'):
+            ids = self.changed_ids
+            people = [fake_person(i) for i in ids[start:start + page_size]]
+            if start == 0:
+                people += [{'resourceName': f'people/c{i}', 'metadata': {'sources': [{'id': f'{i:016x}'}], 'deleted': True}}
+                           for i in self.deleted_ids]
+            count = len(ids)
+        else:
+            people = [fake_person(i) for i in range(start, min(start + page_size, self.total))]
+            count = self.total
+
+        response = {'connections': people, 'totalItems': count}
+        if start + page_size < count:
+            response['nextPageToken'] = str(start + page_size)
+        elif kwargs.get('requestSyncToken'):
+            response['nextSyncToken'] = f'fake-sync-{self.calls}'
+        return response
+
+class _FakeRequest:
+    def __init__(self, service, kwargs):
+        self.service = service
+        self.kwargs = kwargs
+
+    def execute(self):
+        return self.service.page(self.kwargs)
@@ -0,0 +1,95 @@
+# --- Нагрузочный тест сервера шлюза gateway_server.py ---
+#
+# Запуск: python benchmarks/load_gateway_server.py [--clients 8] [--in-flight 16] [--requests 20000] [--workers 4]
+# Запускает сервер отдельным процессом, затем несколько клиентов (как несколько процессов C#),
+# каждый держит до --in-flight запросов одновременно. Часть запросов - тяжелые (большие массивы),
+# они уходят в пул процессов сервера. Печатается пропускная способность и задержки p50/p99.
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gateway_server
+
+def make_request(rng, heavy_share, heavy_size):
+    if rng.random() < heavy_share:
+        size = heavy_size
+        return 'heavy', {"operation": "multiply", "num1": [rng.random() for _ in range(size)],
+                         "num2": [rng.random() for _ in range(size)]}
+    a, b = rng.randint(1, 1000), rng.randint(1, 1000)
+    return 'light', {"operation": "add", "num1": a, "num2": b}
+
+async def run_client(path, count, in_flight, heavy_share, heavy_size, seed, latencies):
+    client = await gateway_server.GatewayClient.connect(path)
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(in_flight)
+
+    async def one():
+        kind, data = make_request(rng, heavy_share, heavy_size)
+        async with slots:
+            start = time.perf_counter()
+            response = await client.request(data)
+            latencies[kind].append(time.perf_counter() - start)
+        assert response.get('status') == 'success', response
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    await client.close()
+
+async def wait_for_socket(path, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise RuntimeError("сервер шлюза не запустился")
+        await asyncio.sleep(0.05)
+
+def percentile_ms(samples, q):
+    if len(samples) < 2:
+        return sum(samples) * 1000
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1] * 1000
+
+async def load(args, path):
+    await wait_for_socket(path)
+    latencies = {'light': [], 'heavy': []}
+    per_client = args.requests // args.clients
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(path, per_client, args.in_flight, args.heavy_share, args.heavy_size, seed, latencies)
+                           for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    total = per_client * args.clients
+    print(f"клиентов {args.clients}, одновременно {args.in_flight} на клиента, процессов в пуле {args.workers}")
+    print(f"всего запросов {total} за {elapsed:.2f} с: {total / elapsed:10.1f} запросов/с")
+    for kind, samples in latencies.items():
+        print(f"{kind:<6} {len(samples):7d} шт.  p50 {percentile_ms(samples, 50):8.2f} мс  p99 {percentile_ms(samples, 99):8.2f} мс")
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест сервера шлюза на Unix-сокете')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--in-flight', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--heavy-share', type=float, default=0.01, help='Доля тяжелых запросов')
+    parser.add_argument('--heavy-size', type=int, default=5_000, help='Элементов в массивах тяжелого запроса')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'gateway.sock')
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'gateway_server.py'), '--socket', path,
+                                   '--workers', str(args.workers)], stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(load(args, path))
+        finally:
+            server.send_signal(signal.SIGINT) # Сервер сам закроет пул процессов и удалит сокет
+            server.wait()
+
+if __name__ == '__main__':
+    main()
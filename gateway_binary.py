@@ -0,0 +1,146 @@
+# --- Двоичный формат запросов шлюза для больших числовых массивов ---
+
+# Альтернатива JSON для пакетных числовых операций (add/multiply/subtract/divide):
+# небольшой заголовок и сырые буферы little-endian float64/int64 без текстового представления чисел.
+# Python оборачивает буферы запроса в массивы NumPy через numpy.frombuffer без копирования,
+# а ответ не повторяет входные данные - у клиента они и так есть.
+#
+# Формат согласуется по первым байтам кадра: двоичный кадр начинается с MAGIC,
+# JSON-запрос - с '{', поэтому оба формата можно смешивать в одном соединении gateway_server.
+#
+# Запрос (все числа little-endian):
+#   MAGIC (4 байта) | операция (uint8) | тип num1 (uint8) | тип num2 (uint8) | резерв (uint8)
+#   | id запроса (uint64) | элементов num1 (uint32) | элементов num2 (uint32) | буфер num1 | буфер num2
+# Число элементов 1 означает скаляр, который применяется ко всем элементам другого массива.
+#
+# Ответ:
+#   MAGIC | статус (uint8) | тип результата (uint8) | резерв (uint16) | id запроса (uint64)
+#   | элементов результата (uint32) | длина хвоста (uint32) | буфер результата | хвост
+# Хвост: для "partial" - индексы деления на ноль (int64, на этих местах в результате NaN),
+# для "error" - сообщение об ошибке в UTF-8 (результат пуст).
+
+import struct
+import time
+
+import python_gateway
+
+MAGIC = b'HYB1'
+
+# Коды операций в заголовке запроса
+OPERATION_CODES = {'add': 1, 'multiply': 2, 'subtract': 3, 'divide': 4}
+_OPERATIONS = {code: name for name, code in OPERATION_CODES.items()}
+
+# Коды типов элементов: символ типа struct/NumPy
+DTYPE_FLOAT64 = ord('d')
+DTYPE_INT64 = ord('q')
+_DTYPES = {DTYPE_FLOAT64: '<f8', DTYPE_INT64: '<i8'}
+
+# Коды статуса ответа
+STATUS_SUCCESS = 0
+STATUS_PARTIAL = 1
+STATUS_ERROR = 2
+STATUS_NAMES = {STATUS_SUCCESS: "success", STATUS_PARTIAL: "partial", STATUS_ERROR: "error"}
+
+_REQUEST_HEADER = struct.Struct('<4sBBBBQII')
+_RESPONSE_HEADER = struct.Struct('<4sBBHQII')
+
+def is_binary(payload):
+    """Является ли кадр двоичным запросом или ответом (а не JSON)."""
+    return payload[:len(MAGIC)] == MAGIC
+
+def _dtype_code(array):
+    return DTYPE_INT64 if array.dtype.kind in 'iub' else DTYPE_FLOAT64
+
+def encode_request(operation, num1, num2, request_id=0):
+    """
+    Кодирует двоичный запрос. num1 и num2 - числа, списки или массивы NumPy;
+    целые передаются как int64, остальные - как float64.
+    """
+    import numpy as np
+
+    a = np.atleast_1d(np.asarray(num1))
+    b = np.atleast_1d(np.asarray(num2))
+    a = a.astype(_DTYPES[_dtype_code(a)], copy=False)
+    b = b.astype(_DTYPES[_dtype_code(b)], copy=False)
+    header = _REQUEST_HEADER.pack(MAGIC, OPERATION_CODES[operation], _dtype_code(a), _dtype_code(b), 0,
+                                  request_id, a.size, b.size)
+    return b''.join((header, a.data, b.data))
+
+def _error_response(request_id, message):
+    tail = message.encode('utf-8')
+    return _RESPONSE_HEADER.pack(MAGIC, STATUS_ERROR, DTYPE_FLOAT64, 0, request_id, 0, len(tail)) + tail
+
+def error_response_for(payload, message):
+    """Двоичный ответ с ошибкой message на запрос payload (с его 'id', если заголовок удалось прочитать)."""
+    request_id = _REQUEST_HEADER.unpack_from(payload)[5] if len(payload) >= _REQUEST_HEADER.size else 0
+    return _error_response(request_id, message)
+
+def handle_frame(payload):
+    """
+    Обрабатывает двоичный запрос (bytes/bytearray/memoryview) и возвращает двоичный ответ (bytes).
+    Буферы num1 и num2 не копируются: массивы NumPy ссылаются прямо на память кадра.
+    """
+    started = time.perf_counter()
+    response = _handle_frame(payload)
+    status = response[len(MAGIC)]
+    operation = _OPERATIONS.get(payload[len(MAGIC)] if len(payload) > len(MAGIC) else None, 'unknown')
+    python_gateway.STATS.record(f"binary:{operation}", time.perf_counter() - started, error=status == STATUS_ERROR)
+    return response
+
+def _handle_frame(payload):
+    import numpy as np
+
+    view = memoryview(payload)
+    if len(view) < _REQUEST_HEADER.size:
+        return _error_response(0, "Двоичный запрос короче заголовка.")
+    _, op_code, type1, type2, _, request_id, count1, count2 = _REQUEST_HEADER.unpack_from(view)
+
+    operation = _OPERATIONS.get(op_code)
+    if operation is None:
+        return _error_response(request_id, f"Неизвестный код операции: {op_code}.")
+    if type1 not in _DTYPES or type2 not in _DTYPES:
+        return _error_response(request_id, "Тип элементов должен быть float64 ('d') или int64 ('q').")
+    if len(view) != _REQUEST_HEADER.size + 8 * (count1 + count2):
+        return _error_response(request_id, "Длина двоичного запроса не совпадает с числом элементов в заголовке.")
+    if count1 != count2 and 1 not in (count1, count2):
+        return _error_response(request_id, f"Массивы 'num1' и 'num2' должны быть одной длины ({count1} != {count2}).")
+
+    offset = _REQUEST_HEADER.size
+    a = np.frombuffer(view, dtype=_DTYPES[type1], count=count1, offset=offset)
+    b = np.frombuffer(view, dtype=_DTYPES[type2], count=count2, offset=offset + 8 * count1)
+    if count1 == 1 and count2 != 1:
+        a = a[0]
+    if count2 == 1 and count1 != 1:
+        b = b[0]
+
+    result, by_zero = python_gateway.compute_numeric(operation, a, b)
+    result = np.asarray(result)
+    status = STATUS_SUCCESS
+    tail = b''
+    if by_zero.size:
+        status = STATUS_PARTIAL
+        result[by_zero] = np.nan
+        tail = by_zero.astype('<i8').tobytes()
+    result_code = _dtype_code(result)
+    result = result.astype(_DTYPES[result_code], copy=False)
+    header = _RESPONSE_HEADER.pack(MAGIC, status, result_code, 0, request_id, result.size, len(tail))
+    return b''.join((header, result.data, tail))
+
+def decode_response(payload):
+    """
+    Разбирает двоичный ответ. Возвращает словарь {'id', 'status', 'result', 'errors', 'message'}:
+    result - массив NumPy поверх буфера ответа, errors - индексы деления на ноль.
+    """
+    import numpy as np
+
+    view = memoryview(payload)
+    _, status, result_code, _, request_id, count, tail_length = _RESPONSE_HEADER.unpack_from(view)
+    offset = _RESPONSE_HEADER.size
+    response = {'id': request_id, 'status': STATUS_NAMES.get(status, "error")}
+    if status == STATUS_ERROR:
+        response['message'] = bytes(view[offset:offset + tail_length]).decode('utf-8')
+        return response
+    response['result'] = np.frombuffer(view, dtype=_DTYPES[result_code], count=count, offset=offset)
+    if status == STATUS_PARTIAL:
+        response['errors'] = np.frombuffer(view, dtype='<i8', count=tail_length // 8, offset=offset + 8 * count)
+    return response
@@ -22,3 +22,56 @@ using (Process process = Process.Start(start))
     // Далее парсим resultJson в C# объект
     Console.WriteLine($"Результат от Python: {resultJson}");
 }
+
+// --- Постоянный режим (--serve): один процесс Python на много запросов ---
+// Запросы пишутся в StandardInput по одному JSON на строку, ответ на каждый читается одной строкой.
+// Поле "id" возвращается в ответе без изменений и позволяет сопоставить ответ с запросом.
+ProcessStartInfo serveStart = new ProcessStartInfo();
+serveStart.FileName = "python";
+serveStart.Arguments = $"{pythonScriptPath} --serve";
+serveStart.UseShellExecute = false;
+serveStart.RedirectStandardInput = true;
+serveStart.RedirectStandardOutput = true;
+serveStart.CreateNoWindow = true;
+
+using (Process gateway = Process.Start(serveStart))
+{
+    for (int i = 0; i < 3; i++)
+    {
+        gateway.StandardInput.WriteLine($"{{\"id\": {i}, \"operation\": \"multiply\", \"num1\": {i}, \"num2\": 10}}");
+        gateway.StandardInput.Flush();
+        string responseJson = gateway.StandardOutput.ReadLine();
+        Console.WriteLine($"Ответ {i} от Python: {responseJson}");
+    }
+
+    gateway.StandardInput.Close(); // Закрытие stdin завершает процесс Python
+    gateway.WaitForExit();
+}
+
+// --- Двоичный запрос (gateway_binary.py) через сервер шлюза gateway_server.py на Unix-сокете ---
+// Кадр: 4 байта длины (big-endian), затем заголовок и массивы double в little-endian.
+// Ответ не повторяет входные массивы; результат - double[] сразу после заголовка ответа (24 байта).
+double[] values1 = { 1.5, 2.5, 3.5 };
+double[] values2 = { 2.0, 0.0, 4.0 };
+using (var socket = new Socket(AddressFamily.Unix, SocketType.Stream, ProtocolType.Unspecified))
+{
+    socket.Connect(new UnixDomainSocketEndPoint("/tmp/hypoo_gateway.sock"));
+    var body = new MemoryStream();
+    using (var w = new BinaryWriter(body))
+    {
+        w.Write(Encoding.ASCII.GetBytes("HYB1"));
+        w.Write((byte)4); // Операция: 1 add, 2 multiply, 3 subtract, 4 divide
+        w.Write((byte)'d'); w.Write((byte)'d'); w.Write((byte)0); // Типы num1/num2 (double) и резерв
+        w.Write((ulong)1); // id запроса
+        w.Write((uint)values1.Length); w.Write((uint)values2.Length);
+        foreach (double v in values1) w.Write(v);
+        foreach (double v in values2) w.Write(v);
+    }
+    byte[] payload = body.ToArray();
+    byte[] header = BitConverter.GetBytes(BinaryPrimitives.ReverseEndianness((uint)payload.Length));
+    socket.Send(header);
+    socket.Send(payload);
+    // Далее: прочитать 4 байта длины, затем ответ. Заголовок ответа (24 байта, little-endian):
+    // "HYB1" (0-3), статус (4), тип результата (5), резерв (6-7), id (uint64, 8), число элементов (uint32, 16),
+    // длина хвоста (uint32, 20); результат начинается со смещения 24
+}
@@ -0,0 +1,235 @@
+# --- Сервер шлюза Python для C# поверх Unix-сокета ---
+
+# Один процесс asyncio обслуживает много клиентов C# одновременно.
+# Кадр протокола: 4 байта длины (big-endian, без знака) и JSON-запрос в UTF-8 той же длины.
+# Ответ - кадр того же вида. Клиент может отправить много запросов, не дожидаясь ответов:
+# ответы приходят по мере готовности (не обязательно по порядку), а сопоставляются по полю 'id'.
+# Небольшие запросы обрабатываются прямо в цикле событий, крупные (пакетные вычисления)
+# отправляются в пул процессов, чтобы не задерживать остальных клиентов.
+# Кроме JSON, кадр может содержать двоичный запрос gateway_binary (определяется по первым байтам).
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import gateway_binary
+import python_gateway
+
+SOCKET_PATH = '/tmp/hypoo_gateway.sock'
+HEAVY_FRAME_BYTES = 64 * 1024 # Запросы крупнее этого размера считаются в пуле процессов
+MAX_FRAME_BYTES = 256 * 1024 * 1024 # Защита от повреждённого заголовка кадра
+
+_HEADER = struct.Struct('>I')
+
+async def read_frame(reader):
+    """Читает один кадр; возвращает его содержимое или None, если соединение закрыто (в том числе посреди кадра)."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"кадр слишком большой: {length} байт")
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None # Клиент отключился посреди кадра - как и посреди заголовка, это конец соединения
+
+def write_frame(writer, payload):
+    """Ставит кадр в очередь на отправку."""
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+def _init_worker(log_level):
+    """Инициализация процесса пула: тот же уровень журнала, что и у сервера."""
+    python_gateway.configure_logging(log_level)
+    python_gateway.STATS.reset() # При fork процесс получает копию статистики сервера
+
+def _handle_payload(payload):
+    """Обработка одного кадра (в цикле событий или в процессе пула): байты запроса -> байты ответа."""
+    if gateway_binary.is_binary(payload):
+        return gateway_binary.handle_frame(payload)
+    return python_gateway.handle_line(payload).encode('utf-8')
+
+def _error_payload(payload, message):
+    """Ответ с ошибкой на запрос payload в его формате (JSON или gateway_binary) и с его 'id'."""
+    if gateway_binary.is_binary(payload):
+        return gateway_binary.error_response_for(payload, message)
+    try:
+        data = json.loads(payload)
+        request_id = data.get('id') if isinstance(data, dict) else None
+    except (ValueError, RecursionError):
+        request_id = None
+    return json.dumps({"status": "error", "message": message, "id": request_id}, ensure_ascii=False).encode('utf-8')
+
+def _handle_payload_in_worker(payload):
+    """
+    Обработка кадра в процессе пула. Вместе с ответом возвращает накопленную в этом процессе
+    статистику операций, чтобы сервер добавил ее к своей и операция 'stats' видела все запросы.
+    """
+    return _handle_payload(payload), python_gateway.STATS.drain()
+
+class GatewayServer:
+    """
+    Сервер шлюза: принимает соединения на Unix-сокете и обрабатывает запросы каждого
+    соединения параллельно. workers - размер пула процессов (0 - все запросы в цикле событий).
+    """
+
+    def __init__(self, path=SOCKET_PATH, workers=os.cpu_count(), heavy_frame_bytes=HEAVY_FRAME_BYTES,
+                 log_level=logging.WARNING):
+        self.path = path
+        self.heavy_frame_bytes = heavy_frame_bytes
+        self.workers = workers or 0
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(log_level,)) if workers else None
+        self._server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path) # Сокет от предыдущего запуска
+        self._server = await asyncio.start_unix_server(self._serve_client, path=self.path)
+        print(f"Hypoo: Шлюз слушает {self.path} (процессов в пуле: {self.workers}).")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _process(self, payload):
+        if self.pool is not None and len(payload) > self.heavy_frame_bytes:
+            response, stats = await asyncio.get_running_loop().run_in_executor(self.pool, _handle_payload_in_worker, payload)
+            python_gateway.STATS.merge(stats)
+            return response
+        return _handle_payload(payload)
+
+    async def _respond(self, writer, payload):
+        try:
+            response = await self._process(payload)
+        except Exception as e: # Например, BrokenProcessPool: клиент все равно должен получить ответ на свой 'id'
+            python_gateway.logger.error("Ошибка обработки запроса шлюза: %s", e)
+            response = _error_payload(payload, f"Произошла ошибка при обработке: {e}")
+        write_frame(writer, response)
+        await writer.drain()
+
+    async def _serve_client(self, reader, writer):
+        in_flight = set()
+        try:
+            while True:
+                payload = await read_frame(reader)
+                if payload is None:
+                    break
+                task = asyncio.create_task(self._respond(writer, payload))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+        except (ValueError, ConnectionError) as e:
+            print(f"Hypoo: Соединение с клиентом шлюза закрыто: {e}")
+        except asyncio.CancelledError:
+            pass # Сервер останавливается; отмененный обработчик не должен выводить ошибку в asyncio
+        finally:
+            for task in in_flight:
+                task.cancel()
+            writer.close()
+
+class GatewayClient:
+    """
+    Клиент шлюза на Python (замена клиента C# для проверок и нагрузочного теста).
+    Запросы из разных задач asyncio отправляются по одному соединению одновременно;
+    каждому присваивается свой 'id', по которому ответ находит ожидающую задачу.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, path=SOCKET_PATH):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def request(self, data):
+        """Отправляет запрос (словарь) и ждет ответа на него."""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        write_frame(self._writer, json.dumps(dict(data, id=request_id)).encode('utf-8'))
+        await self._writer.drain()
+        return await future
+
+    async def request_binary(self, operation, num1, num2):
+        """
+        Отправляет числовую операцию в двоичном формате gateway_binary.
+        Возвращает словарь decode_response (результат - массив NumPy).
+        """
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        write_frame(self._writer, gateway_binary.encode_request(operation, num1, num2, request_id))
+        await self._writer.drain()
+        return await future
+
+    async def _receive(self):
+        try:
+            while True:
+                payload = await read_frame(self._reader)
+                if payload is None:
+                    break
+                if gateway_binary.is_binary(payload):
+                    response = gateway_binary.decode_response(payload)
+                else:
+                    response = json.loads(payload)
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("соединение со шлюзом закрыто"))
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._receiver
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сервер шлюза Python для C# на Unix-сокете')
+    parser.add_argument('--socket', default=SOCKET_PATH, help='Путь к Unix-сокету')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Процессов для тяжелых запросов (0 - без пула)')
+    parser.add_argument('--heavy-bytes', type=int, default=HEAVY_FRAME_BYTES,
+                        help='Запросы крупнее этого размера (в байтах) считаются в пуле процессов')
+    parser.add_argument('--log-level', help='Уровень журнала в stderr (по умолчанию WARNING)')
+    parser.add_argument('--stats-interval', type=float,
+                        help='Раз в столько секунд писать статистику операций в журнал (уровень INFO)')
+    args = parser.parse_args()
+
+    log_level = (args.log_level or ('INFO' if args.stats_interval else 'WARNING')).upper()
+    python_gateway.configure_logging(log_level)
+    if args.stats_interval:
+        python_gateway.start_stats_dump(args.stats_interval)
+    server = GatewayServer(args.socket, args.workers, args.heavy_bytes, log_level)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.pool is not None:
+            server.pool.shutdown(cancel_futures=True)
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
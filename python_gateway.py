@@ -1,168 +1,581 @@
+import argparse
+import bisect
 import json
+import logging
+import operator
+import sys
+import threading
+import time
 
-def process_data_for_csharp(json_input_string):
+# Журнал шлюза. По умолчанию выводятся только предупреждения и ошибки; подробные сообщения
+# о каждом запросе (уровень DEBUG) включаются через configure_logging или --log-level.
+# Аргументы подставляются в сообщение только при выводе, поэтому выключенный уровень
+# не тратит время на форматирование больших запросов.
+logger = logging.getLogger('python_gateway')
+
+def configure_logging(level=logging.WARNING, stream=None):
     """
-    Эта функция имитирует обработку данных, которые могли бы прийти от C#.
-    Она принимает JSON-строку, парсит ее, выполняет операцию
-    и возвращает результат в виде JSON-строки.
+    Настраивает журнал шлюза: уровень (число или имя, например 'DEBUG') и поток вывода.
+    В режимах для C# (--serve, одиночный запрос, сервер на сокете) stdout занят ответами,
+    поэтому журнал пишется в stderr.
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+# --- Статистика операций ---
+
+# Верхние границы корзин гистограммы задержек, в миллисекундах
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+class OperationStats:
+    """
+    Счетчики и гистограммы задержек по операциям (потокобезопасно).
+    Для каждой операции хранится число запросов, ошибок, суммарное и максимальное время
+    и число запросов в каждой корзине LATENCY_BUCKETS_MS (последняя корзина - все, что дольше).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Операция -> [count, errors, total_ms, max_ms, histogram]; список, а не словарь,
+        # потому что record() вызывается на каждый запрос
+        self._operations = {}
+
+    def record(self, operation, seconds, error=False):
+        """Учитывает один выполненный запрос."""
+        ms = seconds * 1000
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, ms)
+        with self._lock:
+            entry = self._operations.get(operation)
+            if entry is None:
+                entry = self._operations[operation] = [0, 0, 0.0, 0.0, [0] * (len(LATENCY_BUCKETS_MS) + 1)]
+            entry[0] += 1
+            if error:
+                entry[1] += 1
+            entry[2] += ms
+            if ms > entry[3]:
+                entry[3] = ms
+            entry[4][bucket] += 1
+
+    def merge(self, raw):
+        """Добавляет сырые счетчики, полученные drain() в другом процессе (например, в пуле gateway_server)."""
+        with self._lock:
+            for operation, other in raw.items():
+                entry = self._operations.get(operation)
+                if entry is None:
+                    self._operations[operation] = [other[0], other[1], other[2], other[3], list(other[4])]
+                    continue
+                entry[0] += other[0]
+                entry[1] += other[1]
+                entry[2] += other[2]
+                entry[3] = max(entry[3], other[3])
+                entry[4] = [a + b for a, b in zip(entry[4], other[4])]
+
+    def drain(self):
+        """Возвращает сырые счетчики и обнуляет их."""
+        with self._lock:
+            operations, self._operations = self._operations, {}
+        return operations
+
+    def reset(self):
+        self.drain()
+
+    def snapshot(self):
+        """
+        Сводка для операции 'stats' и периодического вывода: по каждой операции count, errors,
+        avg_ms, max_ms, оценки p50_ms/p99_ms (верхняя граница корзины) и непустые корзины гистограммы.
+        """
+        with self._lock:
+            operations = {name: (count, errors, total_ms, max_ms, list(histogram))
+                          for name, (count, errors, total_ms, max_ms, histogram) in self._operations.items()}
+        bounds = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + ["<=inf"]
+        summary = {}
+        for name, (count, errors, total_ms, max_ms, histogram) in sorted(operations.items()):
+            summary[name] = {
+                'count': count,
+                'errors': errors,
+                'avg_ms': round(total_ms / count, 3) if count else 0.0,
+                'max_ms': round(max_ms, 3),
+                'p50_ms': _histogram_quantile(histogram, 0.50),
+                'p99_ms': _histogram_quantile(histogram, 0.99),
+                'histogram_ms': {bound: n for bound, n in zip(bounds, histogram) if n},
+            }
+        return summary
+
+def _histogram_quantile(histogram, q):
+    """Верхняя граница корзины, в которую попадает квантиль q (None для последней, неограниченной)."""
+    target = q * sum(histogram)
+    seen = 0
+    for bound, n in zip(LATENCY_BUCKETS_MS + (None,), histogram):
+        seen += n
+        if n and seen >= target:
+            return bound
+    return 0.0
+
+STATS = OperationStats()
+
+def start_stats_dump(interval):
+    """
+    Запускает фоновый поток, который раз в interval секунд пишет сводку STATS в журнал (уровень INFO).
+    Возвращает threading.Event; set() останавливает вывод.
+    """
+    stop = threading.Event()
+
+    def dump():
+        while not stop.wait(interval):
+            logger.info("Статистика шлюза: %s", json.dumps(STATS.snapshot(), ensure_ascii=False))
+
+    threading.Thread(target=dump, name='gateway-stats-dump', daemon=True).start()
+    return stop
+
+# --- Реестр операций ---
+
+# Обработчики операций: название -> функция(data), возвращающая словарь ответа
+# или None, если в запросе не хватает нужных полей
+OPERATIONS = {}
+
+def register_operation(name, handler=None):
+    """
+    Регистрирует обработчик операции name. Можно использовать как декоратор:
+
+        @register_operation('reverse')
+        def reverse(data): ...
+
+    Обработчик получает разобранный запрос и возвращает словарь ответа
+    (или None, если нужных полей нет - тогда шлюз вернет стандартную ошибку).
+    """
+    def register(handler):
+        OPERATIONS[name] = handler
+        return handler
+    return register(handler) if handler is not None else register
+
+# Числовые операции и их названия в ответе
+_NUMERIC_OPERATION_NAMES = {
+    'add': "addition",
+    'multiply': "multiplication",
+    'subtract': "subtraction",
+    'divide': "division",
+}
+
+_SCALAR_FUNCTIONS = {
+    'add': operator.add,
+    'multiply': operator.mul,
+    'subtract': operator.sub,
+    'divide': operator.truediv,
+}
+
+def compute_numeric(operation, a, b):
+    """
+    Числовая операция над массивами NumPy a и b (или массивом и скаляром).
+    Возвращает (массив результата, индексы деления на ноль). На месте деления на ноль в результате 0.
+    """
+    import numpy as np
+
+    if operation == 'add':
+        return np.add(a, b), np.empty(0, dtype=np.int64)
+    if operation == 'multiply':
+        return np.multiply(a, b), np.empty(0, dtype=np.int64)
+    if operation == 'subtract':
+        return np.subtract(a, b), np.empty(0, dtype=np.int64)
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    by_zero = b == 0
+    result = np.divide(a, b, out=np.zeros(a.shape), where=~by_zero)
+    return result, np.flatnonzero(by_zero)
+
+def _process_numeric_arrays(operation, num1, num2):
+    """
+    Пакетная версия числовых операций: num1 и/или num2 - списки одинаковой длины
+    (число вместо списка применяется ко всем элементам). Вычисляется через NumPy за один проход.
+    При делении на ноль соответствующий элемент результата равен null, его индекс попадает
+    в 'errors', а статус ответа - "partial".
+    """
+    import numpy as np # Нужен только пакетным запросам, поэтому не замедляет запуск шлюза
+
+    a = np.asarray(num1)
+    b = np.asarray(num2)
+    if a.dtype.kind not in 'iuf' or b.dtype.kind not in 'iuf' or a.ndim > 1 or b.ndim > 1:
+        return {
+            "status": "error",
+            "message": "'num1' и 'num2' должны быть числами или списками чисел."
+        }
+    if a.ndim == b.ndim == 1 and a.shape != b.shape:
+        return {
+            "status": "error",
+            "message": f"Списки 'num1' и 'num2' должны быть одной длины ({a.shape[0]} != {b.shape[0]})."
+        }
+
+    values, by_zero = compute_numeric(operation, a, b)
+    result = values.tolist()
+    errors = []
+    for index in by_zero.tolist():
+        result[index] = None
+        errors.append({"index": index, "message": "Деление на ноль невозможно."})
+
+    logger.debug("Вычислено (Python) - %s: %d элементов", _NUMERIC_OPERATION_NAMES[operation], len(result))
+
+    response_data = {
+        "status": "partial" if errors else "success",
+        "operation": _NUMERIC_OPERATION_NAMES[operation],
+        "input_nums": [num1, num2],
+        "result": result
+    }
+    if errors:
+        response_data["errors"] = errors
+    return response_data
+
+def _numeric_operation(operation):
+    """Обработчик числовой операции: num1 и num2 - числа или списки чисел."""
+    def handler(data):
+        if not ('num1' in data and 'num2' in data):
+            return None
+        num1 = data['num1']
+        num2 = data['num2']
+        if isinstance(num1, list) or isinstance(num2, list):
+            return _process_numeric_arrays(operation, num1, num2)
+        if operation == 'divide' and num2 == 0:
+            return {
+                "status": "error",
+                "message": "Деление на ноль невозможно."
+            }
+        result = _SCALAR_FUNCTIONS[operation](num1, num2)
+        operation_performed_name = _NUMERIC_OPERATION_NAMES[operation]
+
+        logger.debug("Вычислено (Python) - %s: %s %s %s = %s", operation_performed_name, num1, operation, num2, result)
+
+        return {
+            "status": "success",
+            "operation": operation_performed_name,
+            "input_nums": [num1, num2],
+            "result": result
+        }
+    return handler
+
+for _name in _NUMERIC_OPERATION_NAMES:
+    register_operation(_name, _numeric_operation(_name))
+
+def _pairwise(value1, value2):
+    """Пары элементов двух списков; строка вместо списка повторяется для каждого элемента."""
+    if isinstance(value1, list) and isinstance(value2, list):
+        if len(value1) != len(value2):
+            raise ValueError(f"списки должны быть одной длины ({len(value1)} != {len(value2)})")
+        return zip(value1, value2)
+    if isinstance(value1, list):
+        return ((item, value2) for item in value1)
+    return ((value1, item) for item in value2)
+
+@register_operation('concatenate')
+def _concatenate(data):
+    if not ('str1' in data and 'str2' in data):
+        return None
+    str1 = data['str1']
+    str2 = data['str2']
+    if isinstance(str1, list) or isinstance(str2, list):
+        result = [item1 + item2 for item1, item2 in _pairwise(str1, str2)]
+    else:
+        result = str1 + str2
+    operation_performed_name = "string_concatenation"
+
+    logger.debug("Вычислено (Python) - %s: '%s' + '%s' = '%s'", operation_performed_name, str1, str2, result)
+
+    return {
+        "status": "success",
+        "operation": operation_performed_name,
+        "input_strings": [str1, str2],
+        "result": result
+    }
+
+def _case_operation(operation_performed_name, convert):
+    """Обработчик смены регистра: input_string - строка или список строк."""
+    def handler(data):
+        if 'input_string' not in data:
+            return None
+        input_str = data['input_string']
+        if isinstance(input_str, list):
+            result = [convert(item) for item in input_str]
+        else:
+            result = convert(input_str)
+
+        logger.debug("Вычислено (Python) - %s: '%s' -> '%s'", operation_performed_name, input_str, result)
+
+        return {
+            "status": "success",
+            "operation": operation_performed_name,
+            "input_string": input_str,
+            "result": result
+        }
+    return handler
+
+register_operation('upper_case', _case_operation("to_upper_case", str.upper))
+register_operation('lower_case', _case_operation("to_lower_case", str.lower))
+
+@register_operation('stats')
+def _stats(data):
+    """Сводка STATS по операциям; с "reset": true счетчики после этого обнуляются."""
+    result = STATS.snapshot()
+    if data.get('reset'):
+        STATS.reset()
+    return {
+        "status": "success",
+        "operation": "stats",
+        "result": result
+    }
+
+def _not_an_object():
+    """Ответ на запрос, который разобран как JSON, но не является объектом (массив, строка, число, null)."""
+    return {
+        "status": "error",
+        "message": "Запрос должен быть JSON-объектом."
+    }
+
+def _process_envelope(requests):
+    """
+    Несколько запросов в одном конверте: {"requests": [{...}, {...}]}.
+    Каждый запрос обрабатывается независимо; ответы возвращаются в том же порядке
+    в поле "responses", с 'id' вложенного запроса, если он был задан.
+    Вложенный запрос, который сам является конвертом, получает ответ с ошибкой.
+    """
+    if not isinstance(requests, list):
+        return {
+            "status": "error",
+            "message": "Поле 'requests' должно быть списком запросов."
+        }
+    responses = []
+    for request in requests:
+        if not isinstance(request, dict):
+            responses.append(_not_an_object())
+            continue
+        if 'requests' in request:
+            # Конверт внутри конверта не выполняется: иначе вложенность (и глубина рекурсии) ничем не ограничена
+            response = {"status": "error", "message": "Вложенные конверты запросов не поддерживаются."}
+        else:
+            response = process_request(request)
+        if 'id' in request:
+            response["id"] = request['id']
+        responses.append(response)
+    return {"status": "success", "responses": responses}
+
+def _process_operation(data, operation):
+    """
+    Выполняет операцию из уже разобранного запроса (словаря) и возвращает словарь ответа.
     """
     try:
-        data = json.loads(json_input_string)
-        print(f"Получены данные (Python): {data}")
-
-        # Получаем тип операции, по умолчанию 'add' (сложение)
-        operation = data.get('operation', 'add')
-
-        # Обработка числовых операций
-        if ('num1' in data and 'num2' in data):
-            num1 = data['num1']
-            num2 = data['num2']
-            result = None
-            operation_performed_name = ""
-
-            if operation == 'add':
-                result = num1 + num2
-                operation_performed_name = "addition"
-            elif operation == 'multiply':
-                result = num1 * num2
-                operation_performed_name = "multiplication"
-            elif operation == 'subtract':
-                result = num1 - num2
-                operation_performed_name = "subtraction"
-            elif operation == 'divide':
-                if num2 != 0:
-                    result = num1 / num2
-                    operation_performed_name = "division"
-                else:
-                    response_data = {
-                        "status": "error",
-                        "message": "Деление на ноль невозможно."
-                    }
-                    return json.dumps(response_data)
-            else:
+        logger.debug("Получены данные (Python): %s", data)
+
+        if operation == 'requests':
+            return _process_envelope(data['requests'])
+
+        handler = OPERATIONS.get(operation)
+        response_data = handler(data) if handler is not None else None
+        if response_data is None:
+            # Как и до реестра операций: запрос с num1/num2, который не удалось выполнить как числовой,
+            # получает сообщение о неподдерживаемой числовой операции (на него рассчитан клиент C#)
+            if 'num1' in data and 'num2' in data:
                 response_data = {
                     "status": "error",
                     "message": f"Неизвестная или неподдерживаемая числовая операция: '{operation}'. Попробуйте 'add', 'multiply', 'subtract', 'divide'."
                 }
-                return json.dumps(response_data)
-
-            print(f"Вычислено (Python) - {operation_performed_name}: {num1} {operation} {num2} = {result}")
+            else:
+                # Если ни одна из ожидаемых операций не соответствует данным
+                response_data = {
+                    "status": "error",
+                    "message": "Недостаточно данных для выполнения запрошенной операции или операция не поддерживается текущими данными. Проверьте 'num1'/'num2' для числовых, 'str1'/'str2'/'input_string' для строковых операций, а также само название 'operation'."
+                }
 
-            response_data = {
-                "status": "success",
-                "operation": operation_performed_name,
-                "input_nums": [num1, num2],
-                "result": result
-            }
+    except Exception as e:
+        response_data = {
+            "status": "error",
+            "message": f"Произошла ошибка при обработке: {str(e)}"
+        }
 
-        # Обработка строковых операций
-        elif operation == 'concatenate' and 'str1' in data and 'str2' in data:
-            str1 = data['str1']
-            str2 = data['str2']
-            result = str1 + str2
-            operation_performed_name = "string_concatenation"
+    return response_data
 
-            print(f"Вычислено (Python) - {operation_performed_name}: '{str1}' + '{str2}' = '{result}'")
+# Поля ответа, повторяющие входные данные запроса
+_ECHO_FIELDS = ("input_nums", "input_strings", "input_string")
 
-            response_data = {
-                "status": "success",
-                "operation": operation_performed_name,
-                "input_strings": [str1, str2],
-                "result": result
-            }
-        elif operation == 'upper_case' and 'input_string' in data:
-            input_str = data['input_string']
-            result = input_str.upper()
-            operation_performed_name = "to_upper_case"
-
-            print(f"Вычислено (Python) - {operation_performed_name}: '{input_str}' -> '{result}'")
-
-            response_data = {
-                "status": "success",
-                "operation": operation_performed_name,
-                "input_string": input_str,
-                "result": result
-            }
-        elif operation == 'lower_case' and 'input_string' in data:
-            input_str = data['input_string']
-            result = input_str.lower()
-            operation_performed_name = "to_lower_case"
-
-            print(f"Вычислено (Python) - {operation_performed_name}: '{input_str}' -> '{result}'")
-
-            response_data = {
-                "status": "success",
-                "operation": operation_performed_name,
-                "input_string": input_str,
-                "result": result
-            }
-        # Если ни одна из ожидаемых операций не соответствует данным
-        else:
-            response_data = {
-                "status": "error",
-                "message": "Недостаточно данных для выполнения запрошенной операции или операция не поддерживается текущими данными. Проверьте 'num1'/'num2' для числовых, 'str1'/'str2'/'input_string' для строковых операций, а также само название 'operation'."
-            }
+def process_request(data):
+    """
+    Выполняет запрос (словарь) и возвращает словарь ответа.
+    С "echo_inputs": false ответ не повторяет входные данные (input_nums/input_strings/input_string):
+    для больших массивов это вдвое сокращает ответ и время на его сериализацию.
+    Время выполнения учитывается в STATS под названием операции
+    ('requests' для конверта, 'unknown' для незарегистрированных операций и запросов не-объектов).
+    """
+    if not isinstance(data, dict):
+        STATS.record('unknown', 0.0, error=True)
+        return _not_an_object()
+    # Получаем тип операции, по умолчанию 'add' (сложение)
+    operation ='requests' if 'requests' in data else data.get('operation', 'add')
+    started = time.perf_counter()
+    response_data = _process_operation(data, operation)
+    known = isinstance(operation, str) and (operation in OPERATIONS or operation == 'requests')
+    STATS.record(operation if known else 'unknown', time.perf_counter() - started,
+                 error=response_data.get("status") == "error")
+    if data.get('echo_inputs', True) is False:
+        for field in _ECHO_FIELDS:
+            response_data.pop(field, None)
+    return response_data
 
+def process_data_for_csharp(json_input_string):
+    """
+    Эта функция имитирует обработку данных, которые могли бы прийти от C#.
+    Она принимает JSON-строку, парсит ее, выполняет операцию
+    и возвращает результат в виде JSON-строки.
+    """
+    try:
+        data = json.loads(json_input_string)
+        response_data = process_request(data) if isinstance(data, dict) else _not_an_object()
     except json.JSONDecodeError:
         response_data = {
             "status": "error",
             "message": "Некорректный JSON формат входной строки."
         }
-    except Exception as e:
+    except RecursionError: # json.loads разбирает вложенные массивы и объекты рекурсивно
         response_data = {
             "status": "error",
-            "message": f"Произошла ошибка при обработке: {str(e)}"
+            "message": "Слишком глубокая вложенность JSON."
         }
 
     return json.dumps(response_data)
 
+def handle_line(line):
+    """
+    Обрабатывает одну строку протокола --serve: JSON-запрос с необязательным полем 'id'.
+    Возвращает JSON-строку ответа с тем же 'id' (None, если запрос не удалось разобрать).
+    """
+    request_id = None
+    try:
+        data = json.loads(line)
+        if isinstance(data, dict):
+            request_id = data.get('id')
+            response_data = process_request(data)
+        else:
+            response_data = _not_an_object()
+    except json.JSONDecodeError:
+        response_data = {
+            "status": "error",
+            "message": "Некорректный JSON формат входной строки."
+        }
+    except RecursionError:
+        response_data = {
+            "status": "error",
+            "message": "Слишком глубокая вложенность JSON."
+        }
+    response_data["id"] = request_id
+    return json.dumps(response_data, ensure_ascii=False)
+
+def serve(input_stream=None, output_stream=None, stats_interval=None):
+    """
+    Постоянный режим для C#: один процесс Python обслуживает много запросов.
+    Читает запросы построчно (одна строка - один JSON-запрос) и на каждый пишет
+    одну строку JSON-ответа, сразу сбрасывая буфер. Пустые строки пропускаются; работа
+    завершается, когда входной поток закрыт.
+    Если задан stats_interval (секунды), сводка статистики периодически пишется в журнал.
+    """
+    if stats_interval:
+        stop_dump = start_stats_dump(stats_interval)
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    for line in input_stream:
+        if not line.strip():
+            continue
+        output_stream.write(handle_line(line) + "\n")
+        output_stream.flush()
+    if stats_interval:
+        stop_dump.set()
+
 # --- Примеры использования функции с новой логикой ---
 
-print("--- Примеры Числовых Операций ---")
-input_add = '{"num1": 10, "num2": 25, "operation": "add"}'
-output_add = process_data_for_csharp(input_add)
-print(f"\nОтвет для C# (Сложение): {output_add}")
+def run_examples():
+
+    print("--- Примеры Числовых Операций ---")
+    input_add = '{"num1": 10, "num2": 25, "operation": "add"}'
+    output_add = process_data_for_csharp(input_add)
+    print(f"\nОтвет для C# (Сложение): {output_add}")
+
+    input_multiply = '{"num1": 5, "num2": 8, "operation": "multiply"}'
+    output_multiply = process_data_for_csharp(input_multiply)
+    print(f"\nОтвет для C# (Умножение): {output_multiply}")
+
+    input_subtract = '{"num1": 100, "num2": 30, "operation": "subtract"}'
+    output_subtract = process_data_for_csharp(input_subtract)
+    print(f"\nОтвет для C# (Вычитание): {output_subtract}")
+
+    input_divide = '{"num1": 20, "num2": 4, "operation": "divide"}'
+    output_divide = process_data_for_csharp(input_divide)
+    print(f"\nОтвет для C# (Деление): {output_divide}")
+
+    input_divide_by_zero = '{"num1": 10, "num2": 0, "operation": "divide"}'
+    output_divide_by_zero = process_data_for_csharp(input_divide_by_zero)
+    print(f"\nОтвет для C# (Деление на ноль): {output_divide_by_zero}")
+
+
+    print("\n--- Примеры Строковых Операций ---")
+    input_concat = '{"str1": "Привет, ", "str2": "мир!", "operation": "concatenate"}'
+    output_concat = process_data_for_csharp(input_concat)
+    print(f"\nОтвет для C# (Конкатенация): {output_concat}")
+
+    input_upper = '{"input_string": "hello python", "operation": "upper_case"}'
+    output_upper = process_data_for_csharp(input_upper)
+    print(f"\nОтвет для C# (Верхний регистр): {output_upper}")
+
+    input_lower = '{"input_string": "HELLO PYTHON", "operation": "lower_case"}'
+    output_lower = process_data_for_csharp(input_lower)
+    print(f"\nОтвет для C# (Нижний регистр): {output_lower}")
+
 
-input_multiply = '{"num1": 5, "num2": 8, "operation": "multiply"}'
-output_multiply = process_data_for_csharp(input_multiply)
-print(f"\nОтвет для C# (Умножение): {output_multiply}")
+    print("\n--- Примеры Пакетных Операций ---")
+    input_batch_divide = '{"num1": [10, 20, 30], "num2": [2, 0, 5], "operation": "divide"}'
+    output_batch_divide = process_data_for_csharp(input_batch_divide)
+    print(f"\nОтвет для C# (Пакетное деление): {output_batch_divide}")
 
-input_subtract = '{"num1": 100, "num2": 30, "operation": "subtract"}'
-output_subtract = process_data_for_csharp(input_subtract)
-print(f"\nОтвет для C# (Вычитание): {output_subtract}")
+    input_envelope = '{"requests": [{"id": 1, "num1": 2, "num2": 3, "operation": "multiply"}, {"id": 2, "input_string": ["a", "b"], "operation": "upper_case"}]}'
+    output_envelope = process_data_for_csharp(input_envelope)
+    print(f"\nОтвет для C# (Несколько запросов): {output_envelope}")
 
-input_divide = '{"num1": 20, "num2": 4, "operation": "divide"}'
-output_divide = process_data_for_csharp(input_divide)
-print(f"\nОтвет для C# (Деление): {output_divide}")
+    input_no_echo = '{"num1": [1.5, 2.5], "num2": 2, "operation": "multiply", "echo_inputs": false}'
+    output_no_echo = process_data_for_csharp(input_no_echo)
+    print(f"\nОтвет для C# (Без повтора входных данных): {output_no_echo}")
 
-input_divide_by_zero = '{"num1": 10, "num2": 0, "operation": "divide"}'
-output_divide_by_zero = process_data_for_csharp(input_divide_by_zero)
-print(f"\nОтвет для C# (Деление на ноль): {output_divide_by_zero}")
 
+    print("\n--- Примеры Обработки Ошибок ---")
+    input_unknown_op = '{"num1": 7, "num2": 3, "operation": "unknown_op"}'
+    output_unknown_op = process_data_for_csharp(input_unknown_op)
+    print(f"\nОтвет для C# (Неизвестная операция): {output_unknown_op}")
 
-print("\n--- Примеры Строковых Операций ---")
-input_concat = '{"str1": "Привет, ", "str2": "мир!", "operation": "concatenate"}'
-output_concat = process_data_for_csharp(input_concat)
-print(f"\nОтвет для C# (Конкатенация): {output_concat}")
+    input_missing_data = '{"num1": 7, "operation": "multiply"}'
+    output_missing_data = process_data_for_csharp(input_missing_data)
+    print(f"\nОтвет для C# (Недостаточно данных): {output_missing_data}")
 
-input_upper = '{"input_string": "hello python", "operation": "upper_case"}'
-output_upper = process_data_for_csharp(input_upper)
-print(f"\nОтвет для C# (Верхний регистр): {output_upper}")
+    input_incorrect_json = '{"num1": 10, "num2": 25,' # Некорректный JSON
+    output_incorrect_json = process_data_for_csharp(input_incorrect_json)
+    print(f"\nОтвет для C# (Некорректный JSON): {output_incorrect_json}")
 
-input_lower = '{"input_string": "HELLO PYTHON", "operation": "lower_case"}'
-output_lower = process_data_for_csharp(input_lower)
-print(f"\nОтвет для C# (Нижний регистр): {output_lower}")
 
+    print("\n--- Статистика Операций ---")
+    output_stats = process_data_for_csharp('{"operation": "stats"}')
+    print(f"\nОтвет для C# (Статистика): {output_stats}")
 
-print("\n--- Примеры Обработки Ошибок ---")
-input_unknown_op = '{"num1": 7, "num2": 3, "operation": "unknown_op"}'
-output_unknown_op = process_data_for_csharp(input_unknown_op)
-print(f"\nОтвет для C# (Неизвестная операция): {output_unknown_op}")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Шлюз Python для C#')
+    parser.add_argument('--serve', action='store_true',
+                        help='Постоянный режим: JSON-запросы построчно из stdin, ответы построчно в stdout')
+    parser.add_argument('request', nargs='?', help='Один JSON-запрос; ответ печатается в stdout')
+    parser.add_argument('--log-level', help='Уровень журнала: DEBUG, INFO, WARNING... '
+                        '(по умолчанию WARNING в stderr; для примеров - DEBUG в stdout)')
+    parser.add_argument('--stats-interval', type=float,
+                        help='Раз в столько секунд писать статистику операций в журнал (уровень INFO)')
+    args = parser.parse_args()
 
-input_missing_data = '{"num1": 7, "operation": "multiply"}'
-output_missing_data = process_data_for_csharp(input_missing_data)
-print(f"\nОтвет для C# (Недостаточно данных): {output_missing_data}")
+    if args.serve or args.request is not None:
+        configure_logging(args.log_level or ('INFO' if args.stats_interval else 'WARNING'))
+    else:
+        configure_logging(args.log_level or 'DEBUG', sys.stdout)
 
-input_incorrect_json = '{"num1": 10, "num2": 25,' # Некорректный JSON
-output_incorrect_json = process_data_for_csharp(input_incorrect_json)
-print(f"\nОтвет для C# (Некорректный JSON): {output_incorrect_json}")
+    if args.serve:
+        serve(stats_interval=args.stats_interval)
+    elif args.request is not None:
+        print(process_data_for_csharp(args.request))
+    else:
+        run_examples()
@@ -0,0 +1,241 @@
+# semantic_activation.py
+
+# Распространение активации по смысловому полю (ConceptGraph).
+#
+# "Заряд" (активация) стартует с затравочных понятий и растекается по связям: понятие с зарядом a
+# передает соседу по связи силы w заряд decay * a * w (при normalize=True силы исходящих связей
+# понятия нормируются на их сумму, так что заряд делится между соседями, а не умножается).
+# Итоговая активация - решение a = seeds + decay * W·a.
+#
+# Считается "проталкиванием" остатков: на каждом шаге все понятия, у которых непереданный остаток
+# заряда больше threshold, одновременно забирают его себе и передают соседям (векторно, через
+# матрицу связей в формате CSR на массивах NumPy). Расчет сходится, когда крупных остатков не
+# осталось. Благодаря этому повторный запуск с немного измененными затравками (update) проталкивает
+# только разницу и затрагивает лишь окрестность изменившихся понятий.
+
+import time
+
+import numpy as np
+
+from semantic_field import ConceptGraph, ConceptUnit
+
+DEFAULT_DECAY = 0.5 # Доля заряда, передаваемая по связям на каждом шаге
+DEFAULT_THRESHOLD = 1e-4 # Остатки заряда меньше этого не распространяются дальше
+DEFAULT_MAX_ITERATIONS = 100
+
+class ActivationResult:
+    """Результат распространения: активации всех понятий поля и сведения о сходимости."""
+    __slots__ = ('engine', 'activation', 'iterations', 'converged', 'residual', 'seconds')
+
+    def __init__(self, engine, activation, iterations, converged, residual, seconds):
+        self.engine = engine
+        self.activation = activation # Массив по индексам единиц поля
+        self.iterations = iterations
+        self.converged = converged
+        self.residual = residual # Сумма модулей непереданных остатков
+        self.seconds = seconds
+
+    def __getitem__(self, unit):
+        return float(self.activation[self.engine._node_index(unit)])
+
+    def top(self, k: int = 10, exclude=()):
+        """
+        k самых активированных понятий: список (ConceptUnit, активация) по убыванию.
+        exclude - понятия, которые не нужно включать (например, сами затравки).
+        """
+        activation = self.activation
+        if exclude:
+            activation = activation.copy()
+            activation[[self.engine._node_index(unit) for unit in exclude]] = -np.inf
+        k = min(k, np.count_nonzero(activation > 0))
+        if k <= 0:
+            return []
+        best = np.argpartition(-activation, k - 1)[:k]
+        best = best[np.argsort(-activation[best], kind='stable')]
+        nodes = self.engine.graph.nodes
+        return [(nodes[i], float(activation[i])) for i in best.tolist()]
+
+class ActivationEngine:
+    """
+    Движок распространения активации по полю graph.
+
+    :param relationship_types: По каким типам связей распространять (по умолчанию - по всем).
+    :param direction: 'out' - от источника связи к цели, 'in' - обратно, 'both' - в обе стороны.
+    :param normalize: Нормировать силы исходящих связей каждого понятия на их сумму.
+    :param decay: Доля заряда, передаваемая по связям на каждом шаге; при normalize=True
+                  расчет сходится для любого decay < 1.
+    """
+
+    def __init__(self, graph: ConceptGraph, relationship_types=None, direction: str = 'out', normalize: bool = True,
+                 decay: float = DEFAULT_DECAY, threshold: float = DEFAULT_THRESHOLD,
+                 max_iterations: int = DEFAULT_MAX_ITERATIONS):
+        if direction not in ('out', 'in', 'both'):
+            raise ValueError(f"Неизвестное направление: '{direction}'. Попробуйте 'out', 'in', 'both'.")
+        self.graph = graph
+        self.relationship_types = set(relationship_types) if relationship_types else None
+        self.direction = direction
+        self.normalize = normalize
+        self.decay = decay
+        self.threshold = threshold
+        self.max_iterations = max_iterations
+
+        self._signature = None # Состояние поля, для которого построена матрица
+        self.indptr = self.indices = self.weights = None
+        self._edge_sources = None
+        # Состояние последнего расчета для update()
+        self._seeds = self._activation = self._residual = None
+
+    # --- Матрица связей ---
+
+    def _graph_signature(self):
+        graph = self.graph
+        return graph.version, len(graph.nodes), len(graph.sources), graph.edge_count, len(graph.relationship_types)
+
+    def build(self):
+        """
+        Строит матрицу связей в формате CSR: для понятия i его соседи - indices[indptr[i]:indptr[i + 1]],
+        а веса связей с ними - weights в тех же позициях. Вызывается автоматически, если поле изменилось.
+        """
+        graph = self.graph
+        n = len(graph.nodes)
+        sources = np.frombuffer(graph.sources, dtype=np.int32)
+        targets = np.frombuffer(graph.targets, dtype=np.int32)
+        type_codes = np.frombuffer(graph.type_codes, dtype=np.int32)
+        weights = np.frombuffer(graph.strengths, dtype=np.float64)
+
+        keep = type_codes >= 0 # Удаленные связи
+        if self.relationship_types is not None:
+            codes = [code for code, name in enumerate(graph.relationship_types) if name in self.relationship_types]
+            keep &= np.isin(type_codes, codes)
+        sources, targets, weights = sources[keep], targets[keep], weights[keep]
+        if self.direction == 'in':
+            sources, targets = targets, sources
+        elif self.direction == 'both':
+            sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+            weights = np.concatenate((weights, weights))
+
+        if self.normalize:
+            out_strength = np.bincount(sources, weights=weights, minlength=n)[sources]
+            weights = np.divide(weights, out_strength, out=np.zeros_like(weights), where=out_strength != 0)
+
+        order = np.argsort(sources, kind='stable')
+        self._edge_sources = sources[order]
+        self.indices = targets[order]
+        self.weights = weights[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.indptr[1:])
+        self._signature = self._graph_signature()
+        self._seeds = self._activation = self._residual = None
+
+    def _ensure_built(self):
+        if self._signature != self._graph_signature():
+            self.build()
+
+    # --- Распространение ---
+
+    def _node_index(self, unit):
+        if isinstance(unit, ConceptUnit):
+            if unit.graph is not self.graph:
+                raise ValueError(f"Понятие '{unit.concept_id}' не принадлежит полю движка.")
+            return unit._index
+        found = self.graph.get(unit)
+        if found is None:
+            raise KeyError(f"Понятие с ID '{unit}' не найдено в поле.")
+        return found._index
+
+    def _seed_vector(self, seeds):
+        """Затравки: словарь {ConceptUnit или concept_id: заряд}; None - заряды всех понятий (value)."""
+        n = len(self.graph.nodes)
+        if seeds is None:
+            return np.fromiter((unit.value for unit in self.graph.nodes), dtype=np.float64, count=n)
+        vector = np.zeros(n)
+        for unit, charge in seeds.items():
+            vector[self._node_index(unit)] += charge
+        return vector
+
+    def _spread(self, frontier, amounts):
+        """Заряды, которые получают соседи понятий frontier, отдающих amounts (массив длины n)."""
+        n = len(self.graph.nodes)
+        if len(frontier) * 4 >= n:
+            # Остатки почти везде - проще пройти по всем связям
+            return np.bincount(self.indices, weights=self.weights * amounts[self._edge_sources], minlength=n)
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        spread = np.zeros(n)
+        if total == 0:
+            return spread
+        # Позиции всех связей понятий frontier в CSR без цикла Python
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        targets = self.indices[offsets]
+        contributions = self.weights[offsets] * np.repeat(amounts[frontier], counts)
+        touched, inverse = np.unique(targets, return_inverse=True)
+        spread[touched] = np.bincount(inverse, weights=contributions)
+        return spread
+
+    def _propagate(self, activation, residual):
+        started = time.perf_counter()
+        iterations = 0
+        converged = False
+        while True:
+            frontier = np.flatnonzero(np.abs(residual) > self.threshold)
+            if len(frontier) == 0:
+                converged = True
+                break
+            if iterations >= self.max_iterations:
+                break
+            amounts = np.zeros_like(residual)
+            amounts[frontier] = residual[frontier]
+            activation[frontier] += amounts[frontier]
+            residual[frontier] = 0.0
+            residual += self.decay * self._spread(frontier, amounts)
+            iterations += 1
+        self._activation, self._residual = activation, residual
+        return ActivationResult(self, activation.copy(), iterations, converged,
+                                float(np.abs(residual).sum()), time.perf_counter() - started)
+
+    def run(self, seeds=None) -> ActivationResult:
+        """
+        Полный расчет активации от затравок seeds ({ConceptUnit или concept_id: заряд};
+        по умолчанию - текущие value всех понятий).
+        """
+        self._ensure_built()
+        self._seeds = self._seed_vector(seeds)
+        return self._propagate(np.zeros_like(self._seeds), self._seeds.copy())
+
+    def update(self, seeds=None) -> ActivationResult:
+        """
+        Пересчет после изменения затравок: от результата прошлого расчета распространяется
+        только разница между новыми и прежними затравками. Если поле изменилось или расчета
+        еще не было, выполняется полный расчет.
+        """
+        if self._seeds is None or self._signature != self._graph_signature():
+            return self.run(seeds)
+        new_seeds = self._seed_vector(seeds)
+        residual = self._residual + (new_seeds - self._seeds)
+        self._seeds = new_seeds
+        return self._propagate(self._activation, residual)
+
+# --- Тестирование ---
+if __name__ == "__main__":
+    field = ConceptGraph()
+    love = ConceptUnit("любовь", description="глубокое чувство привязанности", initial_value=10.0, graph=field)
+    respect = ConceptUnit("уважение", description="признание достоинства", initial_value=8.0, graph=field)
+    trust = ConceptUnit("доверие", description="уверенность в другом", initial_value=5.0, graph=field)
+    knowledge = ConceptUnit("знание", description="информация, полученная через обучение", initial_value=15.0, graph=field)
+    action = ConceptUnit("действие", description="процесс осуществления чего-либо", initial_value=7.0, graph=field)
+    love.add_connection(respect, "implies", 0.9)
+    respect.add_connection(love, "supports", 0.8)
+    respect.add_connection(trust, "leads_to", 0.6)
+    knowledge.add_connection(action, "leads_to", 0.7)
+
+    engine = ActivationEngine(field)
+    result = engine.run({love: 1.0})
+    print(f"--- Активация от '{love.word}' ({result.iterations} шагов, сошлось: {result.converged}) ---")
+    for unit, charge in result.top(5):
+        print(f"{unit.word}: {charge:.4f}")
+
+    result = engine.update({love: 1.0, knowledge: 1.0})
+    print(f"\n--- Добавлена затравка '{knowledge.word}' ({result.iterations} шагов) ---")
+    for unit, charge in result.top(5, exclude=[love, knowledge]):
+        print(f"{unit.word}: {charge:.4f}")
@@ -1,34 +1,618 @@
 # semantic_field.py
 
+# Смысловое поле: единицы понятий (ConceptUnit) и связи между ними, которые хранит поле (ConceptGraph).
+#
+# Отличия от прежнего ConceptUnit со списком связей в каждой единице, заметные вызывающему коду:
+#   - unit.connections - кортеж словарей связей, собранный из столбцов поля при каждом обращении.
+#     Добавлять связи через него нельзя (у кортежа нет append); для этого есть add_connection.
+#   - concept_id уникален в пределах поля: единица с уже занятым ID - ValueError.
+#   - Единицы, созданные без graph, попадают в общее поле default_graph и живут, пока оно их держит.
+#     Долгоживущему коду, создающему временные единицы, лучше передавать свое поле (graph=ConceptGraph())
+#     или очищать default_graph через clear().
+
+import threading
+from array import array
+from collections import OrderedDict
+
+from semantic_words import WordIndex
+
+# Начиная с такой степени (числа исходящих или входящих связей) у единицы строятся цепочки
+# связей по типам; у единиц с меньшей степенью связи нужного типа выбираются проходом
+# по всем ее связям, что не дольше прохода по короткой цепочке, но не тратит память на индекс.
+TYPED_INDEX_MIN_DEGREE = 16
+# Пачки связей от такого размера add_edges связывает в цепочки векторно (через NumPy, если он установлен)
+VECTOR_LINK_MIN_EDGES = 10_000
+# remove_connections уплотняет столбцы (compact), когда удаленные связи составляют такую долю строк
+# и их не меньше COMPACT_MIN_REMOVED (чтобы маленькие поля не перестраивались после каждого удаления)
+COMPACT_REMOVED_FRACTION = 0.25
+COMPACT_MIN_REMOVED = 1024
+
+def _numpy():
+    """NumPy, если он установлен (нужен только для векторной обработки больших пачек связей)."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _value_range(np, values):
+    if np is not None:
+        values = np.asarray(values)
+        return int(values.min()), int(values.max())
+    return min(values), max(values)
+
+class ConceptGraph:
+    """
+    Смысловое поле: владеет единицами понятий (по concept_id) и всеми связями между ними.
+
+    Связь хранится не отдельным объектом, а строкой в столбцах компактных массивов:
+    индекс источника, индекс цели, код типа отношения (названия типов интернируются)
+    и сила связи (float64, поэтому читается ровно то значение, которое было задано). Столбцы можно читать напрямую (например, для векторных расчетов),
+    но не изменять.
+
+    Связи каждой единицы проиндексированы цепочками через столбцы next_*: все исходящие,
+    все входящие, а у единиц со степенью от TYPED_INDEX_MIN_DEGREE - еще и исходящие
+    и входящие отдельно по каждому типу отношения. Поэтому запросы "связи единицы" и
+    "связи единицы данного типа" в обе стороны занимают время, пропорциональное числу
+    найденных связей (для маленьких степеней - не больше TYPED_INDEX_MIN_DEGREE), а не размеру поля.
+    Удаленная связь исключается из всех цепочек, а ее строка остается с кодом типа -1, пока
+    compact() не перестроит столбцы без таких строк (remove_connections вызывает его сам, когда
+    удаленных строк набирается COMPACT_REMOVED_FRACTION). После уплотнения номера связей меняются.
+    """
+
+    def __init__(self):
+        self.units = {} # concept_id -> ConceptUnit
+        self.nodes = [] # Индекс единицы -> ConceptUnit
+        self.relationship_types = [] # Код типа отношения -> название
+        self._type_codes = {} # Название типа отношения -> код
+
+        # Столбцы связей (одна строка - одна связь)
+        self.sources = array('i')
+        self.targets = array('i')
+        self.type_codes = array('i') # -1 у удаленных связей
+        self.strengths = array('d')
+        # Следующая и предыдущая связь в той же цепочке (-1 - конец цепочки)
+        self.next_out = array('i') # Исходящие связи источника
+        self.next_in = array('i') # Входящие связи цели
+        self.next_out_typed = array('i') # Исходящие связи источника того же типа (-1, если типы источника не индексируются)
+        self.next_in_typed = array('i') # Входящие связи цели того же типа
+        self._prev_out = array('i')
+        self._prev_in = array('i')
+        self._prev_out_typed = array('i')
+        self._prev_in_typed = array('i')
+        self._removed = 0
+
+        # Степени единиц и признаки того, что для единицы построены цепочки по типам
+        self._out_degree = array('i')
+        self._in_degree = array('i')
+        self._out_indexed = bytearray()
+        self._in_indexed = bytearray()
+
+        # Начало и конец цепочек всех исходящих и входящих связей каждой единицы (-1 - связей нет)
+        self._first_out = array('i')
+        self._last_out = array('i')
+        self._first_in = array('i')
+        self._last_in = array('i')
+        # Цепочки по типу: ключ (код типа, индекс единицы) -> номер пары начало/конец в _typed_first/_typed_last
+        self._out_typed = {}
+        self._in_typed = {}
+        self._typed_first = array('i')
+        self._typed_last = array('i')
+        self.version = 0 # Растет при каждом изменении поля (понятия или связи), см. semantic_traversal
+        self._words = None # WordIndex, строится при первом обращении к words
+        self._composition_cache = None # CompositionCache для combine_concepts, создается при первом обращении
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, concept_id):
+        return concept_id in self.units
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    @property
+    def edge_count(self):
+        """Число связей (без удаленных)."""
+        return len(self.sources) - self._removed
+
+    def get(self, concept_id, default=None):
+        """Единица понятия по concept_id."""
+        return self.units.get(concept_id, default)
+
+    def clear(self):
+        """
+        Удаляет из поля все единицы и связи (например, временные единицы из default_graph).
+        Удаленные единицы больше не принадлежат полю (unit.graph становится None).
+        """
+        for unit in self.nodes:
+            unit.graph = None
+        version = self.version
+        self.__init__()
+        self.version = version + 1 # Кеши, привязанные к версии (semantic_traversal), сбрасываются
+
+    @property
+    def words(self) -> WordIndex:
+        """
+        Индекс единиц по слову (точный, префиксный и нечеткий поиск, см. semantic_words).
+        Строится при первом обращении, а дальше обновляется при добавлении единиц и смене их слов.
+        """
+        if self._words is None:
+            self._words = WordIndex()
+            self._words.add_many(self.nodes)
+        return self._words
+
+    @property
+    def composition_cache(self) -> 'CompositionCache':
+        """
+        Кеш составных понятий этого поля, которым по умолчанию пользуются combine_concepts и combine_many.
+        Живет вместе с полем, поэтому не удерживает в памяти поля, которые больше не используются.
+        """
+        if self._composition_cache is None:
+            self._composition_cache = CompositionCache()
+        return self._composition_cache
+
+    def add_concept(self, unit: 'ConceptUnit'):
+        """
+        Добавляет единицу в поле (вызывается из конструктора ConceptUnit).
+        Если единица с таким concept_id в поле уже есть, бросает ValueError: раньше единицы с одинаковым ID
+        могли существовать одновременно, теперь ID уникален в пределах поля (и в default_graph, куда попадают
+        единицы, созданные без graph).
+        """
+        if unit.concept_id in self.units:
+            raise ValueError(f"Понятие с ID '{unit.concept_id}' уже есть в поле.")
+        self.version += 1
+        unit.graph = self
+        unit._index = len(self.nodes)
+        self.units[unit.concept_id] = unit
+        self.nodes.append(unit)
+        if self._words is not None:
+            self._words.add(unit)
+        for heads in (self._first_out, self._last_out, self._first_in, self._last_in):
+            heads.append(-1)
+        self._out_degree.append(0)
+        self._in_degree.append(0)
+        self._out_indexed.append(0)
+        self._in_indexed.append(0)
+
+    def add_concepts(self, rows) -> list:
+        """
+        Создает единицы пачкой по строкам (concept_id, word, description, value) и возвращает их.
+        Результат тот же, что у конструктора ConceptUnit для каждой строки, но без вызовов на каждую единицу;
+        если хотя бы один concept_id уже занят, поле не меняется.
+        """
+        start = len(self.nodes)
+        created = []
+        for index, (concept_id, word, description, value) in enumerate(rows, start):
+            unit = ConceptUnit.__new__(ConceptUnit)
+            unit._word, unit.concept_id, unit.description, unit.value = word, concept_id, description, value
+            unit.graph, unit._index = self, index
+            created.append(unit)
+        units = self.units
+        seen = set()
+        for unit in created:
+            if unit.concept_id in units or unit.concept_id in seen:
+                raise ValueError(f"Понятие с ID '{unit.concept_id}' уже есть в поле.")
+            seen.add(unit.concept_id)
+
+        self.version += 1
+        count = len(created)
+        units.update((unit.concept_id, unit) for unit in created)
+        self.nodes.extend(created)
+        unlinked = array('i', [-1]) * count
+        for heads in (self._first_out, self._last_out, self._first_in, self._last_in):
+            heads.extend(unlinked)
+        zeros = array('i', [0]) * count
+        self._out_degree.extend(zeros)
+        self._in_degree.extend(zeros)
+        self._out_indexed.extend(bytes(count))
+        self._in_indexed.extend(bytes(count))
+        if self._words is not None:
+            self._words.add_many(created)
+        return created
+
+    def type_code(self, relationship_type: str) -> int:
+        """Код типа отношения; новый тип получает следующий свободный код."""
+        code = self._type_codes.get(relationship_type)
+        if code is None:
+            code = self._type_codes[relationship_type] = len(self.relationship_types)
+            self.relationship_types.append(relationship_type)
+        return code
+
+    def _typed_slot(self, typed, code, node, create=False):
+        """Номер пары начало/конец цепочки (code, node) в _typed_first/_typed_last или -1."""
+        key = (code << 32) | node
+        slot = typed.get(key, -1)
+        if slot < 0 and create:
+            slot = typed[key] = len(self._typed_first)
+            self._typed_first.append(-1)
+            self._typed_last.append(-1)
+        return slot
+
+    @staticmethod
+    def _link(first, last, next_column, prev_column, slot, edge):
+        """Добавляет связь в конец цепочки."""
+        tail = last[slot]
+        if tail < 0:
+            first[slot] = edge
+        else:
+            next_column[tail] = edge
+        prev_column[edge] = tail
+        last[slot] = edge
+
+    @staticmethod
+    def _unlink(first, last, next_column, prev_column, slot, edge):
+        """Исключает связь из цепочки."""
+        previous, following = prev_column[edge], next_column[edge]
+        if previous < 0:
+            first[slot] = following
+        else:
+            next_column[previous] = following
+        if following < 0:
+            last[slot] = previous
+        else:
+            prev_column[following] = previous
+        next_column[edge] = prev_column[edge] = -1
+
+    def _index_types(self, typed, next_typed, prev_typed, first, next_column, node):
+        """Строит цепочки по типам для всех уже имеющихся связей единицы (в одном направлении)."""
+        type_codes = self.type_codes
+        for edge in self._chain(first, next_column, node):
+            self._link(self._typed_first, self._typed_last, next_typed, prev_typed,
+                       self._typed_slot(typed, type_codes[edge], node, create=True), edge)
+
+    def add_edge(self, source: 'ConceptUnit', target: 'ConceptUnit', relationship_type: str = "related_to", strength: float = 1.0) -> int:
+        """Добавляет связь source -> target и возвращает ее номер (строку в столбцах)."""
+        if source.graph is not self or target.graph is not self:
+            raise ValueError("Связывать можно только единицы одного смыслового поля.")
+        self.version += 1
+        edge = len(self.sources)
+        code = self.type_code(relationship_type)
+        self.sources.append(source._index)
+        self.targets.append(target._index)
+        self.type_codes.append(code)
+        self.strengths.append(strength)
+        for column in (self.next_out, self.next_in, self.next_out_typed, self.next_in_typed,
+                       self._prev_out, self._prev_in, self._prev_out_typed, self._prev_in_typed):
+            column.append(-1)
+
+        source, target = source._index, target._index
+        self._link(self._first_out, self._last_out, self.next_out, self._prev_out, source, edge)
+        self._link(self._first_in, self._last_in, self.next_in, self._prev_in, target, edge)
+        self._out_degree[source] += 1
+        self._in_degree[target] += 1
+
+        if self._out_indexed[source]:
+            self._link(self._typed_first, self._typed_last, self.next_out_typed, self._prev_out_typed,
+                       self._typed_slot(self._out_typed, code, source, create=True), edge)
+        elif self._out_degree[source] >= TYPED_INDEX_MIN_DEGREE:
+            self._index_types(self._out_typed, self.next_out_typed, self._prev_out_typed, self._first_out, self.next_out, source)
+            self._out_indexed[source] = 1
+        if self._in_indexed[target]:
+            self._link(self._typed_first, self._typed_last, self.next_in_typed, self._prev_in_typed,
+                       self._typed_slot(self._in_typed, code, target, create=True), edge)
+        elif self._in_degree[target] >= TYPED_INDEX_MIN_DEGREE:
+            self._index_types(self._in_typed, self.next_in_typed, self._prev_in_typed, self._first_in, self.next_in, target)
+            self._in_indexed[target] = 1
+        return edge
+
+    def add_edges(self, sources, targets, type_codes, strengths) -> range:
+        """
+        Добавляет пачку связей и возвращает их номера. Связь i идет от единицы с индексом sources[i]
+        к targets[i], ее тип - код type_codes[i] (см. type_code), сила - strengths[i].
+        Результат тот же, что у add_edge для каждой связи по порядку, но столбцы дополняются целиком,
+        а цепочки связываются одним проходом (для больших пачек - векторно). Быстрее всего
+        принимаются массивы array с типами столбцов ('i', 'i', 'i', 'd').
+        """
+        start = len(self.sources)
+        count = len(sources)
+        if not len(targets) == len(type_codes) == len(strengths) == count:
+            raise ValueError("Столбцы пачки связей должны быть одной длины.")
+        if count == 0:
+            return range(start, start)
+        np = _numpy() if count >= VECTOR_LINK_MIN_EDGES else None
+        nodes = len(self.nodes)
+        for column in (sources, targets):
+            lowest, highest = _value_range(np, column)
+            if lowest < 0 or highest >= nodes:
+                raise ValueError("Индекс единицы вне смыслового поля.")
+        lowest, highest = _value_range(np, type_codes)
+        if lowest < 0 or highest >= len(self.relationship_types):
+            raise ValueError("Неизвестный код типа отношения.")
+
+        self.version += 1
+        self.sources.extend(sources)
+        self.targets.extend(targets)
+        self.type_codes.extend(type_codes)
+        self.strengths.extend(strengths)
+        unlinked = array('i', [-1]) * count
+        for column in (self.next_out, self.next_in, self.next_out_typed, self.next_in_typed,
+                       self._prev_out, self._prev_in, self._prev_out_typed, self._prev_in_typed):
+            column.extend(unlinked)
+        self._append_chains(np, sources, start, self.sources, self._first_out, self._last_out, self.next_out, self._prev_out,
+                            self._out_degree, self._out_indexed, self._out_typed, self.next_out_typed, self._prev_out_typed)
+        self._append_chains(np, targets, start, self.targets, self._first_in, self._last_in, self.next_in, self._prev_in,
+                            self._in_degree, self._in_indexed, self._in_typed, self.next_in_typed, self._prev_in_typed)
+        return range(start, start + count)
+
+    def _append_chains(self, np, nodes, start, column, first, last, next_column, prev_column, degree, indexed, typed, next_typed, prev_typed):
+        """
+        Дописывает связи start, start + 1, ... в цепочки единиц nodes (в одном направлении;
+        column - столбец этих единиц, sources или targets). С np (модуль NumPy) - векторно.
+        """
+        if np is not None:
+            return self._append_chains_vectorized(np, nodes, start, column, first, last, next_column, prev_column,
+                                                  degree, indexed, typed, next_typed, prev_typed)
+        type_codes = self.type_codes
+        typed_first, typed_last = self._typed_first, self._typed_last
+        grown = set() # Единицы, чья степень дошла до TYPED_INDEX_MIN_DEGREE в этой пачке
+        for edge, node in enumerate(nodes, start):
+            tail = last[node]
+            if tail < 0:
+                first[node] = edge
+            else:
+                next_column[tail] = edge
+            prev_column[edge] = tail
+            last[node] = edge
+            degree[node] += 1
+            if indexed[node]:
+                self._link(typed_first, typed_last, next_typed, prev_typed,
+                           self._typed_slot(typed, type_codes[edge], node, create=True), edge)
+            elif degree[node] >= TYPED_INDEX_MIN_DEGREE:
+                grown.add(node)
+        for node in grown:
+            self._index_types(typed, next_typed, prev_typed, first, next_column, node)
+            indexed[node] = 1
+
+    @staticmethod
+    def _link_batch(np, slots, edges, first, last, next_column, prev_column):
+        """То же, что _link для каждой связи edges (по возрастанию номеров) в цепочку slots, но векторно."""
+        order = np.argsort(slots, kind='stable')
+        slots, edges = slots[order], edges[order]
+        same = slots[1:] == slots[:-1] # Соседние связи в одной цепочке
+        heads = np.ones(len(slots), dtype=bool)
+        heads[1:] = ~same
+        tails = np.ones(len(slots), dtype=bool)
+        tails[:-1] = ~same
+        following = np.full(len(edges), -1, dtype=np.int32)
+        following[:-1][same] = edges[1:][same]
+        previous = np.full(len(edges), -1, dtype=np.int32)
+        previous[1:][same] = edges[:-1][same]
+
+        first, last = np.frombuffer(first, dtype=np.int32), np.frombuffer(last, dtype=np.int32)
+        next_column, prev_column = np.frombuffer(next_column, dtype=np.int32), np.frombuffer(prev_column, dtype=np.int32)
+        head_slots, head_edges = slots[heads], edges[heads]
+        old_tails = last[head_slots]
+        previous[heads] = old_tails
+        continued = old_tails >= 0
+        next_column[old_tails[continued]] = head_edges[continued]
+        first[head_slots[~continued]] = head_edges[~continued]
+        last[slots[tails]] = edges[tails]
+        next_column[edges] = following
+        prev_column[edges] = previous
+
+    def _append_chains_vectorized(self, np, nodes, start, column, first, last, next_column, prev_column,
+                                  degree, indexed, typed, next_typed, prev_typed):
+        nodes = np.asarray(nodes).astype(np.int64)
+        edges = np.arange(start, start + len(nodes), dtype=np.int64)
+        self._link_batch(np, nodes, edges, first, last, next_column, prev_column)
+        counts = np.bincount(nodes, minlength=len(degree)).astype(np.int32)
+        degree_view = np.frombuffer(degree, dtype=np.int32)
+        degree_view += counts
+        indexed_view = np.frombuffer(indexed, dtype=np.uint8)
+        grown = np.flatnonzero((counts > 0) & (indexed_view == 0) & (degree_view >= TYPED_INDEX_MIN_DEGREE))
+        type_codes = np.frombuffer(self.type_codes, dtype=np.int32)
+
+        # Новые связи единиц, проиндексированных до этой пачки, дописываются в цепочки по типам
+        was_indexed = indexed_view[nodes] != 0
+        typed_nodes, typed_edges = nodes[was_indexed], edges[was_indexed]
+        if len(grown) * TYPED_INDEX_MIN_DEGREE * 100 >= len(column):
+            # Единиц, чья степень дошла до порога, много: все их живые связи (цепочка - это связи
+            # единицы по возрастанию номера) находятся одним просмотром столбца, а не обходом цепочек
+            selected = np.zeros(len(degree), dtype=bool)
+            selected[grown] = True
+            column_view = np.frombuffer(column, dtype=np.int32)
+            grown_edges = np.flatnonzero(selected[column_view] & (type_codes >= 0))
+            typed_nodes = np.concatenate((typed_nodes, column_view[grown_edges]))
+            typed_edges = np.concatenate((typed_edges, grown_edges))
+            indexed_view[grown] = 1
+            grown = grown[:0]
+
+        if len(typed_edges):
+            keys = (type_codes[typed_edges].astype(np.int64) << 32) | typed_nodes
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            slots = []
+            for key in unique_keys.tolist():
+                slot = typed.get(key)
+                if slot is None:
+                    slot = typed[key] = len(self._typed_first)
+                    self._typed_first.append(-1)
+                    self._typed_last.append(-1)
+                slots.append(slot)
+            self._link_batch(np, np.asarray(slots, dtype=np.int64)[inverse], typed_edges,
+                             self._typed_first, self._typed_last, next_typed, prev_typed)
+        for node in grown.tolist():
+            self._index_types(typed, next_typed, prev_typed, first, next_column, node)
+            indexed[node] = 1
+
+    def remove_edge(self, edge: int):
+        """
+        Удаляет связь по номеру: исключает ее из всех цепочек и помечает строку кодом типа -1.
+        Столбцы не уплотняются, поэтому номера остальных связей не меняются (см. compact).
+        """
+        code = self.type_codes[edge]
+        if code < 0:
+            return
+        self.version += 1
+        source, target = self.sources[edge], self.targets[edge]
+        self._unlink(self._first_out, self._last_out, self.next_out, self._prev_out, source, edge)
+        self._unlink(self._first_in, self._last_in, self.next_in, self._prev_in, target, edge)
+        if self._out_indexed[source]:
+            self._unlink(self._typed_first, self._typed_last, self.next_out_typed, self._prev_out_typed,
+                         self._typed_slot(self._out_typed, code, source), edge)
+        if self._in_indexed[target]:
+            self._unlink(self._typed_first, self._typed_last, self.next_in_typed, self._prev_in_typed,
+                         self._typed_slot(self._in_typed, code, target), edge)
+        self._out_degree[source] -= 1
+        self._in_degree[target] -= 1
+        self.type_codes[edge] = -1
+        self.strengths[edge] = 0.0
+        self._removed += 1
+
+    def remove_connections(self, source: 'ConceptUnit', target: 'ConceptUnit', relationship_type: str = None) -> int:
+        """Удаляет связи source -> target (только данного типа, если он задан); возвращает их число."""
+        targets = self.targets
+        removed = 0
+        for edge in self.out_edges(source, relationship_type):
+            if targets[edge] == target._index:
+                self.remove_edge(edge)
+                removed += 1
+        if self._removed >= COMPACT_MIN_REMOVED and self._removed >= len(self.sources) * COMPACT_REMOVED_FRACTION:
+            self.compact()
+        return removed
+
+    def compact(self) -> int:
+        """
+        Перестраивает столбцы и цепочки без удаленных связей и возвращает число выброшенных строк.
+        Порядок оставшихся связей сохраняется, но их номера меняются: номера, полученные
+        до уплотнения (от add_edge, add_edges, out_edges и т.п.), больше не действительны.
+        """
+        removed = self._removed
+        if not removed:
+            return 0
+        live = [edge for edge, code in enumerate(self.type_codes) if code >= 0]
+        sources = array('i', [self.sources[edge] for edge in live])
+        targets = array('i', [self.targets[edge] for edge in live])
+        type_codes = array('i', [self.type_codes[edge] for edge in live])
+        strengths = array('d', [self.strengths[edge] for edge in live])
+
+        # Столбцы заменяются новыми массивами, а не очищаются: на старые могут смотреть представления NumPy
+        self.version += 1
+        nodes = len(self.nodes)
+        self.sources, self.targets, self.type_codes, self.strengths = array('i'), array('i'), array('i'), array('d')
+        self.next_out, self.next_in, self.next_out_typed, self.next_in_typed = (array('i') for _ in range(4))
+        self._prev_out, self._prev_in, self._prev_out_typed, self._prev_in_typed = (array('i') for _ in range(4))
+        self._typed_first, self._typed_last = array('i'), array('i')
+        self._removed = 0
+        self._out_degree, self._in_degree = array('i', [0]) * nodes, array('i', [0]) * nodes
+        self._out_indexed, self._in_indexed = bytearray(nodes), bytearray(nodes)
+        unlinked = array('i', [-1]) * nodes
+        self._first_out, self._last_out = array('i', unlinked), array('i', unlinked)
+        self._first_in, self._last_in = array('i', unlinked), array('i', unlinked)
+        self._out_typed.clear()
+        self._in_typed.clear()
+        self.add_edges(sources, targets, type_codes, strengths)
+        return removed
+
+    def _chain(self, first, next_column, slot):
+        edge = first[slot] if slot >= 0 else -1
+        while edge >= 0:
+            following = next_column[edge] # Связь можно удалить, пока обход стоит на ней
+            yield edge
+            edge = following
+
+    def _edges(self, node, relationship_type, first, next_column, indexed, typed, next_typed):
+        if not relationship_type:
+            return self._chain(first, next_column, node)
+        code = self._type_codes.get(relationship_type)
+        if code is None:
+            return iter(())
+        if indexed[node]:
+            return self._chain(self._typed_first, next_typed, self._typed_slot(typed, code, node))
+        type_codes = self.type_codes
+        return (edge for edge in self._chain(first, next_column, node) if type_codes[edge] == code)
+
+    def out_edges(self, unit: 'ConceptUnit', relationship_type: str = None):
+        """Номера исходящих связей единицы (всех или одного типа) в порядке добавления."""
+        return self._edges(unit._index, relationship_type, self._first_out, self.next_out,
+                           self._out_indexed, self._out_typed, self.next_out_typed)
+
+    def in_edges(self, unit: 'ConceptUnit', relationship_type: str = None):
+        """Номера входящих связей единицы (всех или одного типа) в порядке добавления."""
+        return self._edges(unit._index, relationship_type, self._first_in, self.next_in,
+                           self._in_indexed, self._in_typed, self.next_in_typed)
+
+    def edge_view(self, edge: int, incoming: bool = False) -> dict:
+        """
+        Связь в виде словаря {"concept", "type", "strength"}, как ее возвращает get_connections.
+        "concept" - цель связи, а для входящей связи (incoming=True) - ее источник.
+        """
+        return {
+            "concept": self.nodes[self.sources[edge] if incoming else self.targets[edge]],
+            "type": self.relationship_types[self.type_codes[edge]],
+            "strength": self.strengths[edge]
+        }
+
+    def connections(self, unit: 'ConceptUnit', relationship_type: str = None) -> list:
+        """Исходящие связи единицы в виде словарей, возможно, отфильтрованные по типу."""
+        return [self.edge_view(edge) for edge in self.out_edges(unit, relationship_type)]
+
+    def incoming(self, unit: 'ConceptUnit', relationship_type: str = None) -> list:
+        """Входящие связи единицы в виде словарей ("concept" - источник), возможно, отфильтрованные по типу."""
+        return [self.edge_view(edge, incoming=True) for edge in self.in_edges(unit, relationship_type)]
+
+class IdAllocator:
+    """
+    Потокобезопасный генератор идентификаторов вида prefix + номер
+    (например, 'CONCEPT_1', 'CONCEPT_2', ...).
+    """
+
+    def __init__(self, prefix: str = "CONCEPT_", start: int = 1):
+        self.prefix = prefix
+        self._next = start
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        with self._lock:
+            number = self._next
+            self._next += 1
+        return f"{self.prefix}{number}"
+
+    def next_free_id(self, *taken) -> str:
+        """
+        Следующий ID, которого нет ни в одном из taken (поля, словари или множества занятых ID):
+        ID, заданный вручную, может совпасть с очередным автоматическим, и тогда тот пропускается.
+        """
+        while True:
+            concept_id = self.next_id()
+            if not any(concept_id in ids for ids in taken):
+                return concept_id
+
 class ConceptUnit:
     """
     Представляет собой базовую единицу смысла, которая может быть
     словом, понятием или мыслью. Включает различные "плоскости" представления
     и механизм для создания связей с другими единицами.
+    Связи хранит смысловое поле (ConceptGraph или LazyConceptGraph из semantic_store),
+    которому принадлежит единица.
     """
-    _next_id = 1 # Для автоматической генерации уникальных ID, если не задан вручную
+    __slots__ = ('_word', 'concept_id', 'description', 'value', 'graph', '_index', '__weakref__')
 
-    def __init__(self, word_representation: str = None, concept_id: str = None, description: str = None, initial_value: float = 0.0):
+    _ids = IdAllocator("CONCEPT_") # Для автоматической генерации уникальных ID, если не задан вручную
+
+    def __init__(self, word_representation: str = None, concept_id: str = None, description: str = None, initial_value: float = 0.0,
+                 graph: ConceptGraph = None):
         """
         Инициализирует ConceptUnit.
 
         :param word_representation: Текстовое представление (Слово).
-        :param concept_id: Уникальный идентификатор понятия (Понятие).
+        :param concept_id: Уникальный идентификатор понятия (Понятие); занятый в поле ID - ValueError.
         :param description: Описание или ассоциированная мысль (Мысль).
         :param initial_value: Начальное числовое значение, прототип "силы заряда" или "интенсивности".
+        :param graph: Смысловое поле, в которое добавляется единица; по умолчанию default_graph.
         """
-        self.word = word_representation
+        self._word = word_representation
+        graph = graph if graph is not None else default_graph
         
-        # Если concept_id не задан, генерируем его автоматически
+        # Если concept_id не задан, генерируем его автоматически (не занятый в поле)
         if concept_id is None:
-            self.concept_id = f"CONCEPT_{ConceptUnit._next_id}"
-            ConceptUnit._next_id += 1
+            self.concept_id = ConceptUnit._ids.next_free_id(graph)
         else:
             self.concept_id = concept_id
             
         self.description = description
         self.value = initial_value # Прототип "силы заряда"
-        self.connections = [] # Связи с другими ConceptUnit
+        graph.add_concept(self)
 
     def add_connection(self, other_concept_unit: 'ConceptUnit', relationship_type: str = "related_to", strength: float = 1.0):
         """
@@ -39,28 +623,61 @@ class ConceptUnit:
         :param strength: Сила связи, прототип "силы поля".
         """
         if isinstance(other_concept_unit, ConceptUnit):
-            self.connections.append({
-                "concept": other_concept_unit,
-                "type": relationship_type,
-                "strength": strength
-            })
+            self.graph.add_edge(self, other_concept_unit, relationship_type, strength)
         else:
             print(f"Ошибка: '{other_concept_unit}' не является экземпляром ConceptUnit.")
 
     def get_connections(self, relationship_type: str = None):
         """
         Возвращает список связей, возможно, отфильтрованный по типу.
+        Каждая связь - словарь {"concept", "type", "strength"}, собранный из столбцов поля;
+        "strength" - ровно то значение, с которым связь была добавлена.
+        """
+        return self.graph.connections(self, relationship_type)
+
+    def get_incoming(self, relationship_type: str = None):
+        """
+        Возвращает список связей, ведущих к этой единице, возможно, отфильтрованный по типу.
+        В словаре связи "concept" - единица, от которой связь исходит.
+        """
+        return self.graph.incoming(self, relationship_type)
+
+    def remove_connection(self, other_concept_unit: 'ConceptUnit', relationship_type: str = None) -> int:
+        """
+        Удаляет связи с other_concept_unit (только данного типа, если он задан).
+        Возвращает число удаленных связей.
+        """
+        if not isinstance(other_concept_unit, ConceptUnit) or other_concept_unit.graph is not self.graph:
+            return 0
+        return self.graph.remove_connections(self, other_concept_unit, relationship_type)
+
+    @property
+    def word(self):
+        """Текстовое представление (Слово); при смене обновляется индекс слов поля."""
+        return self._word
+
+    @word.setter
+    def word(self, word):
+        old_word = getattr(self, '_word', None)
+        self._word = word
+        words = getattr(getattr(self, 'graph', None), '_words', None)
+        if words is not None and word != old_word:
+            words.replace(self, old_word)
+
+    @property
+    def connections(self) -> tuple:
+        """
+        Все исходящие связи (то же, что get_connections(), но кортежем): связи хранит поле,
+        поэтому изменить их через этот кортеж нельзя - для этого есть add_connection и remove_connection.
         """
-        if relationship_type:
-            return [conn for conn in self.connections if conn['type'] == relationship_type]
-        return self.connections
+        return tuple(self.graph.connections(self))
 
     def __str__(self):
         """
         Представление объекта для вывода.
         """
         return (f"ConceptUnit(ID: '{self.concept_id}', Word: '{self.word}', "
-                f"Value: {self.value}, Description: '{self.description[:30]}...')")
+                f"Value: {self.value}, Description: '{(self.description or '')[:30]}...')")
 
     def __repr__(self):
         """
@@ -68,36 +685,202 @@ class ConceptUnit:
         """
         return self.__str__()
 
+# Поле, в которое попадают единицы, созданные без явного graph. Оно держит их (и их связи) до конца
+# процесса или до default_graph.clear(), а concept_id в нем должны быть уникальны, поэтому
+# единицы для отдельных задач лучше создавать в своем поле: ConceptUnit(..., graph=ConceptGraph()).
+default_graph = ConceptGraph()
+
 # --- Примеры использования и базовые "уравнения" (функции взаимодействия) ---
 
-def combine_concepts(concept1: ConceptUnit, concept2: ConceptUnit, new_word: str = None, new_description: str = None) -> ConceptUnit:
+def describe_connections(connections) -> list:
+    """Связи в виде строк 'слово (тип)' для вывода."""
+    return [f"{conn['concept'].word} ({conn['type']})" for conn in connections]
+
+COMPONENT_RELATIONSHIP = "component_of" # Тип связи составного понятия с его компонентами
+COMBINE_CACHE_SIZE = 100_000 # Сколько составных понятий помнит кеш по умолчанию
+
+class CompositionCache:
     """
-    Пример "сложения" двух концепций.
-    Объединяет их значения и описания, создавая новую концепцию.
-    Это очень примитивный прототип нашего "уравнения сложения смыслов".
+    Кеш составных понятий для combine_concepts и combine_many.
+
+    Ключ - поле, тип связи с компонентами, заданные слово и описание составного понятия и ID компонентов
+    в порядке объединения (A + B и B + A - разные понятия), значение - уже созданное составное понятие.
+    По умолчанию у каждого поля свой кеш (ConceptGraph.composition_cache); общий кеш для нескольких
+    полей, переданный явно, удерживает их в памяти, пока в нем есть их понятия.
+    Размер ограничен max_size: при переполнении вытесняются понятия, к которым дольше всего
+    не обращались (из поля они не удаляются, просто следующее объединение создаст новое).
     """
-    combined_value = concept1.value + concept2.value
-    combined_description = f"Объединение: ({concept1.description}) и ({concept2.description})"
+
+    def __init__(self, max_size: int = COMBINE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(components, relationship_type: str = COMPONENT_RELATIONSHIP, new_word: str = None,
+            new_description: str = None) -> tuple:
+        # id поля не переиспользуется, пока закешированное понятие ссылается на это поле
+        return (id(components[0].graph), relationship_type, new_word, new_description,
+                *[unit.concept_id for unit in components])
+
+    def get(self, key):
+        unit = self._entries.get(key)
+        if unit is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return unit
+
+    def put(self, key, unit):
+        self._entries[key] = unit
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def stats(self) -> dict:
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hit_rate}
+
+# Значение cache по умолчанию: кеш поля компонентов (ConceptGraph.composition_cache)
+GRAPH_CACHE = object()
+
+def _resolve_cache(graph, cache):
+    """Кеш для объединения в поле graph: у полей без composition_cache (например, LazyConceptGraph) - без кеша."""
+    if cache is GRAPH_CACHE:
+        return getattr(graph, 'composition_cache', None)
+    return cache
+
+def _composite_fields(components, new_word, new_description):
+    """Слово, описание и значение составного понятия."""
+    combined_value = sum(unit.value for unit in components)
+    combined_description = "Объединение: " + " и ".join(f"({unit.description})" for unit in components)
     if new_description:
         combined_description = new_description
-    
+
     # Попытка создать более осмысленное слово для новой концепции
     if new_word:
         combined_word = new_word
-    elif concept1.word and concept2.word:
-        combined_word = f"{concept1.word}_{concept2.word}_combined"
+    elif all(unit.word for unit in components):
+        combined_word = "_".join(unit.word for unit in components) + "_combined"
     else:
         combined_word = None
+    return combined_word, combined_description, combined_value
 
+def _check_same_graph(components):
+    graph = components[0].graph
+    for unit in components:
+        if unit.graph is not graph:
+            raise ValueError("Объединять можно только единицы одного смыслового поля.")
+    return graph
+
+def _combine(components, new_word, new_description, relationship_type, cache):
+    graph = _check_same_graph(components)
+    cache = _resolve_cache(graph, cache)
+    if cache is not None:
+        key = cache.key(components, relationship_type, new_word, new_description)
+        found = cache.get(key)
+        if found is not None:
+            return found
+    combined_word, combined_description, combined_value = _composite_fields(components, new_word, new_description)
     new_concept = ConceptUnit(
         word_representation=combined_word,
         description=combined_description,
-        initial_value=combined_value
+        initial_value=combined_value,
+        graph=graph
     )
-    new_concept.add_connection(concept1, "component_of", concept1.value)
-    new_concept.add_connection(concept2, "component_of", concept2.value)
+    for unit in components:
+        new_concept.add_connection(unit, relationship_type, unit.value)
+    if cache is not None:
+        cache.put(key, new_concept)
     return new_concept
 
+def combine_concepts(concept1: ConceptUnit, concept2: ConceptUnit, new_word: str = None, new_description: str = None,
+                     relationship_type: str = COMPONENT_RELATIONSHIP,
+                     cache: CompositionCache = GRAPH_CACHE) -> ConceptUnit:
+    """
+    Пример "сложения" двух концепций.
+    Объединяет их значения и описания, создавая новую концепцию в поле компонентов.
+    Это очень примитивный прототип нашего "уравнения сложения смыслов".
+
+    Повторное объединение тех же понятий в том же порядке (с теми же new_word и new_description)
+    возвращает уже созданную концепцию из cache - по умолчанию из кеша поля компонентов
+    (ConceptGraph.composition_cache); cache=None - всегда создавать новую.
+    """
+    return _combine((concept1, concept2), new_word, new_description, relationship_type, cache)
+
+def combine_many(items, new_word: str = None, new_description: str = None,
+                 relationship_type: str = COMPONENT_RELATIONSHIP, cache: CompositionCache = GRAPH_CACHE):
+    """
+    Объединение нескольких понятий за один вызов.
+
+    :param items: Последовательность ConceptUnit - тогда создается (или берется из cache) одна концепция
+                  из всех них в этом порядке; либо последовательность групп понятий (например, пар) -
+                  тогда возвращается список концепций по группам, а new_word и new_description не применяются.
+    Недостающие концепции пачки добавляются в поле разом (ConceptGraph.add_concepts / add_edges);
+    одинаковые группы внутри пачки дают одну концепцию, если cache не None.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if isinstance(items[0], ConceptUnit):
+        return _combine(items, new_word, new_description, relationship_type, cache)
+
+    groups = [tuple(group) for group in items]
+    graphs = {id(_check_same_graph(group)): group[0].graph for group in groups}
+    graph = next(iter(graphs.values()))
+    if len(graphs) > 1 or not isinstance(graph, ConceptGraph):
+        return [_combine(group, None, None, relationship_type, cache) for group in groups]
+    cache = _resolve_cache(graph, cache)
+
+    results = [None] * len(groups)
+    rows = [] # Строки add_concepts для недостающих концепций
+    created = [] # (номер строки в rows, группа, ключ кеша)
+    pending = {} # Ключ кеша -> номер строки в rows
+    for position, group in enumerate(groups):
+        key = None
+        if cache is not None:
+            key = cache.key(group, relationship_type)
+            row = pending.get(key)
+            if row is not None:
+                cache.hits += 1
+                results[position] = row
+                continue
+            found = cache.get(key)
+            if found is not None:
+                results[position] = found
+                continue
+            pending[key] = len(rows)
+        results[position] = len(rows)
+        created.append((len(rows), group, key))
+        rows.append((ConceptUnit._ids.next_free_id(graph),) + _composite_fields(group, None, None))
+    if not rows:
+        return results
+
+    units = graph.add_concepts(rows)
+    sources, targets, strengths = array('i'), array('i'), array('d')
+    for row, group, key in created:
+        sources.extend([units[row]._index] * len(group))
+        targets.extend([unit._index for unit in group])
+        strengths.extend([unit.value for unit in group])
+        if cache is not None:
+            cache.put(key, units[row])
+    graph.add_edges(sources, targets, array('i', [graph.type_code(relationship_type)]) * len(sources), strengths)
+    return [units[result] if isinstance(result, int) else result for result in results]
+
 # --- Тестирование ---
 if __name__ == "__main__":
     print("--- Создание базовых ConceptUnit ---")
@@ -116,23 +899,50 @@ if __name__ == "__main__":
     respect.add_connection(love, "supports", 0.8)
     knowledge.add_connection(action, "leads_to", 0.7)
     
-    print(f"Связи для '{love.word}': {[f'{conn['concept'].word} ({conn['type']})' for conn in love.get_connections()]}")
-    print(f"Связи для '{knowledge.word}': {[f'{conn['concept'].word} ({conn['type']})' for conn in knowledge.get_connections()]}")
+    print(f"Связи для '{love.word}': {describe_connections(love.get_connections())}")
+    print(f"Связи для '{knowledge.word}': {describe_connections(knowledge.get_connections())}")
 
     print("\n--- Прототип 'сложения' смыслов ---")
     # "Любовь" + "Уважение" = "Здоровые отношения"
     healthy_relations = combine_concepts(love, respect, "здоровые_отношения", "сочетание любви и уважения в отношениях")
     print(healthy_relations)
-    print(f"Компоненты '{healthy_relations.word}': {[f'{conn['concept'].word} ({conn['type']})' for conn in healthy_relations.get_connections('component_of')]}")
+    print(f"Компоненты '{healthy_relations.word}': {describe_connections(healthy_relations.get_connections('component_of'))}")
 
     # "Знание" * "Действие" (умножение как синергия) - пока просто сложение, но идея заложена
     # Здесь пока используем combine_concepts, но в будущем это может быть другая функция (например, multiply_concepts)
     wisdom = combine_concepts(knowledge, action, "мудрость", "знания, примененные на практике")
     print(wisdom)
-    print(f"Компоненты '{wisdom.word}': {[f'{conn['concept'].word} ({conn['type']})' for conn in wisdom.get_connections('component_of')]}")
+    print(f"Компоненты '{wisdom.word}': {describe_connections(wisdom.get_connections('component_of'))}")
+
+    print("\n--- Повторное 'сложение' и пакетное объединение ---")
+    again = combine_concepts(love, respect, "здоровые_отношения", "сочетание любви и уважения в отношениях")
+    print(f"Повторное объединение вернуло ту же концепцию: {again is healthy_relations}")
+    print(f"С другим словом - новую: {combine_concepts(love, respect, 'гармония').word}")
+    trio = combine_many([love, respect, knowledge])
+    print(trio)
+    pairs = combine_many([(love, action), (knowledge, action), (love, action)])
+    print(f"Пары: {[unit.word for unit in pairs]}, одинаковые пары дали одну концепцию: {pairs[0] is pairs[2]}")
+    print(f"Кеш объединений: {love.graph.composition_cache.stats()}")
+
+    print("\n--- Поиск понятий по слову ---")
+    print(f"'Здоровые Отношения': {[unit.concept_id for unit in default_graph.words.lookup('Здоровые Отношения')]}")
+    print(f"Начинаются с 'люб': {[unit.word for unit in default_graph.words.prefix('люб')]}")
+    print(f"Похожие на 'мудрост': {[(unit.word, round(score, 2)) for unit, score in default_graph.words.fuzzy('мудрост', k=3)]}")
+
+    print("\n--- Входящие связи и удаление связи ---")
+    print(f"'{love.word}' - компонент: {describe_connections(love.get_incoming('component_of'))}")
+    print(f"Связи, ведущие к '{love.word}': {describe_connections(love.get_incoming())}")
+    respect.remove_connection(love, "supports")
+    print(f"После удаления 'supports': {describe_connections(love.get_incoming())}")
 
     print("\n--- Тестирование автоматического ID ---")
     auto_concept = ConceptUnit("абстракция")
     print(auto_concept)
     another_auto = ConceptUnit("философия")
     print(another_auto)
+
+    print("\n--- Очистка общего поля ---")
+    print(f"Понятий в default_graph: {len(default_graph)}, связей: {default_graph.edge_count}")
+    default_graph.clear()
+    print(f"После clear(): понятий {len(default_graph)}, связей {default_graph.edge_count}, "
+          f"'{love.word}' в поле: {love.graph is not None}")
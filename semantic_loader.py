@@ -0,0 +1,214 @@
+# semantic_loader.py
+
+# Потоковая загрузка смыслового поля из файлов JSONL и CSV (или из любого итерируемого набора записей).
+#
+# Запись - либо понятие (concept_id, word, description, value), либо связь (source, target, type, strength),
+# где source и target - concept_id понятий; запись со 'source' считается связью. Записи читаются по одной,
+# ссылки разрешаются за один проход через словарь concept_id -> индекс единицы, а понятия и связи копятся
+# пачками и добавляются в поле целиком (ConceptGraph.add_concepts / add_edges), поэтому время загрузки
+# определяется разбором файла, а не созданием объектов по одному.
+#
+# Понятие, на которое связь ссылается раньше его собственной записи (или которого в файле нет вовсе),
+# создается без слова и описания; запись этого понятия, встреченная позже, заполняет его поля.
+# Повторная запись понятия тоже обновляет его. Понятия без concept_id получают
+# от ConceptUnit._ids ID, еще не занятый ни в поле, ни среди уже прочитанных записей.
+#
+# Пример JSONL:
+#   {"concept_id": "C1", "word": "любовь", "value": 10.0}
+#   {"source": "C1", "target": "C2", "type": "implies", "strength": 0.9}
+# Пример CSV (заголовок обязателен, лишние столбцы можно опустить):
+#   concept_id,word,description,value,source,target,type,strength
+#   C1,любовь,,10.0,,,,
+#   ,,,,C1,C2,implies,0.9
+
+import csv
+import itertools
+import json
+import os
+import time
+from array import array
+
+from semantic_field import ConceptGraph, ConceptUnit
+
+LOAD_BATCH_SIZE = 1_000_000 # Связей в одной пачке add_edges
+
+# Формат файла по расширению
+FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl', '.csv': 'csv'}
+
+def _number(value, default):
+    if value is None or value == '':
+        return default
+    return float(value)
+
+class _FieldLoader:
+    """Накопитель пачек понятий и связей для одного вызова load_field."""
+
+    def __init__(self, graph: ConceptGraph, batch_size: int):
+        self.graph = graph
+        self.batch_size = batch_size
+        self.index = {} # concept_id -> индекс единицы (уже в поле или в pending) для всех встреченных понятий
+        self.type_codes_by_name = {} # Название типа отношения -> код (копия из поля, без вызова type_code)
+        self.pending = [] # Строки (concept_id, word, description, value) еще не добавленных единиц
+        self.pending_base = len(graph.nodes) # Индекс, который получит первая единица из pending
+        self.sources = array('i')
+        self.targets = array('i')
+        self.type_codes = array('i')
+        self.strengths = array('d')
+        self.records = 0
+        self.edges = 0
+
+    def resolve(self, concept_id) -> int:
+        """Индекс единицы concept_id; если такой еще нет, она ставится в очередь без слова и описания."""
+        node = self.index.get(concept_id)
+        if node is None:
+            unit = self.graph.units.get(concept_id)
+            if unit is not None:
+                node = unit._index
+            else:
+                node = self.pending_base + len(self.pending)
+                self.pending.append((concept_id, None, None, 0.0))
+            self.index[concept_id] = node
+        return node
+
+    def add_concept(self, concept_id, word, description, value):
+        if concept_id is None:
+            concept_id = ConceptUnit._ids.next_free_id(self.index, self.graph) # Не ID из файла или поля
+        node = self.resolve(concept_id)
+        if node >= self.pending_base:
+            self.pending[node - self.pending_base] = (concept_id, word, description, value)
+        else:
+            unit = self.graph.nodes[node]
+            unit.word, unit.description, unit.value = word, description, value
+
+    def load(self, records, parse=None):
+        """Добавляет записи records (словари или строки, которые parse превращает в словари; пустые строки пропускаются)."""
+        index_get = self.index.get
+        codes_get = self.type_codes_by_name.get
+        sources, targets, type_codes, strengths = self.sources, self.targets, self.type_codes, self.strengths
+        number = self.records
+        for record in records:
+            number += 1
+            try:
+                if parse is not None:
+                    try:
+                        record = parse(record)
+                    except ValueError:
+                        if not record.strip():
+                            continue
+                        raise
+                source = record.get('source')
+                if not source:
+                    self.add_concept(record.get('concept_id') or None, record.get('word') or None,
+                                     record.get('description') or None, _number(record.get('value'), 0.0))
+                    continue
+
+                target = record.get('target')
+                if not target:
+                    raise ValueError("у связи нет 'target'")
+                source_node = index_get(source)
+                if source_node is None:
+                    source_node = self.resolve(source)
+                target_node = index_get(target)
+                if target_node is None:
+                    target_node = self.resolve(target)
+                relationship_type = record.get('type') or "related_to"
+                code = codes_get(relationship_type)
+                if code is None:
+                    code = self.type_codes_by_name[relationship_type] = self.graph.type_code(relationship_type)
+                strength = record.get('strength', 1.0)
+                if strength.__class__ is not float:
+                    strength = _number(strength, 1.0)
+
+                sources.append(source_node)
+                targets.append(target_node)
+                type_codes.append(code)
+                strengths.append(strength)
+                if len(sources) >= self.batch_size:
+                    self.flush()
+                    sources, targets, type_codes, strengths = self.sources, self.targets, self.type_codes, self.strengths
+            except (ValueError, TypeError, AttributeError) as e:
+                self.records = number
+                raise ValueError(f"Запись {number}: {e}") from e
+        self.records = number
+
+    def flush(self):
+        """Добавляет накопленные понятия, затем связи (их индексы уже указывают на эти понятия)."""
+        if self.pending:
+            self.graph.add_concepts(self.pending)
+            self.pending = []
+            self.pending_base = len(self.graph.nodes)
+        if self.sources:
+            self.graph.add_edges(self.sources, self.targets, self.type_codes, self.strengths)
+            self.edges += len(self.sources)
+            self.sources, self.targets = array('i'), array('i')
+            self.type_codes, self.strengths = array('i'), array('d')
+
+def _records(lines, file_format):
+    """Записи из строк JSONL или CSV и функция, превращающая запись в словарь (None - разбирать не нужно)."""
+    if file_format == 'csv':
+        return csv.DictReader(lines), None
+    if file_format == 'jsonl':
+        return lines, json.JSONDecoder().decode # Разбор строки - в цикле загрузки, чтобы ошибка получила номер записи
+    raise ValueError(f"Неизвестный формат: '{file_format}'. Попробуйте 'jsonl' или 'csv'.")
+
+def load_field(source, graph: ConceptGraph = None, file_format: str = None, batch_size: int = LOAD_BATCH_SIZE) -> ConceptGraph:
+    """
+    Загружает понятия и связи в смысловое поле (новое или переданное graph).
+
+    :param source: Путь к файлу .jsonl/.ndjson/.json или .csv, либо итерируемый набор записей:
+                   словарей или строк файла (в формате file_format, по умолчанию JSONL).
+    :param file_format: 'jsonl' или 'csv'; для файла по умолчанию определяется по расширению.
+    :param batch_size: Сколько связей копить перед добавлением в поле.
+    :return: Поле с загруженными понятиями и связями.
+    При ошибке в записи выбрасывается ValueError с ее номером; загруженные до нее пачки остаются в поле.
+    """
+    graph = graph if graph is not None else ConceptGraph()
+    loader = _FieldLoader(graph, batch_size)
+    concepts_before = len(graph.nodes)
+    started = time.perf_counter()
+
+    if isinstance(source, (str, os.PathLike)):
+        if file_format is None:
+            file_format = FORMATS.get(os.path.splitext(os.fspath(source))[1].lower())
+            if file_format is None:
+                raise ValueError(f"Не удалось определить формат файла '{source}'. Укажите file_format.")
+        with open(source, encoding='utf-8', newline='') as f:
+            loader.load(*_records(f, file_format))
+    else:
+        iterator = iter(source)
+        first = next(iterator, None)
+        if first is not None:
+            records = itertools.chain((first,), iterator)
+            if isinstance(first, dict):
+                loader.load(records)
+            else:
+                loader.load(*_records(records, file_format or 'jsonl'))
+    loader.flush()
+
+    elapsed = time.perf_counter() - started
+    rate = loader.records / elapsed if elapsed > 0 else 0.0
+    print(f"Hypoo: Смысловое поле загружено: понятий {len(graph.nodes) - concepts_before}, связей {loader.edges} "
+          f"за {elapsed:.2f} с ({rate:.0f} записей/с).")
+    return graph
+
+# --- Тестирование ---
+if __name__ == "__main__":
+    from semantic_field import describe_connections
+
+    field = load_field([
+        '{"concept_id": "C1", "word": "любовь", "description": "глубокое чувство привязанности", "value": 10.0}',
+        '{"source": "C1", "target": "C2", "type": "implies", "strength": 0.9}',
+        '{"source": "C2", "target": "C1", "type": "supports", "strength": 0.8}',
+        '{"concept_id": "C2", "word": "уважение", "description": "признание достоинства", "value": 8.0}',
+        '{"word": "доверие"}',
+    ])
+    for unit in field:
+        print(unit)
+    print(f"Связи для 'уважение': {describe_connections(field.get('C2').get_connections())}")
+
+    load_field([
+        "concept_id,word,source,target,type,strength",
+        "C3,знание,,,,",
+        ",,C3,C1,leads_to,0.7",
+    ], graph=field, file_format='csv')
+    print(f"Связи, ведущие к 'любовь': {describe_connections(field.get('C1').get_incoming())}")
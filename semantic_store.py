@@ -0,0 +1,306 @@
+# semantic_store.py
+
+# Хранение смысловых полей (semantic_field) в базе SQLite рядом с данными Hypoo.
+#
+# Таблица 'concepts' - понятия (concept_key - целочисленный ключ для связей), 'concept_edges' - связи
+# в порядке добавления. save_graph записывает поле целиком в одной транзакции, load_graph загружает
+# его обратно в ConceptGraph. LazyConceptGraph работает прямо с базой: понятия и их связи читаются
+# при первом обращении, а в памяти хранятся только недавно использованные списки связей (LRU),
+# поэтому по полю можно ходить, даже если оно не помещается в память.
+
+import sqlite3
+import weakref
+from array import array
+from collections import OrderedDict
+
+import Hypoo_data_store as store
+from semantic_field import ConceptGraph, ConceptUnit
+
+SAVE_BATCH_SIZE = 10_000 # Строк в одном вызове executemany при сохранении
+LAZY_CACHE_EDGES = 1_000_000 # Сколько связей LazyConceptGraph держит в памяти
+LOAD_BATCH_SIZE = 100_000 # Связей в одной пачке при загрузке поля
+
+_EDGE_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_concept_edges_source ON concept_edges(source_key);",
+    "CREATE INDEX IF NOT EXISTS idx_concept_edges_target ON concept_edges(target_key);",
+)
+
+def create_semantic_tables(conn):
+    """Создает таблицы 'concepts' и 'concept_edges', если их еще нет."""
+    try:
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS concepts (
+                concept_key INTEGER PRIMARY KEY,
+                concept_id TEXT NOT NULL UNIQUE,
+                word TEXT,
+                description TEXT,
+                value REAL NOT NULL DEFAULT 0.0
+            );
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS concept_edges (
+                edge_id INTEGER PRIMARY KEY,
+                source_key INTEGER NOT NULL REFERENCES concepts(concept_key) ON DELETE CASCADE,
+                target_key INTEGER NOT NULL REFERENCES concepts(concept_key) ON DELETE CASCADE,
+                relationship_type TEXT NOT NULL,
+                strength REAL NOT NULL
+            );
+            """)
+            for sql in _EDGE_INDEXES_SQL:
+                conn.execute(sql)
+    except sqlite3.Error as e:
+        print(f"Hypoo: Ошибка при создании таблиц смыслового поля: {e}")
+
+_UPSERT_CONCEPT_SQL = """
+INSERT INTO concepts (concept_id, word, description, value) VALUES (?, ?, ?, ?)
+ON CONFLICT(concept_id) DO UPDATE SET
+    word = excluded.word,
+    description = excluded.description,
+    value = excluded.value;
+"""
+
+_INSERT_EDGE_SQL = """
+INSERT INTO concept_edges (source_key, target_key, relationship_type, strength) VALUES (?, ?, ?, ?);
+"""
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def save_graph(conn, graph: ConceptGraph, batch_size=SAVE_BATCH_SIZE):
+    """
+    Записывает поле graph в базу в одной транзакции.
+
+    Понятия добавляются или обновляются по concept_id; исходящие связи сохраняемых понятий
+    заменяются связями из graph (в том же порядке), прочие понятия и связи в базе не меняются.
+    Если связей записывается не меньше, чем уже есть в базе, индексы 'concept_edges' строятся
+    заново после вставки (это быстрее, чем обновлять их на каждой строке), а внешние ключи
+    связей не проверяются построчно: ключи берутся из 'concepts' в той же транзакции.
+
+    :return: Словарь {'concepts': ..., 'edges': ...} с числом записанных строк.
+    """
+    create_semantic_tables(conn)
+    nodes = graph.nodes
+    existing_edges = conn.execute("SELECT COUNT(*) FROM concept_edges;").fetchone()[0]
+    rebuild_indexes = graph.edge_count >= existing_edges
+    foreign_keys = conn.execute("PRAGMA foreign_keys;").fetchone()[0]
+    if foreign_keys and rebuild_indexes and not conn.in_transaction:
+        conn.execute("PRAGMA foreign_keys = OFF;") # Вне транзакции, иначе PRAGMA не действует
+    try:
+        saved_edges = _save_rows(conn, graph, batch_size, rebuild_indexes)
+    finally:
+        if foreign_keys:
+            conn.execute("PRAGMA foreign_keys = ON;")
+    print(f"Hypoo: Смысловое поле сохранено: понятий {len(nodes)}, связей {saved_edges}.")
+    return {'concepts': len(nodes), 'edges': saved_edges}
+
+def _save_rows(conn, graph, batch_size, rebuild_indexes):
+    nodes = graph.nodes
+    with conn:
+        for batch in _batches(((unit.concept_id, unit.word, unit.description, unit.value) for unit in nodes), batch_size):
+            conn.executemany(_UPSERT_CONCEPT_SQL, batch)
+
+        # Ключи понятий в порядке индексов поля - через временную таблицу, без запроса на каждое понятие
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS field_nodes (node_index INTEGER PRIMARY KEY, concept_id TEXT NOT NULL);")
+        conn.execute("DELETE FROM field_nodes;")
+        for batch in _batches(((unit._index, unit.concept_id) for unit in nodes), batch_size):
+            conn.executemany("INSERT INTO field_nodes (node_index, concept_id) VALUES (?, ?);", batch)
+        keys = [key for key, in conn.execute(
+            "SELECT c.concept_key FROM field_nodes AS f JOIN concepts AS c ON c.concept_id = f.concept_id ORDER BY f.node_index;")]
+        if rebuild_indexes:
+            conn.execute("DROP INDEX IF EXISTS idx_concept_edges_source;")
+            conn.execute("DROP INDEX IF EXISTS idx_concept_edges_target;")
+        conn.execute("""
+        DELETE FROM concept_edges
+        WHERE source_key IN (SELECT c.concept_key FROM field_nodes AS f JOIN concepts AS c ON c.concept_id = f.concept_id);
+        """)
+        conn.execute("DELETE FROM field_nodes;")
+
+        types = graph.relationship_types
+        edges = ((keys[source], keys[target], types[code], strength)
+                 for source, target, code, strength in zip(graph.sources, graph.targets, graph.type_codes, graph.strengths)
+                 if code >= 0)
+        saved_edges = 0
+        for batch in _batches(edges, batch_size):
+            conn.executemany(_INSERT_EDGE_SQL, batch)
+            saved_edges += len(batch)
+        if rebuild_indexes:
+            for sql in _EDGE_INDEXES_SQL:
+                conn.execute(sql)
+    return saved_edges
+
+def load_graph(conn, graph: ConceptGraph = None) -> ConceptGraph:
+    """Загружает все понятия и связи из базы в ConceptGraph (новый или переданный graph)."""
+    create_semantic_tables(conn)
+    graph = graph if graph is not None else ConceptGraph()
+    rows = conn.execute("SELECT concept_key, concept_id, word, description, value FROM concepts ORDER BY concept_key;").fetchall()
+    base = len(graph.nodes)
+    nodes = {row[0]: index for index, row in enumerate(rows, base)} # concept_key -> индекс единицы
+    graph.add_concepts(row[1:] for row in rows)
+    del rows
+
+    cursor = conn.execute("SELECT source_key, target_key, relationship_type, strength FROM concept_edges ORDER BY edge_id;")
+    type_code = graph.type_code
+    while True:
+        batch = cursor.fetchmany(LOAD_BATCH_SIZE)
+        if not batch:
+            break
+        graph.add_edges(array('i', [nodes[row[0]] for row in batch]), array('i', [nodes[row[1]] for row in batch]),
+                        array('i', [type_code(row[2]) for row in batch]), array('d', [row[3] for row in batch]))
+    return graph
+
+class LazyConceptGraph:
+    """
+    Смысловое поле, которое читается из базы по мере обращения.
+
+    Понятие загружается при первом запросе (get или как сосед другого понятия) и живет,
+    пока на него есть ссылки. Связи понятия читаются одним запросом при первом
+    get_connections/get_incoming и кешируются; кеш ограничен cache_edges связями,
+    при переполнении вытесняются списки, к которым дольше всего не обращались.
+    Новые понятия и связи сразу записываются в базу.
+    """
+
+    def __init__(self, conn, cache_edges=LAZY_CACHE_EDGES):
+        create_semantic_tables(conn)
+        self.conn = conn
+        self.cache_edges = cache_edges
+        self._units = weakref.WeakValueDictionary() # concept_key -> ConceptUnit
+        self._cache = OrderedDict() # ('out' | 'in', concept_key) -> [(ConceptUnit, тип, сила), ...]
+        self._cached_edges = 0
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM concepts;").fetchone()[0]
+
+    def __contains__(self, concept_id):
+        return self.conn.execute("SELECT 1 FROM concepts WHERE concept_id = ?;", (concept_id,)).fetchone() is not None
+
+    @property
+    def edge_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM concept_edges;").fetchone()[0]
+
+    def _materialize(self, key, concept_id, word, description, value):
+        """Единица для строки 'concepts' (та же, если она уже загружена)."""
+        unit = self._units.get(key)
+        if unit is None:
+            unit = ConceptUnit.__new__(ConceptUnit)
+            unit.word, unit.concept_id, unit.description, unit.value = word, concept_id, description, value
+            unit.graph, unit._index = self, key
+            self._units[key] = unit
+        return unit
+
+    def get(self, concept_id, default=None):
+        """Единица понятия по concept_id (загружается из базы при первом обращении)."""
+        row = self.conn.execute("SELECT concept_key, concept_id, word, description, value FROM concepts WHERE concept_id = ?;",
+                                (concept_id,)).fetchone()
+        return self._materialize(*row) if row is not None else default
+
+    def add_concept(self, unit: ConceptUnit):
+        """Записывает новую единицу в базу (вызывается из конструктора ConceptUnit с graph=...)."""
+        if unit.concept_id in self:
+            raise ValueError(f"Понятие с ID '{unit.concept_id}' уже есть в поле.")
+        with self.conn:
+            cursor = self.conn.execute("INSERT INTO concepts (concept_id, word, description, value) VALUES (?, ?, ?, ?);",
+                                       (unit.concept_id, unit.word, unit.description, unit.value))
+        unit.graph, unit._index = self, cursor.lastrowid
+        self._units[unit._index] = unit
+
+    def _invalidate(self, *keys):
+        for key in keys:
+            edges = self._cache.pop(key, None)
+            if edges is not None:
+                self._cached_edges -= len(edges)
+
+    def add_edge(self, source: ConceptUnit, target: ConceptUnit, relationship_type: str = "related_to", strength: float = 1.0):
+        """Записывает связь source -> target в базу."""
+        if source.graph is not self or target.graph is not self:
+            raise ValueError("Связывать можно только единицы одного смыслового поля.")
+        with self.conn:
+            self.conn.execute(_INSERT_EDGE_SQL, (source._index, target._index, relationship_type, strength))
+        self._invalidate(('out', source._index), ('in', target._index))
+
+    def remove_connections(self, source: ConceptUnit, target: ConceptUnit, relationship_type: str = None) -> int:
+        """Удаляет связи source -> target (только данного типа, если он задан); возвращает их число."""
+        sql = "DELETE FROM concept_edges WHERE source_key = ? AND target_key = ?"
+        params = [source._index, target._index]
+        if relationship_type:
+            sql += " AND relationship_type = ?"
+            params.append(relationship_type)
+        with self.conn:
+            removed = self.conn.execute(sql + ";", params).rowcount
+        self._invalidate(('out', source._index), ('in', target._index))
+        return removed
+
+    def _edges(self, direction, unit):
+        """Список связей единицы (unit, тип, сила) из кеша или из базы."""
+        key = (direction, unit._index)
+        edges = self._cache.get(key)
+        if edges is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return edges
+        self.misses += 1
+        near, far = ('source_key', 'target_key') if direction == 'out' else ('target_key', 'source_key')
+        rows = self.conn.execute(f"""
+        SELECT c.concept_key, c.concept_id, c.word, c.description, c.value, e.relationship_type, e.strength
+        FROM concept_edges AS e JOIN concepts AS c ON c.concept_key = e.{far}
+        WHERE e.{near} = ?
+        ORDER BY e.edge_id;
+        """, (unit._index,))
+        edges = [(self._materialize(*row[:5]), row[5], row[6]) for row in rows]
+        self._cache[key] = edges
+        self._cached_edges += len(edges)
+        while self._cached_edges > self.cache_edges and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_edges -= len(evicted)
+        return edges
+
+    def connections(self, unit: ConceptUnit, relationship_type: str = None) -> list:
+        """Исходящие связи единицы в виде словарей {"concept", "type", "strength"}."""
+        return [{"concept": other, "type": edge_type, "strength": strength}
+                for other, edge_type, strength in self._edges('out', unit)
+                if not relationship_type or edge_type == relationship_type]
+
+    def incoming(self, unit: ConceptUnit, relationship_type: str = None) -> list:
+        """Входящие связи единицы в виде словарей ("concept" - источник связи)."""
+        return [{"concept": other, "type": edge_type, "strength": strength}
+                for other, edge_type, strength in self._edges('in', unit)
+                if not relationship_type or edge_type == relationship_type]
+
+# --- Тестирование ---
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    from semantic_field import describe_connections
+
+    field = ConceptGraph()
+    love = ConceptUnit("любовь", description="глубокое чувство привязанности", initial_value=10.0, graph=field)
+    respect = ConceptUnit("уважение", description="признание достоинства", initial_value=8.0, graph=field)
+    trust = ConceptUnit("доверие", description="уверенность в другом", initial_value=5.0, graph=field)
+    love.add_connection(respect, "implies", 0.9)
+    respect.add_connection(love, "supports", 0.8)
+    respect.add_connection(trust, "leads_to", 0.6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = store.create_connection(os.path.join(tmp, store.DB_NAME))
+        save_graph(conn, field)
+
+        loaded = load_graph(conn)
+        print(f"Загружено понятий: {len(loaded)}, связей: {loaded.edge_count}")
+
+        lazy = LazyConceptGraph(conn, cache_edges=100)
+        lazy_respect = lazy.get(respect.concept_id)
+        print(f"Связи для '{lazy_respect.word}': {describe_connections(lazy_respect.get_connections())}")
+        print(f"Связи, ведущие к '{lazy_respect.word}': {describe_connections(lazy_respect.get_incoming())}")
+        lazy_love = lazy.get(love.concept_id)
+        lazy_love.add_connection(lazy.get(trust.concept_id), "related_to", 0.3)
+        print(f"Связи для '{lazy_love.word}' после добавления: {describe_connections(lazy_love.get_connections())}")
+        conn.close()
@@ -0,0 +1,269 @@
+# semantic_traversal.py
+
+# Обход смыслового поля (ConceptGraph) дальше одного шага get_connections.
+#
+# neighborhood - окрестность понятия радиусом до k связей (обход в ширину) с фильтром по типам
+# связей и ограничением числа понятий. strongest_path - самый "сильный" путь между двумя понятиями:
+# путь с наибольшим произведением сил связей, то есть кратчайший по весам -log(сила) (алгоритм Дейкстры).
+# shortest_path - путь с наименьшим числом связей. Каждое понятие посещается не больше одного раза,
+# поэтому циклы ("любовь" implies "уважение" supports "любовь") не зацикливают обход.
+#
+# Результаты недавних запросов кешируются; кеш сбрасывается, когда поле изменилось (ConceptGraph.version).
+
+import heapq
+import math
+from collections import OrderedDict, deque
+
+from semantic_field import ConceptGraph, ConceptUnit
+
+DEFAULT_NODE_BUDGET = 10_000 # Сколько понятий neighborhood возвращает не больше
+QUERY_CACHE_SIZE = 1024 # Сколько результатов запросов помнит кеш
+
+class ConceptTraversal:
+    """
+    Запросы обхода поля graph.
+
+    Во всех запросах relationship_types - типы связей, по которым можно идти (по умолчанию - все),
+    а direction - 'out' (от источника связи к цели), 'in' (обратно) или 'both'.
+    Понятия можно передавать как ConceptUnit или как concept_id.
+    """
+
+    def __init__(self, graph: ConceptGraph, cache_size: int = QUERY_CACHE_SIZE):
+        self.graph = graph
+        self.cache_size = cache_size
+        self._cache = OrderedDict() # Ключ запроса -> результат в индексах единиц
+        self._version = graph.version
+        self.hits = self.misses = 0
+
+    # --- Кеш ---
+
+    def _cached(self, key, compute):
+        if self._version != self.graph.version:
+            self._cache.clear()
+            self._version = self.graph.version
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+        result = self._cache[key] = compute()
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    # --- Связи ---
+
+    def _node_index(self, unit):
+        if isinstance(unit, ConceptUnit):
+            if unit.graph is not self.graph:
+                raise ValueError(f"Понятие '{unit.concept_id}' не принадлежит полю.")
+            return unit._index
+        found = self.graph.get(unit)
+        if found is None:
+            raise KeyError(f"Понятие с ID '{unit}' не найдено в поле.")
+        return found._index
+
+    @staticmethod
+    def _query_filter(relationship_types, direction):
+        if direction not in ('out', 'in', 'both'):
+            raise ValueError(f"Неизвестное направление: '{direction}'. Попробуйте 'out', 'in', 'both'.")
+        if isinstance(relationship_types, str):
+            relationship_types = (relationship_types,)
+        return (tuple(sorted(set(relationship_types))) if relationship_types else None), direction
+
+    def _steps(self, node, relationship_types, direction):
+        """Пары (соседняя единица, номер связи) для шага из единицы node."""
+        graph = self.graph
+        unit = graph.nodes[node]
+        for relationship_type in relationship_types or (None,):
+            if direction != 'in':
+                targets = graph.targets
+                for edge in graph.out_edges(unit, relationship_type):
+                    yield targets[edge], edge
+            if direction != 'out':
+                sources = graph.sources
+                for edge in graph.in_edges(unit, relationship_type):
+                    yield sources[edge], edge
+
+    # --- Запросы ---
+
+    def neighborhood(self, unit, hops: int = 2, relationship_types=None, direction: str = 'out',
+                     node_budget: int = DEFAULT_NODE_BUDGET) -> dict:
+        """
+        Понятия не дальше hops связей от unit: словарь {ConceptUnit: число связей до него}
+        в порядке обхода в ширину (сам unit - с расстоянием 0). Если понятий больше node_budget,
+        возвращаются только первые node_budget из них (ближние раньше дальних).
+        """
+        start = self._node_index(unit)
+        relationship_types, direction = self._query_filter(relationship_types, direction)
+
+        def compute():
+            distances = {start: 0}
+            queue = deque([start])
+            while queue and len(distances) < node_budget:
+                node = queue.popleft()
+                distance = distances[node] + 1
+                if distance > hops:
+                    break
+                for neighbor, _ in self._steps(node, relationship_types, direction):
+                    if neighbor not in distances:
+                        distances[neighbor] = distance
+                        queue.append(neighbor)
+                        if len(distances) >= node_budget:
+                            break
+            return tuple(distances.items())
+
+        nodes = self.graph.nodes
+        found = self._cached(('neighborhood', start, hops, relationship_types, direction, node_budget), compute)
+        return {nodes[node]: distance for node, distance in found}
+
+    @staticmethod
+    def _join_path(previous, meeting, start, goal):
+        """Путь start -> meeting по previous[0] и meeting -> goal по previous[1]."""
+        path = [meeting]
+        while path[-1] != start:
+            path.append(previous[0][path[-1]])
+        path.reverse()
+        while path[-1] != goal:
+            path.append(previous[1][path[-1]])
+        return tuple(path)
+
+    def _path_units(self, found):
+        if found is None:
+            return None
+        path, score = found
+        nodes = self.graph.nodes
+        return [nodes[node] for node in path], score
+
+    def strongest_path(self, source, target, relationship_types=None, direction: str = 'out',
+                       node_budget: int = None):
+        """
+        Путь от source к target с наибольшим произведением сил связей (Дейкстра по весам -log(сила)).
+        Силы больше 1 считаются равными 1, связи с силой не больше 0 не проходятся.
+
+        Поиск идет одновременно от source и (по связям в обратную сторону) от target и заканчивается,
+        когда лучший найденный путь уже не может быть улучшен, - так просматривается гораздо меньше
+        понятий, чем при поиске только от source.
+
+        :param node_budget: Сколько понятий можно просмотреть до отказа (по умолчанию - без ограничения).
+        :return: (список ConceptUnit от source до target, произведение сил) или None, если пути нет.
+        """
+        start, goal = self._node_index(source), self._node_index(target)
+        relationship_types, direction = self._query_filter(relationship_types, direction)
+
+        def compute():
+            if start == goal:
+                return (start,), 1.0
+            strengths = self.graph.strengths
+            directions = (direction, _REVERSED[direction])
+            costs = ({start: 0.0}, {goal: 0.0})
+            previous = ({}, {})
+            settled = (set(), set())
+            heaps = ([(0.0, start)], [(0.0, goal)])
+            best, meeting = math.inf, None
+            while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best:
+                side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+                cost, node = heapq.heappop(heaps[side])
+                if node in settled[side]:
+                    continue
+                settled[side].add(node)
+                if node_budget is not None and len(settled[0]) + len(settled[1]) >= node_budget:
+                    return None
+                side_costs, other_costs = costs[side], costs[1 - side]
+                for neighbor, edge in self._steps(node, relationship_types, directions[side]):
+                    strength = strengths[edge]
+                    if strength <= 0.0 or neighbor in settled[side]:
+                        continue
+                    candidate = cost - math.log(strength) if strength < 1.0 else cost
+                    if candidate < side_costs.get(neighbor, math.inf):
+                        side_costs[neighbor] = candidate
+                        previous[side][neighbor] = node
+                        heapq.heappush(heaps[side], (candidate, neighbor))
+                        other = other_costs.get(neighbor)
+                        if other is not None and candidate + other < best:
+                            best, meeting = candidate + other, neighbor
+            if meeting is None:
+                return None
+            return self._join_path(previous, meeting, start, goal), math.exp(-best)
+
+        return self._path_units(self._cached(('strongest', start, goal, relationship_types, direction, node_budget), compute))
+
+    def shortest_path(self, source, target, relationship_types=None, direction: str = 'out',
+                      node_budget: int = None):
+        """
+        Путь от source к target с наименьшим числом связей (обход в ширину одновременно от source
+        и от target, каждый раз на один уровень со стороны с меньшим фронтом).
+
+        :return: (список ConceptUnit от source до target, число связей) или None, если пути нет.
+        """
+        start, goal = self._node_index(source), self._node_index(target)
+        relationship_types, direction = self._query_filter(relationship_types, direction)
+
+        def compute():
+            if start == goal:
+                return (start,), 0
+            directions = (direction, _REVERSED[direction])
+            previous = ({start: start}, {goal: goal})
+            frontiers = ([start], [goal])
+            while frontiers[0] and frontiers[1]:
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                seen, other_seen = previous[side], previous[1 - side]
+                meeting = None
+                next_frontier = []
+                for node in frontiers[side]:
+                    for neighbor, _ in self._steps(node, relationship_types, directions[side]):
+                        if neighbor not in seen:
+                            seen[neighbor] = node
+                            next_frontier.append(neighbor)
+                            if neighbor in other_seen:
+                                meeting = neighbor
+                                break
+                    if meeting is not None:
+                        break
+                if meeting is not None:
+                    # Все понятия фронта другой стороны на одном расстоянии, поэтому первая встреча - кратчайший путь
+                    path = self._join_path(previous, meeting, start, goal)
+                    return path, len(path) - 1
+                if node_budget is not None and len(previous[0]) + len(previous[1]) >= node_budget:
+                    return None
+                frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            return None
+
+        return self._path_units(self._cached(('shortest', start, goal, relationship_types, direction, node_budget), compute))
+
+# Направление обхода от цели пути к его началу
+_REVERSED = {'out': 'in', 'in': 'out', 'both': 'both'}
+
+# --- Тестирование ---
+if __name__ == "__main__":
+    field = ConceptGraph()
+    love = ConceptUnit("любовь", initial_value=10.0, graph=field)
+    respect = ConceptUnit("уважение", initial_value=8.0, graph=field)
+    trust = ConceptUnit("доверие", initial_value=5.0, graph=field)
+    loyalty = ConceptUnit("верность", initial_value=4.0, graph=field)
+    love.add_connection(respect, "implies", 0.9)
+    respect.add_connection(love, "supports", 0.8) # Цикл
+    respect.add_connection(trust, "leads_to", 0.6)
+    love.add_connection(trust, "related_to", 0.3)
+    trust.add_connection(loyalty, "leads_to", 0.7)
+
+    traversal = ConceptTraversal(field)
+    print("--- Окрестность 'любовь' радиусом 2 ---")
+    for unit, distance in traversal.neighborhood(love, hops=2).items():
+        print(f"{unit.word}: {distance}")
+    print(f"Только implies/leads_to: {[unit.word for unit in traversal.neighborhood(love, 3, ['implies', 'leads_to'])]}")
+
+    path, strength = traversal.strongest_path(love, loyalty)
+    print(f"\nСамый сильный путь: {' -> '.join(unit.word for unit in path)} (сила {strength:.3f})")
+    path, length = traversal.shortest_path(love, loyalty)
+    print(f"Кратчайший путь: {' -> '.join(unit.word for unit in path)} ({length} связи)")
+    print(f"Обратно, без учета направления: {[unit.word for unit in traversal.shortest_path(loyalty, love, direction='both')[0]]}")
+
+    traversal.strongest_path(love, loyalty)
+    print(f"Кеш: попаданий {traversal.hits}, промахов {traversal.misses}")
+    love.remove_connection(respect) # Поле изменилось - кеш сбрасывается
+    path, strength = traversal.strongest_path(love, loyalty)
+    print(f"После удаления 'любовь' -> 'уважение': {' -> '.join(unit.word for unit in path)} (сила {strength:.3f})")
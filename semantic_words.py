@@ -0,0 +1,221 @@
+# semantic_words.py
+
+# Поиск понятий смыслового поля по слову (ConceptUnit.word).
+#
+# Слова сравниваются в нормализованном виде (normalize_word): Unicode NFKC, без учета регистра,
+# а '_', '-' и пробелы считаются одним пробелом - так "Здоровые_Отношения" и "здоровые отношения"
+# находят одно и то же. Индекс поддерживает три вида запросов:
+#   - lookup - точное совпадение (словарь);
+#   - prefix - слова, начинающиеся с префикса (двоичный поиск по отсортированному массиву слов;
+#     новые слова сначала попадают в небольшой отдельный массив и время от времени вливаются в основной);
+#   - fuzzy - k самых похожих слов по триграммам (сходство = общие триграммы / все триграммы двух слов).
+#     Кандидаты берутся из списков самых редких триграмм запроса (у частых триграмм списки длинные,
+#     а отличают слова они плохо), и только у лучших кандидатов сходство считается полностью.
+#
+# Индекс строит и обновляет ConceptGraph (свойство words), см. semantic_field.
+
+import bisect
+import heapq
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from operator import itemgetter
+
+RECENT_WORDS_LIMIT = 2048 # Сколько новых слов держать отдельно до слияния с основным массивом
+FUZZY_THRESHOLD = 0.3 # Минимальное сходство по триграммам для fuzzy
+FUZZY_POSTINGS_BUDGET = 20_000 # Сколько вхождений триграмм fuzzy просматривает при подборе кандидатов
+FUZZY_CANDIDATES = 64 # Сколько лучших кандидатов fuzzy проверяет точно
+
+_SEPARATORS = re.compile(r"[\s_\-]+")
+
+def normalize_word(word: str) -> str:
+    """Слово в виде для сравнения: NFKC, casefold, '_', '-' и пробелы - один пробел."""
+    return _SEPARATORS.sub(" ", unicodedata.normalize("NFKC", word).casefold()).strip()
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class WordIndex:
+    """Индекс единиц понятий по нормализованному слову."""
+
+    def __init__(self):
+        self._units = {} # Нормализованное слово -> список единиц с этим словом
+        self._key_ids = {} # Нормализованное слово -> номер (для списков триграмм)
+        self._keys = [] # Номер -> нормализованное слово
+        self._gram_counts = array('H') # Номер -> число различных триграмм слова
+        self._postings = {} # Триграмма -> array номеров слов, в которых она есть
+        self._sorted = [] # Слова по алфавиту
+        self._recent = [] # Слова, добавленные после последнего слияния
+        self._recent_sorted = True
+
+    def __len__(self):
+        """Число различных (нормализованных) слов."""
+        return len(self._units)
+
+    def __contains__(self, word):
+        return bool(word) and normalize_word(word) in self._units
+
+    # --- Обновление ---
+
+    def add(self, unit):
+        """Добавляет единицу под ее словом (единицы без слова не индексируются)."""
+        if unit.word:
+            self._add_key(normalize_word(unit.word), unit)
+
+    def add_many(self, units):
+        for unit in units:
+            if unit.word:
+                self._add_key(normalize_word(unit.word), unit)
+
+    def remove(self, unit, word: str = None):
+        """Убирает единицу из индекса (word - слово, под которым она была добавлена; по умолчанию - текущее)."""
+        word = unit.word if word is None else word
+        if not word:
+            return
+        key = normalize_word(word)
+        units = self._units.get(key)
+        if not units or unit not in units:
+            return
+        units.remove(unit)
+        if not units:
+            # Номер слова и его триграммы остаются, а у fuzzy такие слова просто не находят единиц
+            del self._units[key]
+            self._discard_sorted(key)
+
+    def replace(self, unit, old_word: str):
+        """Переносит единицу из-под слова old_word под ее текущее слово."""
+        self.remove(unit, old_word)
+        self.add(unit)
+
+    def _add_key(self, key, unit):
+        units = self._units.get(key)
+        if units is not None:
+            units.append(unit)
+            return
+        self._units[key] = [unit]
+        self._recent.append(key)
+        self._recent_sorted = False
+        if key in self._key_ids:
+            return # Слово уже было в индексе раньше - триграммы у него есть
+        key_id = self._key_ids[key] = len(self._keys)
+        self._keys.append(key)
+        grams = _trigrams(key)
+        self._gram_counts.append(min(len(grams), 0xFFFF))
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('i')
+            posting.append(key_id)
+
+    def _discard_sorted(self, key):
+        for keys in (self._sorted, self._recent):
+            if keys is self._recent and not self._recent_sorted:
+                if key in keys:
+                    keys.remove(key)
+                continue
+            position = bisect.bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    def _prepare_sorted(self):
+        if len(self._recent) > RECENT_WORDS_LIMIT:
+            self._sorted.extend(self._recent)
+            self._sorted.sort()
+            self._recent = []
+        elif not self._recent_sorted:
+            self._recent.sort()
+        self._recent_sorted = True
+
+    # --- Запросы ---
+
+    def lookup(self, word: str) -> list:
+        """Единицы, слово которых совпадает с word после нормализации."""
+        if not word:
+            return []
+        return list(self._units.get(normalize_word(word), ()))
+
+    def prefix(self, prefix: str, limit: int = 10) -> list:
+        """До limit единиц, нормализованное слово которых начинается с prefix (по алфавиту слов)."""
+        self._prepare_sorted()
+        prefix = normalize_word(prefix)
+
+        def matching(keys):
+            for position in range(bisect.bisect_left(keys, prefix), len(keys)):
+                key = keys[position]
+                if not key.startswith(prefix):
+                    break
+                yield key
+
+        found = []
+        for key in heapq.merge(matching(self._sorted), matching(self._recent)):
+            for unit in self._units[key]:
+                found.append(unit)
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def fuzzy(self, word: str, k: int = 5, threshold: float = FUZZY_THRESHOLD) -> list:
+        """
+        До k единиц с самыми похожими по триграммам словами: список (ConceptUnit, сходство от 0 до 1)
+        по убыванию сходства; слова со сходством меньше threshold не возвращаются.
+
+        Кандидаты - слова с наибольшим числом общих с запросом редких триграмм (просматривается
+        не больше FUZZY_POSTINGS_BUDGET вхождений; подсчет через NumPy, если он установлен),
+        их сходство затем считается точно. Поэтому
+        время запроса не зависит от размера индекса, но слабые совпадения по одним только частым
+        триграммам могут не попасть в ответ.
+        """
+        key = normalize_word(word) if word else ""
+        grams = _trigrams(key) if key else set()
+        if not grams or k <= 0:
+            return []
+        postings = self._postings
+        chosen = []
+        viewed = 0
+        for posting in sorted((postings[gram] for gram in grams if gram in postings), key=len):
+            if chosen and viewed + len(posting) > FUZZY_POSTINGS_BUDGET:
+                break
+            chosen.append(posting)
+            viewed += len(posting)
+        if not chosen:
+            return []
+        limit = max(FUZZY_CANDIDATES, 4 * k)
+
+        from semantic_field import _numpy # semantic_field импортирует этот модуль, поэтому не на уровне модуля
+        np = _numpy()
+        if np is not None:
+            candidates, counts = np.unique(np.concatenate([np.frombuffer(posting, dtype=np.int32) for posting in chosen]),
+                                           return_counts=True)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-counts, limit - 1)[:limit]]
+            candidates = candidates.tolist()
+        else:
+            counts = Counter()
+            for posting in chosen:
+                counts.update(posting)
+            candidates = [key_id for key_id, _ in heapq.nlargest(limit, counts.items(), key=itemgetter(1))]
+
+        keys, gram_counts, units = self._keys, self._gram_counts, self._units
+        total = len(grams)
+        scored = []
+        for key_id in candidates:
+            candidate = keys[key_id]
+            if candidate not in units:
+                continue
+            padded = f"  {candidate} "
+            common = 0
+            for gram in grams:
+                if gram in padded:
+                    common += 1
+            score = common / (total + gram_counts[key_id] - common)
+            if score >= threshold:
+                scored.append((score, candidate))
+
+        found = []
+        for score, candidate in heapq.nlargest(k, scored):
+            for unit in units[candidate]:
+                found.append((unit, score))
+        return found[:k]
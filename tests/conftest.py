@@ -0,0 +1,9 @@
+# Модули Hypoo лежат в корне репозитория, а локальная замена People API (fake_people) - в benchmarks/
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,64 @@
+# Тесты общих частей бенчмарков (benchmarks/bench_common) и запуска bench_suite
+
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+import bench_common
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+
+def test_measure_reports_rates():
+    result = bench_common.measure(lambda: sum(range(10_000)), ops=100)
+    assert result["ops"] == 100 and result["seconds"] > 0
+    assert result["ops_per_sec"] == pytest.approx(100 / result["seconds"], rel=0.01)
+    assert bench_common.measure(lambda: None, ops=0)["us_per_op"] is None
+
+def test_measure_with_profilers(tmp_path):
+    kept = [] # top_allocations - места выделений памяти, живой на конец замера
+    result = bench_common.measure(lambda: kept.extend(bytes(1024) for _ in range(1000)), ops=1000, profile='tracemalloc')
+    assert result["peak_mib"] > 0.5 and "test_bench_common.py" in result["top_allocations"][0]
+    assert not tracemalloc.is_tracing()
+
+    path = str(tmp_path / 'run.prof')
+    result = bench_common.measure(lambda: sorted(range(1000), key=str), ops=1, profile='cprofile', profile_path=path)
+    assert result["profile_file"] == path and os.path.getsize(path) > 0 and "cumulative" in result["profile"]
+
+@pytest.mark.parametrize('profile', [None, 'cprofile', 'tracemalloc'])
+def test_failing_run_stops_profiling(profile):
+    def fail():
+        raise RuntimeError("сбой замера")
+
+    with pytest.raises(RuntimeError):
+        bench_common.measure(fail, ops=1, profile=profile)
+    assert not tracemalloc.is_tracing() and sys.getprofile() is None
+
+def test_results_round_trip_and_comparison(tmp_path):
+    path = str(tmp_path / 'before.json')
+    bench_common.write_results(path, {"a": {"ops_per_sec": 100.0}, "b": {"ops_per_sec": 100.0},
+                                      "c": {"ops_per_sec": 100.0}}, scale=0.5)
+    baseline = bench_common.load_results(path)
+    assert baseline["meta"]["scale"] == 0.5 and baseline["meta"]["python"]
+
+    results = {"a": {"ops_per_sec": 80.0}, "b": {"ops_per_sec": 130.0}, "c": {"ops_per_sec": 99.0},
+               "new": {"ops_per_sec": 1.0}}
+    lines, regressions = bench_common.compare_results(results, baseline, threshold=0.1)
+    assert regressions == ["a"]
+    assert "медленнее" in lines[0] and "быстрее" in lines[1] and "нет в прежнем прогоне" in lines[3]
+    assert bench_common.compare_results(results, baseline, threshold=0.0)[1] == ["a", "c"]
+
+def test_suite_writes_and_compares_results(tmp_path):
+    output = str(tmp_path / 'results.json')
+    command = [sys.executable, os.path.join(BENCHMARKS, 'bench_suite.py'), '--only', 'gateway.scalar',
+               'field.add_connection', '--scale', '0.01', '--repeat', '1']
+    subprocess.run(command + ['--output', output], capture_output=True, text=True, check=True)
+    with open(output, encoding='utf-8') as f:
+        assert set(json.load(f)["results"]) == {"gateway.scalar", "field.add_connection"}
+
+    compared = subprocess.run(command + ['--compare', output, '--max-regression', '1000'],
+                              capture_output=True, text=True, check=True)
+    assert "Сравнение с" in compared.stdout
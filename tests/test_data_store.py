@@ -0,0 +1,233 @@
+# Тесты хранилища Hypoo_data_store: массовая вставка, ключи email/телефонов, обратный поиск,
+# HypooStore, сырые данные People API и журнал изменений
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import Hypoo_data_store as store
+
+def person(i, **changes):
+    """Контакт в виде словаря, который принимают insert_contacts_bulk и sync_contacts."""
+    return dict({'user_id': f'u{i}', 'name': f'Контакт {i}', 'primary_email': f'user{i}@example.com',
+                 'primary_phone': f'+99450{i:07d}', 'emails': [f'user{i}@example.com'],
+                 'phones': [f'+99450{i:07d}']}, **changes)
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    store.create_tables(conn)
+    yield conn
+    conn.close()
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+
+# --- Массовая вставка (insert_contacts_bulk) ---
+
+@pytest.mark.parametrize('batch_size', [1, 7, 1000])
+def test_bulk_insert_writes_contacts_with_emails_and_phones(conn, batch_size):
+    written = store.insert_contacts_bulk(conn, (person(i, emails=[f'a{i}@x.org', f'b{i}@x.org']) for i in range(30)),
+                                         batch_size=batch_size)
+    assert written == {'contacts': 30, 'emails': 60, 'phones': 30, 'failed': 0}
+    assert (count(conn, 'contacts'), count(conn, 'emails'), count(conn, 'phones')) == (30, 60, 30)
+
+def test_bulk_insert_skips_unchanged_contacts(conn):
+    store.insert_contacts_bulk(conn, [person(i) for i in range(5)])
+    written = store.insert_contacts_bulk(conn, [person(i) for i in range(4)] + [person(4, name="Новое имя")])
+    assert written['contacts'] == 1
+    assert conn.execute("SELECT name FROM contacts WHERE user_id = 'u4';").fetchone() == ("Новое имя",)
+
+def test_failed_batch_is_rolled_back_and_others_are_kept(conn):
+    contacts = [person(0), person(1), person(2, name=None), person(3), person(4)] # name NOT NULL
+    written = store.insert_contacts_bulk(conn, contacts, batch_size=2)
+    assert written['failed'] == 2 and written['contacts'] == 3
+    assert sorted(row[0] for row in conn.execute("SELECT user_id FROM contacts;")) == ['u0', 'u1', 'u4']
+    assert conn.execute("SELECT COUNT(*) FROM emails WHERE user_id IN ('u2', 'u3');").fetchone() == (0,)
+
+# --- Нормализованные ключи email/телефонов и миграция старых баз ---
+
+@pytest.mark.parametrize('phone, key', [
+    ('+994 50 345-12-72', '+994503451272'),
+    ('00994503451272', '+994503451272'),
+    ('050 345 12 72', '+994503451272'),
+    ('7 (900) 123-45-67', '+79001234567'),
+    (' доб. ', 'доб.'),
+])
+def test_normalize_phone(phone, key):
+    assert store.normalize_phone(phone) == key
+
+def test_same_address_in_another_form_is_stored_once(conn):
+    store.insert_contacts_bulk(conn, [person(1, emails=['User1@Example.com', ' user1@example.com'],
+                                             phones=['+994 50 000 00 01', '0500000001'])])
+    store.insert_email(conn, 'u1', 'USER1@EXAMPLE.COM')
+    store.insert_phone(conn, 'u1', '00994500000001')
+    assert conn.execute("SELECT email, email_key FROM emails;").fetchall() == [('User1@Example.com', 'user1@example.com')]
+    assert conn.execute("SELECT phone_key FROM phones;").fetchall() == [('+994500000001',)]
+
+def test_migration_fills_keys_and_removes_duplicates(tmp_path):
+    path = str(tmp_path / 'old.db')
+    old = sqlite3.connect(path)
+    old.executescript("""
+    CREATE TABLE contacts (user_id TEXT PRIMARY KEY, name TEXT NOT NULL, primary_email TEXT, primary_phone TEXT,
+                           is_our_person INTEGER DEFAULT 0, ideology_score REAL DEFAULT 0.0, last_updated TEXT);
+    CREATE TABLE emails (email_id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, email TEXT NOT NULL);
+    CREATE TABLE phones (phone_id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, phone TEXT NOT NULL);
+    INSERT INTO contacts (user_id, name) VALUES ('u1', 'Старый контакт');
+    INSERT INTO emails (user_id, email) VALUES ('u1', 'A@x.org'), ('u1', 'a@x.org '), ('u1', 'b@x.org');
+    INSERT INTO phones (user_id, phone) VALUES ('u1', '050 111 22 33'), ('u1', '+994501112233');
+    """)
+    old.commit()
+    store.create_tables(old)
+    store.create_tables(old) # Повторный запуск ничего не меняет
+
+    assert old.execute("SELECT email, email_key FROM emails ORDER BY email_id;").fetchall() == [
+        ('A@x.org', 'a@x.org'), ('b@x.org', 'b@x.org')]
+    assert old.execute("SELECT phone, phone_key FROM phones;").fetchall() == [('050 111 22 33', '+994501112233')]
+    with pytest.raises(sqlite3.IntegrityError):
+        old.execute("INSERT INTO emails (user_id, email, email_key) VALUES ('u1', 'B@X.ORG', 'b@x.org');")
+    columns = [row[1] for row in old.execute("PRAGMA table_info(contacts);")]
+    assert 'content_hash' in columns and 'scored_at' in columns
+    old.close()
+
+# --- Обратный поиск по email и телефону ---
+
+def test_find_by_email_and_phone_in_any_form(conn):
+    store.insert_contacts_bulk(conn, [person(1, phones=['050 000 00 01']), person(2, emails=['shared@x.org']),
+                                      person(3, emails=['Shared@X.org'])])
+    store.add_to_treasure_vault(conn, 'u1', 'Контакт 1', 'друг')
+
+    [found] = store.find_by_phone(conn, '+994 50 000-00-01')
+    assert found['user_id'] == 'u1' and found['relationship'] == 'друг'
+    assert set(found) == set(store._CONTACT_COLUMNS)
+    assert sorted(row['user_id'] for row in store.find_by_email(conn, ' SHARED@x.org')) == ['u2', 'u3']
+    assert store.find_by_email(conn, 'nobody@x.org') == []
+
+def test_find_many_by_phone_spans_chunks(conn, monkeypatch):
+    monkeypatch.setattr(store, '_LOOKUP_CHUNK_SIZE', 3)
+    store.insert_contacts_bulk(conn, [person(i) for i in range(10)])
+    phones = [f'0500{i:06d}' for i in range(12)] + ['0500000001'] # Национальный формат, повтор номера
+    found = store.find_many_by_phone(conn, phones)
+    assert list(found) == list(dict.fromkeys(phones))
+    assert [len(found[phone]) for phone in phones] == [1] * 10 + [0, 0, 1]
+    assert found['0500000007'][0]['user_id'] == 'u7'
+
+def test_lookup_uses_key_indexes(conn):
+    for table, column in (('emails', 'email_key'), ('phones', 'phone_key')):
+        plan = " ".join(row[3] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT user_id FROM {table} WHERE {column} IN (?, ?);", ('a', 'b')))
+        assert f"idx_{table}_key" in plan
+
+# --- HypooStore: соединение записи и пул читателей ---
+
+def test_store_readers_are_read_only_and_not_blocked_by_writer(tmp_path):
+    with store.HypooStore(str(tmp_path / 'hypoo.db'), readers=2) as hypoo:
+        hypoo.insert_contacts_bulk([person(i) for i in range(3)])
+        with hypoo.writer() as conn:
+            assert conn.execute("PRAGMA journal_mode;").fetchone() == ('wal',)
+            conn.execute("BEGIN IMMEDIATE;")
+            conn.execute("DELETE FROM contacts;")
+            with hypoo.reader() as reader: # WAL: читатель видит последнее подтвержденное состояние, не ожидая
+                assert count(reader, 'contacts') == 3
+                with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                    reader.execute("DELETE FROM contacts;")
+            conn.rollback()
+        assert hypoo.status()['contacts'] == 3
+
+def test_store_serves_readers_from_many_threads(tmp_path):
+    with store.HypooStore(str(tmp_path / 'hypoo.db'), readers=2) as hypoo:
+        hypoo.insert_contacts_bulk([person(i) for i in range(20)])
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            found = list(pool.map(lambda i: hypoo.find_by_phone(f'0500{i:06d}'), range(20)))
+        assert [rows[0]['user_id'] for rows in found] == [f'u{i}' for i in range(20)]
+
+def test_in_memory_store_reads_through_writer():
+    with store.HypooStore(':memory:') as hypoo:
+        hypoo.insert_contacts_bulk([person(1)])
+        with hypoo.writer() as writer, hypoo.reader() as reader: # RLock: тот же поток может держать оба
+            assert reader is writer
+        assert hypoo.find_by_email('USER1@example.com')[0]['name'] == 'Контакт 1'
+
+def test_create_connection_keeps_sqlite_defaults(tmp_path):
+    conn = store.create_connection(str(tmp_path / 'plain.db'))
+    assert conn.execute("PRAGMA journal_mode;").fetchone() == ('delete',)
+    assert conn.execute("PRAGMA foreign_keys;").fetchone() == (0,)
+    conn.close()
+    conn = store.create_connection(str(tmp_path / 'plain.db'), foreign_keys=True)
+    assert conn.execute("PRAGMA foreign_keys;").fetchone() == (1,)
+    conn.close()
+
+# --- Сжатые сырые данные People API ('raw_people') ---
+
+def raw(i, **changes):
+    return dict({'resourceName': f'people/c{i}', 'names': [{'displayName': f'Контакт {i}'}],
+                 'biographies': [{'value': 'очень длинная заметка ' * 20}]}, **changes)
+
+def test_raw_sink_writes_batches_and_skips_unchanged_payloads(conn):
+    with store.RawPeopleSink(conn, batch_size=3) as sink:
+        for i in range(4):
+            sink(f'u{i}', raw(i))
+        assert count(conn, 'raw_people') == 3 # Полная пачка уже записана, неполная ждет закрытия
+    assert sink.written == 4 and count(conn, 'raw_people') == 4
+    assert store.get_raw_person(conn, 'u2') == raw(2)
+    assert store.get_raw_person(conn, 'нет такого') is None
+
+    assert store.store_raw_people(conn, [('u0', raw(0)), ('u1', raw(1, names=[]))]) == 1
+    assert store.get_raw_person(conn, 'u1')['names'] == []
+
+def test_raw_payload_is_compressed(conn):
+    store.store_raw_people(conn, [('u1', raw(1))])
+    (payload,) = conn.execute("SELECT payload FROM raw_people;").fetchone()
+    assert len(payload) < len(str(raw(1)).encode('utf-8')) / 4
+
+def test_deleted_contact_loses_raw_payload(conn):
+    store.sync_contacts(conn, [person(1), person(2)])
+    store.store_raw_people(conn, [('u1', raw(1)), ('u2', raw(2))])
+    store.sync_contacts(conn, [person(1), dict(person(2), deleted=True)])
+    assert store.get_raw_person(conn, 'u2') is None and store.get_raw_person(conn, 'u1') == raw(1)
+
+# --- Журнал изменений (changes_since, iter_changes) ---
+
+def changed(conn, cursor=0):
+    changes, _ = store.changes_since(conn, cursor, limit=1000)
+    return [(change['user_id'], change['deleted']) for change in changes]
+
+def test_change_feed_records_inserts_updates_and_deletes(conn):
+    store.sync_contacts(conn, [person(i) for i in range(3)])
+    changes, cursor = store.changes_since(conn)
+    assert [(change['user_id'], change['name'], change['deleted']) for change in changes] == [
+        ('u0', 'Контакт 0', False), ('u1', 'Контакт 1', False), ('u2', 'Контакт 2', False)]
+    assert store.changes_since(conn, cursor) == ([], cursor)
+
+    store.sync_contacts(conn, [person(i) for i in range(3)]) # Без изменений - журнал не растет
+    with conn:
+        conn.execute("UPDATE contacts SET scored_at = DATETIME('now'), last_updated = '2020-01-01';")
+    assert changed(conn, cursor) == []
+
+    store.sync_contacts(conn, [person(0, name="Новое имя"), dict(person(1), deleted=True)])
+    with conn:
+        conn.execute("UPDATE contacts SET ideology_score = 5.0 WHERE user_id = 'u2';")
+    assert changed(conn, cursor) == [('u0', False), ('u1', True), ('u2', False)]
+    deleted = store.changes_since(conn, cursor)[0][1]
+    assert deleted['name'] is None and deleted['change_seq'] > cursor
+    assert changed(conn) == [('u0', False), ('u1', True), ('u2', False)] # Одна строка на контакт
+
+def test_iter_changes_resumes_from_saved_cursor(conn):
+    store.insert_contacts_bulk(conn, [person(i) for i in range(7)])
+    pages = list(store.iter_changes(conn, page_size=3))
+    assert [[change['user_id'] for change in page] for page, _ in pages] == [['u0', 'u1', 'u2'], ['u3', 'u4', 'u5'], ['u6']]
+    store.insert_contacts_bulk(conn, [person(7)])
+    assert [[change['user_id'] for change in page] for page, _ in store.iter_changes(conn, pages[-1][1])] == [['u7']]
+
+def test_change_feed_added_to_existing_database_lists_all_contacts():
+    conn = sqlite3.connect(':memory:')
+    store.create_tables(conn)
+    store.insert_contacts_bulk(conn, [person(i) for i in range(3)])
+    with conn:
+        conn.execute("DROP TABLE contact_changes;")
+        for trigger in ('insert', 'update', 'delete'):
+            conn.execute(f"DROP TRIGGER contacts_change_{trigger};")
+    store.create_tables(conn)
+    assert changed(conn) == [('u0', False), ('u1', False), ('u2', False)]
+    conn.close()
@@ -0,0 +1,165 @@
+# Тесты iter_google_contacts (Hypoo_get_conract) на локальной замене People API
+
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+import Hypoo_get_conract as fetch
+from fake_people import FakePeopleService
+
+class RecordingService(FakePeopleService):
+    """FakePeopleService, запоминающий параметры каждого запроса list()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+
+    def page(self, kwargs):
+        self.requests.append(dict(kwargs))
+        return super().page(kwargs)
+
+def test_pagination_yields_every_contact_once():
+    service = RecordingService(250)
+    stats = {}
+    contacts = list(fetch.iter_google_contacts(service, sync_token_file=None, page_size=100, stats=stats))
+
+    assert [contact['user_id'] for contact in contacts] == [f'{i:016x}' for i in range(250)]
+    assert stats == {'full_sync': True, 'pages': 3, 'contacts': 250, 'next_sync_token': None}
+    assert [request.get('pageToken') for request in service.requests] == [None, '100', '200']
+    assert not any(request['requestSyncToken'] for request in service.requests)
+
+def test_contacts_are_streamed_page_by_page():
+    service = FakePeopleService(250)
+    contacts = fetch.iter_google_contacts(service, sync_token_file=None, page_size=100)
+    next(contacts)
+    assert service.calls == 1
+
+def test_raw_sink_receives_person_instead_of_raw_data():
+    received = []
+    contacts = list(fetch.iter_google_contacts(FakePeopleService(3), sync_token_file=None,
+                                               raw_sink=lambda user_id, person: received.append((user_id, person))))
+    assert all('raw_data' not in contact for contact in contacts)
+    assert [user_id for user_id, _ in received] == [contact['user_id'] for contact in contacts]
+    assert received[0][1]['resourceName'] == 'people/c0'
+
+def test_sync_token_round_trip(tmp_path):
+    token_file = str(tmp_path / 'sync_token.json')
+    stats = {}
+    full = list(fetch.iter_google_contacts(FakePeopleService(250), sync_token_file=token_file, page_size=100, stats=stats))
+    assert len(full) == 250 and stats['full_sync']
+    assert stats['next_sync_token'] == 'fake-sync-3'
+    assert fetch.load_sync_token(token_file) is None # Токен сохраняет вызывающий код, после записи контактов
+
+    fetch.save_sync_token(stats['next_sync_token'], token_file)
+    service = RecordingService(250, changed_ids=[5, 7], deleted_ids=[9])
+    changes = list(fetch.iter_google_contacts(service, sync_token_file=token_file, page_size=100, stats=stats))
+
+    assert service.requests[0]['syncToken'] == 'fake-sync-3'
+    assert not stats['full_sync'] and stats['pages'] == 1
+    assert [contact['user_id'] for contact in changes] == [f'{5:016x}', f'{7:016x}', f'{9:016x}']
+    assert changes[-1] == {'user_id': f'{9:016x}', 'deleted': True}
+    assert stats['next_sync_token'] == 'fake-sync-1'
+
+class ExpiringTokenService(RecordingService):
+    """Отвечает HTTP 410 на запрос с syncToken, как People API на истекший токен."""
+
+    def __init__(self, http_error, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_error = http_error
+
+    def page(self, kwargs):
+        if kwargs.get('syncToken'):
+            self.requests.append(dict(kwargs))
+            raise self.http_error(410)
+        return super().page(kwargs)
+
+@pytest.fixture
+def http_error(monkeypatch):
+    """Класс HttpError в подмененном модуле googleapiclient.errors (is_http_error ищет его в sys.modules)."""
+    class HttpError(Exception):
+        def __init__(self, status):
+            super().__init__(f"HTTP {status}")
+            self.resp = types.SimpleNamespace(status=status)
+
+    module = types.ModuleType('googleapiclient.errors')
+    module.HttpError = HttpError
+    monkeypatch.setitem(sys.modules, 'googleapiclient.errors', module)
+    return HttpError
+
+def test_expired_sync_token_falls_back_to_full_sync(tmp_path, http_error):
+    token_file = str(tmp_path / 'sync_token.json')
+    fetch.save_sync_token('expired', token_file)
+    service = ExpiringTokenService(http_error, 120, changed_ids=[1])
+    stats = {}
+    contacts = list(fetch.iter_google_contacts(service, sync_token_file=token_file, page_size=100, stats=stats))
+
+    assert len(contacts) == 120
+    assert stats['full_sync'] and stats['pages'] == 2
+    assert service.requests[0]['syncToken'] == 'expired'
+    assert all('syncToken' not in request for request in service.requests[1:])
+    assert stats['next_sync_token'] is not None
+
+def test_other_http_errors_are_raised(tmp_path, http_error):
+    class FailingService(FakePeopleService):
+        def page(self, kwargs):
+            raise http_error(500)
+
+    token_file = str(tmp_path / 'sync_token.json')
+    fetch.save_sync_token('valid', token_file)
+    with pytest.raises(http_error):
+        list(fetch.iter_google_contacts(FailingService(10), sync_token_file=token_file))
+
+def test_user_id_from_resource_name():
+    assert fetch.user_id_from_resource_name('people/c255') == '00000000000000ff'
+    assert fetch.user_id_from_resource_name('people/123') == '123'
+    person = {'resourceName': 'people/c255', 'metadata': {'deleted': True}}
+    assert fetch.parse_person(person) == {'user_id': '00000000000000ff', 'deleted': True}
+
+# --- Ленивая загрузка библиотек Google и кэш сервиса ---
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(code, *args, cwd=ROOT):
+    """Выполняет code в новом интерпретаторе (модули Hypoo доступны через PYTHONPATH) и возвращает вывод."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, '-c', code, *args], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=True).stdout
+
+def test_importing_modules_does_not_load_google_libraries():
+    loaded = run_python("import sys, Hypoo_get_conract, Hypoo_sync; "
+                        "print(sorted({name.split('.')[0] for name in sys.modules} & {'googleapiclient', 'google', 'httplib2'}))")
+    assert loaded.strip() == "[]"
+
+def test_status_and_lookup_commands_work_without_google(tmp_path):
+    db = str(tmp_path / 'hypoo.db')
+    script = os.path.join(ROOT, 'Hypoo_sync.py')
+    code = ("import runpy, sys; sys.argv = [sys.argv[1], '--db', sys.argv[2]] + sys.argv[3:]; "
+            "runpy.run_path(sys.argv[0], run_name='__main__'); print('google' in sys.modules)")
+    assert "Контактов: 0" in run_python(code, script, db, 'status', cwd=tmp_path)
+    output = run_python(code, script, db, 'lookup', '+994501234567', cwd=tmp_path)
+    assert "не найден" in output and output.splitlines()[-1] == "False"
+
+def test_discovery_document_is_cached_locally(tmp_path, monkeypatch):
+    pytest.importorskip('googleapiclient')
+    cache = tmp_path / 'people_v1_discovery.json'
+    monkeypatch.setattr(fetch, 'DISCOVERY_CACHE_FILE', str(cache))
+    document = fetch.load_discovery_document()
+    if document is None:
+        pytest.skip("в этой версии googleapiclient нет статических discovery-документов")
+    assert cache.read_text(encoding='utf-8') == document and '"people"' in document
+
+    cache.write_text('{"name": "people", "cached": true}', encoding='utf-8')
+    assert fetch.load_discovery_document() == '{"name": "people", "cached": true}'
+
+def test_people_service_is_created_once(tmp_path, monkeypatch):
+    pytest.importorskip('google.oauth2.credentials')
+    monkeypatch.setattr(fetch, 'TOKEN_FILE', str(tmp_path / 'нет_токена.json'))
+    monkeypatch.setattr(fetch, '_people_service', None)
+    assert fetch.get_people_service() is None
+
+    service = FakePeopleService(1)
+    monkeypatch.setattr(fetch, '_people_service', service)
+    assert fetch.get_people_service() is service
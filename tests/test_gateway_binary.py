@@ -0,0 +1,70 @@
+# Тесты двоичного формата запросов шлюза (gateway_binary) против JSON-обработки python_gateway
+
+import math
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import gateway_binary
+import python_gateway
+
+def roundtrip(operation, num1, num2, request_id=7):
+    return gateway_binary.decode_response(gateway_binary.handle_frame(
+        gateway_binary.encode_request(operation, num1, num2, request_id)))
+
+@pytest.mark.parametrize('operation', sorted(gateway_binary.OPERATION_CODES))
+@pytest.mark.parametrize('num1, num2', [
+    ([1, 2, 3], [4, 5, 6]),
+    ([1.5, -2.25, 1e300], [0.5, 4.0, 10.0]),
+    ([3, 5, 7], 2),
+    (2.5, [1, 2, 4]),
+])
+def test_binary_result_matches_json(operation, num1, num2):
+    response = roundtrip(operation, num1, num2)
+    expected = python_gateway.process_request({"operation": operation, "num1": num1, "num2": num2})
+    assert response['id'] == 7 and response['status'] == expected["status"] == "success"
+    assert response['result'].tolist() == expected["result"]
+
+def test_division_by_zero_is_partial_with_nan():
+    response = roundtrip('divide', [1.0, 4.0, 9.0, 1.0], [1.0, 0.0, 3.0, 0.0])
+    assert response['status'] == "partial" and response['errors'].tolist() == [1, 3]
+    result = response['result'].tolist()
+    assert result[0] == 1.0 and result[2] == 3.0 and math.isnan(result[1]) and math.isnan(result[3])
+
+def test_integers_stay_integers():
+    response = roundtrip('add', np.array([2**40, 1], dtype=np.int64), [1, 1])
+    assert response['result'].dtype == np.dtype('<i8') and response['result'].tolist() == [2**40 + 1, 2]
+
+def test_malformed_requests_get_error_with_request_id():
+    good = gateway_binary.encode_request('add', [1.0, 2.0], [3.0, 4.0], request_id=42)
+    header = bytearray(good[:24])
+
+    def error(payload):
+        response = gateway_binary.decode_response(gateway_binary.handle_frame(bytes(payload)))
+        assert response['status'] == "error"
+        return response
+
+    assert error(good[:10])['id'] == 0 # Заголовок не прочитать - id неизвестен
+    assert error(good[:-8])['message'].startswith("Длина двоичного запроса")
+    assert error(bytes([*header[:4], 99, *header[5:]]) + good[24:])['id'] == 42
+    assert "float64" in error(bytes([*header[:5], ord('f'), *header[6:]]) + good[24:])['message']
+    mismatched = gateway_binary.encode_request('add', [1.0, 2.0], [1.0, 2.0, 3.0])
+    assert "одной длины" in error(mismatched)['message']
+
+    response = gateway_binary.decode_response(gateway_binary.error_response_for(good, "сервер занят"))
+    assert response == {'id': 42, 'status': "error", 'message': "сервер занят"}
+
+def test_format_is_told_apart_from_json_and_counted_in_stats():
+    frame = gateway_binary.encode_request('multiply', [1, 2], 3)
+    assert gateway_binary.is_binary(frame) and not gateway_binary.is_binary(b'{"operation": "add"}')
+    assert struct.unpack_from('<I', frame, 16) == (2,) and len(frame) == 24 + 8 * 3
+
+    python_gateway.STATS.reset()
+    gateway_binary.handle_frame(frame)
+    gateway_binary.handle_frame(b'HYB1')
+    snapshot = python_gateway.STATS.snapshot()
+    python_gateway.STATS.reset()
+    assert snapshot["binary:multiply"]["count"] == 1
+    assert snapshot["binary:unknown"]["errors"] == 1
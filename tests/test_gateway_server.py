@@ -0,0 +1,147 @@
+# Тесты сервера шлюза (gateway_server) через клиент GatewayClient на временном Unix-сокете
+
+import asyncio
+import json
+import math
+import os
+import tempfile
+
+import pytest
+
+import gateway_server
+from gateway_server import GatewayClient, GatewayServer, read_frame, write_frame
+
+@pytest.fixture
+def socket_path():
+    # Путь Unix-сокета ограничен ~100 символами, поэтому каталог короткий, а не tmp_path
+    with tempfile.TemporaryDirectory(prefix='hypoo') as directory:
+        yield os.path.join(directory, 'gw.sock')
+
+def run_with_server(socket_path, scenario, **server_options):
+    """Запускает сервер на socket_path, выполняет scenario(client) и возвращает его результат."""
+    async def main():
+        server = GatewayServer(socket_path, **server_options)
+        await server.start()
+        client = await GatewayClient.connect(socket_path)
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(main())
+
+def test_concurrent_requests_get_their_own_responses(socket_path):
+    async def scenario(client):
+        return await asyncio.gather(*(client.request({"operation": "multiply", "num1": i, "num2": 3}) for i in range(50)))
+
+    responses = run_with_server(socket_path, scenario, workers=0)
+    assert [response["result"] for response in responses] == [i * 3 for i in range(50)]
+    assert all(response["status"] == "success" for response in responses)
+    assert not os.path.exists(socket_path) # close() убирает сокет
+
+def test_json_operations_and_envelopes(socket_path):
+    async def scenario(client):
+        return await asyncio.gather(
+            client.request({"operation": "upper_case", "input_string": "hypoo"}),
+            client.request({"operation": "add", "num1": [1, 2, 3], "num2": 10}),
+            client.request({"requests": [{"id": "a", "operation": "subtract", "num1": 5, "num2": 2},
+                                         {"id": "b", "requests": []}]}),
+        )
+
+    text, arrays, envelope = run_with_server(socket_path, scenario, workers=0)
+    assert text["result"] == "HYPOO"
+    assert arrays["result"] == [11, 12, 13]
+    assert [response["id"] for response in envelope["responses"]] == ["a", "b"]
+    assert envelope["responses"][0]["result"] == 3
+    assert envelope["responses"][1]["status"] == "error" # Вложенный конверт не выполняется
+
+def test_binary_requests(socket_path):
+    async def scenario(client):
+        return await asyncio.gather(client.request_binary('divide', [1.0, 4.0, 9.0], [1.0, 0.0, 3.0]),
+                                    client.request_binary('add', [1, 2], [3, 4]))
+
+    divided, added = run_with_server(socket_path, scenario, workers=0)
+    assert divided["status"] == "partial"
+    assert divided["result"][[0, 2]].tolist() == [1.0, 3.0]
+    assert math.isnan(divided["result"][1]) # На месте деления на ноль - NaN
+    assert divided["errors"].tolist() == [1]
+    assert added["status"] == "success" and added["result"].tolist() == [4, 6]
+
+def test_heavy_requests_go_through_process_pool(socket_path):
+    async def scenario(client):
+        size = 2000
+        response = await client.request({"operation": "add", "num1": list(range(size)), "num2": 1})
+        stats = await client.request({"operation": "stats"})
+        return response, stats
+
+    response, stats = run_with_server(socket_path, scenario, workers=1, heavy_frame_bytes=1024)
+    assert response["result"] == list(range(1, 2001))
+    assert stats["result"]["add"]["count"] >= 1 # Статистика процесса пула добавлена к статистике сервера
+
+def test_malformed_frame_gets_error_with_null_id(socket_path):
+    async def scenario(client):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        write_frame(writer, b'{not json')
+        await writer.drain()
+        response = json.loads(await read_frame(reader))
+        writer.close()
+        await writer.wait_closed()
+        return response
+
+    response = run_with_server(socket_path, scenario, workers=0)
+    assert response["status"] == "error" and response["id"] is None
+
+def test_pending_request_fails_when_connection_closes(socket_path):
+    async def hang_up(reader, writer): # Сервер, который читает запрос и закрывает соединение без ответа
+        await read_frame(reader)
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_unix_server(hang_up, path=socket_path)
+        async with server:
+            client = await GatewayClient.connect(socket_path)
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(client.request({"operation": "add", "num1": 1, "num2": 2}), timeout=5)
+            await client.close()
+
+    asyncio.run(main())
+
+def test_frame_size_limit(monkeypatch, socket_path):
+    monkeypatch.setattr(gateway_server, 'MAX_FRAME_BYTES', 16)
+
+    async def scenario(client):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        write_frame(writer, json.dumps({"operation": "add", "num1": 1, "num2": 2}).encode('utf-8'))
+        await writer.drain()
+        closed = await read_frame(reader) # Сервер закрывает соединение, не отвечая
+        writer.close()
+        return closed
+
+    assert run_with_server(socket_path, scenario, workers=0) is None
+
+def test_client_disconnecting_mid_frame_is_treated_as_eof(socket_path, capsys):
+    async def scenario(client):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(gateway_server._HEADER.pack(100) + b'{"operation"') # Заголовок и часть кадра
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.05)
+        return await client.request({"operation": "add", "num1": 1, "num2": 2}) # Сервер продолжает работать
+
+    loop_errors = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+        server = GatewayServer(socket_path, workers=0)
+        await server.start()
+        client = await GatewayClient.connect(socket_path)
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await server.close()
+
+    assert asyncio.run(main())["result"] == 3
+    assert loop_errors == []
+    assert "Соединение с клиентом шлюза закрыто" not in capsys.readouterr().out
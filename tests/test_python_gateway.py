@@ -0,0 +1,173 @@
+# Тесты шлюза для C# (python_gateway): разбор запросов, операции, конверты и статистика
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import python_gateway
+
+def call(request):
+    """process_data_for_csharp для словаря или готовой JSON-строки; ответ - словарь."""
+    text = request if isinstance(request, str) else json.dumps(request)
+    return json.loads(python_gateway.process_data_for_csharp(text))
+
+@pytest.mark.parametrize('text', ['[1, 2]', '"x"', '5', 'null', 'true'])
+def test_json_that_is_not_an_object_gets_error_response(text):
+    assert call(text) == {"status": "error", "message": "Запрос должен быть JSON-объектом."}
+    assert json.loads(python_gateway.handle_line(text))["status"] == "error"
+
+def test_malformed_json_gets_error_response():
+    assert call('{"num1": ')["message"] == "Некорректный JSON формат входной строки."
+
+# --- Реестр операций и статистика ---
+
+@pytest.fixture
+def stats():
+    python_gateway.STATS.reset()
+    yield python_gateway.STATS
+    python_gateway.STATS.reset()
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Реестр операций, который восстанавливается после теста."""
+    monkeypatch.setattr(python_gateway, 'OPERATIONS', dict(python_gateway.OPERATIONS))
+    return python_gateway.OPERATIONS
+
+def test_process_request_rejects_non_objects(stats):
+    for data in ([1, 2], "x", 5, None):
+        assert python_gateway.process_request(data)["status"] == "error"
+    assert stats.snapshot()["unknown"]["errors"] == 4
+
+def test_envelope_answers_every_entry_even_if_some_are_malformed():
+    response = call({"requests": [{"id": 1, "operation": "add", "num1": 1, "num2": 2},
+                                  [1, 2], None, "x",
+                                  {"id": 5, "operation": ["not", "hashable"], "num1": 1, "num2": 2},
+                                  {"id": 6, "operation": "multiply", "num1": 2, "num2": 3}]})
+    assert response["status"] == "success"
+    statuses = [entry["status"] for entry in response["responses"]]
+    assert statuses == ["success", "error", "error", "error", "error", "success"]
+    assert response["responses"][-1] == {"status": "success", "operation": "multiplication",
+                                         "input_nums": [2, 3], "result": 6, "id": 6}
+    assert call({"requests": {"id": 1}})["status"] == "error"
+
+def test_registered_operation_is_dispatched(registry):
+    @python_gateway.register_operation('reverse')
+    def reverse(data):
+        if 'input_string' not in data:
+            return None
+        return {"status": "success", "operation": "reverse", "result": data['input_string'][::-1]}
+
+    assert call({"operation": "reverse", "input_string": "abc"})["result"] == "cba"
+    assert call({"operation": "reverse"})["message"].startswith("Недостаточно данных")
+
+def test_unknown_operations_and_handler_errors(registry):
+    python_gateway.register_operation('broken', lambda data: 1 / 0)
+    assert call({"operation": "broken"})["message"].startswith("Произошла ошибка при обработке")
+    assert call({"operation": "power", "num1": 2, "num2": 3})["message"].startswith(
+        "Неизвестная или неподдерживаемая числовая операция: 'power'")
+    assert call({"operation": "power"})["message"].startswith("Недостаточно данных")
+
+def test_stats_count_requests_errors_and_latency(stats):
+    for i in range(3):
+        call({"operation": "add", "num1": i, "num2": 1})
+    call({"operation": "divide", "num1": 1, "num2": 0})
+    call({"operation": "no_such_operation"})
+    call({"requests": [{"operation": "add", "num1": 1, "num2": 1}]})
+
+    summary = call({"operation": "stats", "reset": True})["result"]
+    assert summary["add"]["count"] == 4 and summary["add"]["errors"] == 0
+    assert summary["divide"]["errors"] == 1
+    assert summary["unknown"]["count"] == 1
+    assert summary["requests"]["count"] == 1
+    assert sum(summary["add"]["histogram_ms"].values()) == 4
+    assert summary["add"]["p50_ms"] is not None and summary["add"]["max_ms"] >= summary["add"]["avg_ms"]
+    assert "add" not in call({"operation": "stats"})["result"] # "reset": true обнулил счетчики
+
+def test_stats_merge_and_drain():
+    worker, server = python_gateway.OperationStats(), python_gateway.OperationStats()
+    worker.record('add', 0.002)
+    worker.record('add', 0.2, error=True)
+    server.record('add', 0.0001)
+    server.merge(worker.drain())
+    assert worker.snapshot() == {}
+    merged = server.snapshot()['add']
+    assert merged['count'] == 3 and merged['errors'] == 1 and merged['max_ms'] == 200.0
+    assert merged['histogram_ms'] == {"<=0.1": 1, "<=5": 1, "<=500": 1}
+    assert merged['p99_ms'] == 500
+
+# --- Постоянный режим --serve ---
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_serve_answers_each_line_with_its_id():
+    requests = io.StringIO('{"id": 1, "operation": "add", "num1": 1, "num2": 2}\n'
+                           '\n'
+                           '{"id": "b", "operation": "upper_case", "input_string": "привет"}\n'
+                           '{"id": 3, "num1": \n'
+                           '[1, 2]\n')
+    output = io.StringIO()
+    python_gateway.serve(requests, output)
+    lines = output.getvalue().splitlines()
+    assert "ПРИВЕТ" in lines[1] # Ответ не экранирует кириллицу
+    responses = [json.loads(line) for line in lines]
+    assert [(response["id"], response["status"]) for response in responses] == [
+        (1, "success"), ("b", "success"), (None, "error"), (None, "error")]
+    assert responses[0]["result"] == 3 and responses[1]["result"] == "ПРИВЕТ"
+
+def test_serve_process_replies_line_by_line():
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'python_gateway.py'), '--serve'],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        for i in range(3): # Ответ приходит до следующего запроса: буфер сбрасывается после каждой строки
+            process.stdin.write(json.dumps({"id": i, "operation": "multiply", "num1": i, "num2": 10}) + "\n")
+            process.stdin.flush()
+            assert json.loads(process.stdout.readline()) == {
+                "status": "success", "operation": "multiplication", "input_nums": [i, 10], "result": i * 10, "id": i}
+        process.stdin.close()
+        assert process.stdout.read() == "" and process.wait(timeout=10) == 0
+    finally:
+        process.kill()
+        process.wait()
+
+def test_single_request_from_command_line_prints_only_the_response():
+    output = subprocess.run([sys.executable, os.path.join(ROOT, 'python_gateway.py'),
+                             '{"operation": "divide", "num1": 1, "num2": 4}'],
+                            capture_output=True, text=True, check=True).stdout
+    assert json.loads(output)["result"] == 0.25 and output.count("\n") == 1
+
+# --- Пакетные (векторные) операции и конверты ---
+
+def test_numeric_arrays_with_division_by_zero_are_partial():
+    pytest.importorskip('numpy')
+    response = call({"operation": "divide", "num1": [10, 20, 30], "num2": [2, 0, 5]})
+    assert response["status"] == "partial" and response["result"] == [5.0, None, 6.0]
+    assert response["errors"] == [{"index": 1, "message": "Деление на ноль невозможно."}]
+    assert call({"operation": "add", "num1": [1, 2, 3], "num2": 10})["result"] == [11, 12, 13]
+    assert call({"operation": "subtract", "num1": 1.5, "num2": [0.5, 1.0]})["result"] == [1.0, 0.5]
+
+def test_numeric_arrays_must_be_flat_numbers_of_equal_length():
+    pytest.importorskip('numpy')
+    assert "одной длины" in call({"operation": "add", "num1": [1, 2], "num2": [1, 2, 3]})["message"]
+    for bad in (["a", "b"], [[1], [2]]):
+        assert call({"operation": "multiply", "num1": bad, "num2": 2})["status"] == "error"
+
+def test_string_operations_accept_lists():
+    assert call({"operation": "concatenate", "str1": ["a", "b"], "str2": "!"})["result"] == ["a!", "b!"]
+    assert call({"operation": "concatenate", "str1": ["a", "b"], "str2": ["1", "2"]})["result"] == ["a1", "b2"]
+    assert call({"operation": "concatenate", "str1": ["a"], "str2": ["1", "2"]})["status"] == "error"
+    assert call({"operation": "upper_case", "input_string": ["ab", "вг"]})["result"] == ["AB", "ВГ"]
+
+def test_echo_inputs_false_drops_input_fields():
+    response = call({"operation": "lower_case", "input_string": ["A", "B"], "echo_inputs": False})
+    assert response == {"status": "success", "operation": "to_lower_case", "result": ["a", "b"]}
+    assert "input_nums" in call({"operation": "add", "num1": 1, "num2": 2})
+
+def test_nested_envelopes_are_rejected():
+    response = call({"requests": [{"id": 1, "requests": [{"operation": "add", "num1": 1, "num2": 2}]},
+                                  {"id": 2, "operation": "add", "num1": 1, "num2": 2}]})
+    assert response["responses"][0] == {"status": "error", "message": "Вложенные конверты запросов не поддерживаются.", "id": 1}
+    assert response["responses"][1]["result"] == 3
@@ -0,0 +1,67 @@
+# Тесты оценки контактов (Hypoo_scoring): векторный расчет и инкрементальный пересчет по частичному индексу
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import Hypoo_data_store as store
+import Hypoo_get_conract as fetch
+import Hypoo_scoring as scoring
+from fake_people import fake_person
+
+def contact(i, **changes):
+    return dict(fetch.parse_person(fake_person(i), keep_raw=False), **changes)
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    store.create_tables(conn)
+    store.sync_contacts(conn, [contact(i) for i in range(50)])
+    age(conn)
+    yield conn
+    conn.close()
+
+def age(conn):
+    """Сдвигает last_updated в прошлое: в тестах изменения и расчет приходятся на одну секунду."""
+    with conn:
+        conn.execute("UPDATE contacts SET last_updated = '2020-01-01 00:00:00';")
+
+def waiting(conn):
+    """Контакты в частичном индексе - ждущие пересчета."""
+    return conn.execute("SELECT COUNT(*) FROM contacts INDEXED BY idx_contacts_unscored "
+                        "WHERE scored_at IS NULL OR last_updated >= scored_at;").fetchone()[0]
+
+def test_compute_scores_applies_weighted_rules():
+    rules = dict(scoring.DEFAULT_RULES, domains={'example.com': 1.0})
+    scores, our_person = scoring.compute_scores(
+        vault=[True, False, False], n_emails=[0, 10, 1], n_phones=[0, 1, 0],
+        domains=['', 'example.com', 'other.org'], phone_keys=['', '+99450123', '+7900'],
+        age_days=[1e9, 0, 365], rules=rules)
+    assert scores.tolist() == pytest.approx([10.0, 0.5 * 4 + 0.5 + 1.0 + 2.0 + 1.0, 0.5])
+    assert our_person.tolist() == [1, 1, 0]
+
+def test_rerun_scores_only_changed_contacts(conn):
+    assert scoring.score_contacts(conn)['scored'] == 50
+    assert waiting(conn) == 0
+    assert scoring.score_contacts(conn)['scored'] == 0
+
+    store.sync_contacts(conn, [contact(3, name="Новое имя"), contact(7, name="Другое")])
+    store.add_to_treasure_vault(conn, contact(9)['user_id'], contact(9)['name'], 'друг')
+    assert waiting(conn) == 3
+    result = scoring.score_contacts(conn, chunk_size=2)
+    assert result['scored'] == 3 and result['our_people'] >= 1
+    assert conn.execute("SELECT is_our_person FROM contacts WHERE user_id = ?;", (contact(9)['user_id'],)).fetchone() == (1,)
+
+def test_incremental_query_reads_the_partial_index(conn):
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + scoring._CHANGED_FEATURES_SQL,
+                                                   {'now': '2030-01-01', 'after': 0, 'limit': 10}))
+    assert "idx_contacts_unscored" in plan
+
+def test_full_rescore_rebuilds_index(conn):
+    scoring.score_contacts(conn)
+    result = scoring.score_contacts(conn, rules={'threshold': 0.0})
+    assert result['full'] and result['scored'] == result['our_people'] == 50
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_contacts_unscored';").fetchone()
+    assert waiting(conn) == 0 and scoring.score_contacts(conn, rules={'threshold': 0.0})['scored'] == 0
@@ -0,0 +1,90 @@
+# Тесты распространения активации (semantic_activation) против точного решения a = seeds + decay * W·a
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from semantic_activation import ActivationEngine
+from semantic_field import ConceptGraph, ConceptUnit
+
+TYPES = ["implies", "supports", "related_to"]
+
+def random_graph(concepts=60, edges=200, seed=0):
+    rng = random.Random(seed)
+    graph = ConceptGraph()
+    units = [ConceptUnit(f"слово {i}", f"C{i}", initial_value=rng.random(), graph=graph) for i in range(concepts)]
+    for _ in range(edges):
+        rng.choice(units).add_connection(rng.choice(units), rng.choice(TYPES), round(rng.uniform(0.05, 1.0), 3))
+    return graph, units
+
+def exact_activation(units, seeds, decay=0.5, direction='out', relationship_types=TYPES, normalize=True):
+    """Решение системы a = seeds + decay * W·a, где W собрана по get_connections/get_incoming."""
+    index = {unit: i for i, unit in enumerate(units)}
+    matrix = np.zeros((len(units), len(units)))
+    for unit in units:
+        links = []
+        if direction != 'in':
+            links += [(conn["concept"], conn["strength"]) for conn in unit.get_connections() if conn["type"] in relationship_types]
+        if direction != 'out':
+            links += [(conn["concept"], conn["strength"]) for conn in unit.get_incoming() if conn["type"] in relationship_types]
+        total = sum(strength for _, strength in links)
+        for neighbor, strength in links:
+            matrix[index[neighbor], index[unit]] += strength / total if normalize else strength
+    vector = np.array([seeds.get(unit, 0.0) for unit in units])
+    return np.linalg.solve(np.eye(len(units)) - decay * matrix, vector)
+
+@pytest.mark.parametrize('direction', ['out', 'in', 'both'])
+def test_run_matches_exact_solution(direction):
+    graph, units = random_graph(seed=1)
+    engine = ActivationEngine(graph, direction=direction, threshold=1e-12, max_iterations=1000)
+    seeds = {units[0]: 1.0, units[5]: 0.5}
+    result = engine.run(seeds)
+    assert result.converged
+    assert result.activation == pytest.approx(exact_activation(units, seeds, direction=direction), abs=1e-9)
+    assert result["C5"] == result[units[5]] == pytest.approx(result.activation[5])
+
+def test_type_filter_unnormalized_weights_and_default_seeds():
+    graph, units = random_graph(seed=2, edges=80)
+    engine = ActivationEngine(graph, relationship_types=["supports"], normalize=False, decay=0.1,
+                              threshold=1e-12, max_iterations=1000)
+    values = {unit: unit.value for unit in units}
+    expected = exact_activation(units, values, decay=0.1, relationship_types=["supports"], normalize=False)
+    assert engine.run().activation == pytest.approx(expected, abs=1e-9)
+
+def test_update_pushes_only_the_seed_difference():
+    graph, units = random_graph(seed=3)
+    engine = ActivationEngine(graph, threshold=1e-12, max_iterations=1000)
+    engine.run({units[0]: 1.0})
+    updated = engine.update({units[0]: 1.0, units[1]: 2.0})
+    expected = exact_activation(units, {units[0]: 1.0, units[1]: 2.0})
+    assert updated.activation == pytest.approx(expected, abs=1e-9)
+    assert engine.update({units[0]: 1.0, units[1]: 2.0}).iterations == 0 # Затравки не изменились
+
+def test_engine_follows_field_changes():
+    graph = ConceptGraph()
+    a, b, c = (ConceptUnit(word, word, graph=graph) for word in "abc")
+    a.add_connection(b, "implies", 1.0)
+    engine = ActivationEngine(graph, threshold=1e-12)
+    assert engine.run({a: 1.0})[c] == 0.0
+    b.add_connection(c, "implies", 1.0)
+    assert engine.update({a: 1.0})[c] == pytest.approx(0.25)
+    a.remove_connection(b)
+    assert engine.run({a: 1.0})[b] == 0.0
+
+def test_top_and_invalid_arguments():
+    graph = ConceptGraph()
+    a, b, c, d = (ConceptUnit(word, word, graph=graph) for word in "abcd")
+    a.add_connection(b, "implies", 3.0)
+    a.add_connection(c, "implies", 1.0)
+    result = ActivationEngine(graph, threshold=1e-12).run({"a": 1.0})
+    assert [unit for unit, _ in result.top(10)] == [a, b, c] # d без заряда не попадает
+    assert [unit for unit, _ in result.top(1, exclude=[a])] == [b]
+
+    with pytest.raises(ValueError):
+        ActivationEngine(graph, direction="sideways")
+    with pytest.raises(KeyError):
+        ActivationEngine(graph).run({"нет такого": 1.0})
+    with pytest.raises(ValueError):
+        ActivationEngine(graph).run({ConceptUnit("чужое", "X", graph=ConceptGraph()): 1.0})
@@ -0,0 +1,75 @@
+# Тесты объединения понятий (semantic_field.combine_concepts, combine_many) и кеша составных понятий
+
+import pytest
+
+from semantic_field import (COMPONENT_RELATIONSHIP, CompositionCache, ConceptGraph, ConceptUnit,
+                            combine_concepts, combine_many)
+
+def field(count=4):
+    graph = ConceptGraph()
+    return graph, [ConceptUnit(f"слово{i}", f"C{i}", f"мысль {i}", float(i + 1), graph=graph) for i in range(count)]
+
+def composite(unit):
+    """Поля составного понятия и его связи с компонентами."""
+    return (unit.word, unit.description, unit.value,
+            [(conn["concept"].concept_id, conn["type"], conn["strength"]) for conn in unit.get_connections()])
+
+def test_combine_concepts_builds_composite():
+    graph, (a, b, _, _) = field()
+    combined = combine_concepts(a, b)
+    assert combined.graph is graph
+    assert composite(combined) == ("слово0_слово1_combined", "Объединение: (мысль 0) и (мысль 1)", 3.0,
+                                   [("C0", COMPONENT_RELATIONSHIP, 1.0), ("C1", COMPONENT_RELATIONSHIP, 2.0)])
+    named = combine_concepts(a, b, new_word="пара", new_description="две мысли", relationship_type="part_of")
+    assert composite(named)[:2] == ("пара", "две мысли") and named.get_connections()[0]["type"] == "part_of"
+
+def test_repeated_combination_is_memoized_per_graph():
+    graph, (a, b, _, _) = field()
+    combined = combine_concepts(a, b)
+    assert combine_concepts(a, b) is combined
+    assert combine_concepts(b, a) is not combined # Порядок компонентов важен
+    assert combine_concepts(a, b, new_word="другое") is not combined
+    assert combine_concepts(a, b, cache=None) is not combined
+    assert graph.composition_cache.stats()['hits'] == 1
+
+    other, (x, y, _, _) = field() # Те же ID в другом поле - другое составное понятие
+    assert combine_concepts(x, y) is not combined and combine_concepts(x, y).graph is other
+
+def test_combine_many_matches_pairwise_combination():
+    graph, units = field(6)
+    pairs = [(units[0], units[1]), (units[2], units[3]), (units[0], units[1]), (units[4], units[5])]
+    existing = combine_concepts(units[2], units[3])
+    before = len(graph)
+
+    combined = combine_many(pairs)
+    assert combined[0] is combined[2] and combined[1] is existing
+    assert len(graph) == before + 2
+    reference_graph, reference_units = field(6)
+    assert [composite(unit) for unit in combined] == [
+        composite(combine_concepts(reference_units[i], reference_units[j], cache=None))
+        for i, j in ((0, 1), (2, 3), (0, 1), (4, 5))]
+    assert combine_many(pairs) == combined # Все уже в кеше
+    triple = combine_many(units[:3]) # Плоский список - одно понятие из всех компонентов
+    assert triple is combine_many(units[:3]) and composite(triple)[2] == 6.0
+
+def test_combine_many_without_cache_and_across_fields():
+    graph, (a, b, c, _) = field()
+    first, second = combine_many([(a, b), (a, b)], cache=None)
+    assert first is not second and len(graph) == 6
+    _, (x, y, _, _) = field()
+    mixed = combine_many([(a, c), (x, y)])
+    assert mixed[0].graph is graph and mixed[1].graph is x.graph
+    with pytest.raises(ValueError):
+        combine_concepts(a, x)
+    assert combine_many([]) == []
+
+def test_cache_evicts_least_recently_used():
+    graph, (a, b, c, d) = field()
+    cache = CompositionCache(max_size=2)
+    ab, bc = combine_concepts(a, b, cache=cache), combine_concepts(b, c, cache=cache)
+    assert combine_concepts(a, b, cache=cache) is ab # ab теперь использован последним
+    combine_concepts(c, d, cache=cache) # Вытесняет bc
+    assert combine_concepts(a, b, cache=cache) is ab and combine_concepts(b, c, cache=cache) is not bc
+    assert cache.stats()['evictions'] == 2 and len(cache) == 2
+    cache.clear()
+    assert cache.stats() == {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'hit_rate': 0.0}
@@ -0,0 +1,176 @@
+# Тесты хранения связей ConceptGraph (semantic_field): цепочки, пачки связей, удаление и уплотнение
+
+import random
+
+import pytest
+
+import semantic_field
+from semantic_field import ConceptGraph, ConceptUnit
+
+TYPES = ["related_to", "implies", "supports", "causes"]
+
+def random_rows(concepts, edges, seed):
+    rng = random.Random(seed)
+    # Несколько "центральных" понятий, чтобы их степень перешла порог TYPED_INDEX_MIN_DEGREE
+    return [(rng.randrange(4) if rng.random() < 0.3 else rng.randrange(concepts), rng.randrange(concepts),
+             rng.choice(TYPES), round(rng.random(), 3)) for _ in range(edges)]
+
+def new_graph(concepts):
+    graph = ConceptGraph()
+    graph.add_concepts((f"C{i}", f"слово {i}", None, 0.0) for i in range(concepts))
+    for name in TYPES:
+        graph.type_code(name)
+    return graph
+
+def chains(graph):
+    """Все запросы связей всех единиц (в обе стороны, всех и каждого типа) в виде номеров связей."""
+    return [(list(graph.out_edges(unit, name)), list(graph.in_edges(unit, name)))
+            for unit in graph.nodes for name in [None] + TYPES]
+
+def edge_rows(graph, edges):
+    return [(graph.sources[edge], graph.targets[edge], graph.relationship_types[graph.type_codes[edge]],
+             graph.strengths[edge]) for edge in edges]
+
+def add_one_by_one(graph, rows):
+    for source, target, name, strength in rows:
+        graph.add_edge(graph.nodes[source], graph.nodes[target], name, strength)
+
+def add_batch(graph, rows):
+    sources, targets, names, strengths = zip(*rows)
+    return graph.add_edges(sources, targets, [graph.type_code(name) for name in names], strengths)
+
+@pytest.fixture(params=['loop', 'vectorized'])
+def link_mode(request, monkeypatch):
+    if request.param == 'vectorized':
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(semantic_field, 'VECTOR_LINK_MIN_EDGES', 1)
+    return request.param
+
+def test_add_edges_builds_the_same_chains_as_add_edge(link_mode):
+    rows = random_rows(60, 1500, seed=1)
+    expected, batched = new_graph(60), new_graph(60)
+    add_one_by_one(expected, rows)
+    for start in range(0, len(rows), 400): # Несколько пачек: степени переходят порог и внутри пачки, и между ними
+        add_batch(batched, rows[start:start + 400])
+
+    assert chains(batched) == chains(expected)
+    assert any(batched._out_indexed) and any(batched._in_indexed)
+    assert batched.edge_count == expected.edge_count == len(rows)
+
+def test_add_edges_after_removals(link_mode):
+    rows = random_rows(60, 1500, seed=2)
+    expected, batched = new_graph(60), new_graph(60)
+    for graph in (expected, batched):
+        add_one_by_one(graph, rows[:300])
+        for edge in range(0, 300, 3):
+            graph.remove_edge(edge)
+    add_one_by_one(expected, rows[300:])
+    add_batch(batched, rows[300:])
+    assert chains(batched) == chains(expected)
+
+def test_add_edges_validates_columns():
+    graph = new_graph(3)
+    with pytest.raises(ValueError):
+        graph.add_edges([0, 1], [1], [0], [1.0])
+    with pytest.raises(ValueError):
+        graph.add_edges([0], [3], [0], [1.0])
+    with pytest.raises(ValueError):
+        graph.add_edges([0], [1], [len(TYPES)], [1.0])
+    assert graph.edge_count == 0 and graph.add_edges([], [], [], []) == range(0, 0)
+
+def test_typed_and_incoming_queries():
+    graph = ConceptGraph()
+    hub = ConceptUnit("центр", "HUB", graph=graph)
+    leaves = [ConceptUnit(f"лист {i}", f"L{i}", graph=graph) for i in range(40)] # Степень центра выше порога
+    for i, leaf in enumerate(leaves):
+        hub.add_connection(leaf, TYPES[i % 2], strength=0.5)
+        leaf.add_connection(hub, "supports", strength=0.25)
+
+    assert [conn["concept"] for conn in hub.get_connections("implies")] == leaves[1::2]
+    assert [conn["concept"] for conn in hub.get_incoming("supports")] == leaves
+    assert leaves[3].get_incoming() == [{"concept": hub, "type": "implies", "strength": 0.5}]
+    assert hub.get_connections("unknown") == []
+
+    assert hub.remove_connection(leaves[1]) == 1
+    assert leaves[1] not in [conn["concept"] for conn in hub.get_connections("implies")]
+    assert leaves[1].get_incoming() == []
+    assert graph.edge_count == 79
+
+def test_duplicate_concept_id_is_rejected():
+    graph = ConceptGraph()
+    ConceptUnit("любовь", "C1", graph=graph)
+    with pytest.raises(ValueError):
+        ConceptUnit("другое слово", "C1", graph=graph)
+    with pytest.raises(ValueError):
+        graph.add_concepts([("C2", "а", None, 0.0), ("C2", "б", None, 0.0)])
+    assert len(graph) == 1
+
+def test_compact_drops_removed_rows_and_keeps_queries():
+    graph = new_graph(60)
+    add_one_by_one(graph, random_rows(60, 1500, seed=3))
+    rng = random.Random(4)
+    for _ in range(600):
+        graph.remove_edge(rng.randrange(len(graph.sources)))
+    before = [edge_rows(graph, edges) for pair in chains(graph) for edges in pair]
+    version = graph.version
+
+    removed = graph.compact()
+    assert removed > 0 and len(graph.sources) == graph.edge_count == 1500 - removed
+    assert min(graph.type_codes) >= 0
+    assert [edge_rows(graph, edges) for pair in chains(graph) for edges in pair] == before
+    assert graph.version > version
+    assert graph.compact() == 0
+
+def test_remove_connections_compacts_automatically(monkeypatch):
+    monkeypatch.setattr(semantic_field, 'COMPACT_MIN_REMOVED', 10)
+    graph = new_graph(10)
+    add_one_by_one(graph, [(0, target, "related_to", 1.0) for target in range(1, 10)] * 5)
+    add_one_by_one(graph, [(1, 2, "implies", 1.0)] * 5)
+
+    assert graph.nodes[0].remove_connection(graph.nodes[3]) == 5
+    assert graph.nodes[0].remove_connection(graph.nodes[4]) == 5
+    assert graph._removed == 10 # 10 из 50 строк - меньше COMPACT_REMOVED_FRACTION
+    assert graph.nodes[0].remove_connection(graph.nodes[5]) == 5
+    assert graph._removed == 0 and len(graph.sources) == graph.edge_count == 35
+    assert len(graph.nodes[1].get_connections("implies")) == 5
+
+def test_generated_ids_skip_ids_taken_in_the_field(monkeypatch):
+    monkeypatch.setattr(ConceptUnit, '_ids', semantic_field.IdAllocator("CONCEPT_"))
+    graph = ConceptGraph()
+    explicit = ConceptUnit("задан вручную", "CONCEPT_1", graph=graph)
+    generated = ConceptUnit("автоматический", graph=graph)
+    assert generated.concept_id == "CONCEPT_2" and graph.get("CONCEPT_1") is explicit
+
+def test_strengths_read_back_exactly():
+    graph = ConceptGraph()
+    love, respect = ConceptUnit("любовь", "C1", graph=graph), ConceptUnit("уважение", "C2", graph=graph)
+    love.add_connection(respect, "implies", 0.9)
+    graph.add_edges([1], [0], [graph.type_code("supports")], [0.1])
+    assert love.get_connections()[0]["strength"] == 0.9
+    assert respect.get_connections()[0]["strength"] == 0.1
+
+def test_connections_property_is_read_only():
+    graph = ConceptGraph()
+    love, respect = ConceptUnit("любовь", "C1", graph=graph), ConceptUnit("уважение", "C2", graph=graph)
+    love.add_connection(respect, "implies")
+    assert love.connections == tuple(love.get_connections())
+    with pytest.raises(AttributeError):
+        love.connections.append({"concept": respect, "type": "supports", "strength": 1.0})
+    with pytest.raises(AttributeError):
+        love.connections = []
+
+def test_clear_empties_the_field_and_detaches_units():
+    from semantic_traversal import ConceptTraversal
+
+    graph = ConceptGraph()
+    love, respect = ConceptUnit("любовь", "C1", graph=graph), ConceptUnit("уважение", "C2", graph=graph)
+    love.add_connection(respect)
+    traversal = ConceptTraversal(graph)
+    assert traversal.neighborhood("C1") == {love: 0, respect: 1}
+    assert graph.words.lookup("любовь") == [love]
+
+    graph.clear()
+    assert len(graph) == 0 and graph.edge_count == 0 and love.graph is None
+    assert graph.words.lookup("любовь") == []
+    again = ConceptUnit("любовь", "C1", graph=graph) # ID снова свободен
+    assert traversal.neighborhood("C1") == {again: 0} # Кеш обхода сброшен
@@ -0,0 +1,106 @@
+# Тесты потоковой загрузки смыслового поля (semantic_loader.load_field)
+
+import json
+import random
+
+import pytest
+
+import semantic_field
+from semantic_field import ConceptGraph, ConceptUnit
+from semantic_loader import load_field
+
+def field_records(concepts=40, edges=600, seed=0):
+    """Понятия и связи вперемешку: часть связей ссылается на понятия раньше их собственных записей."""
+    rng = random.Random(seed)
+    records = [{"concept_id": f"C{i}", "word": f"слово {i}", "description": f"мысль {i}", "value": float(i)}
+               for i in range(concepts)]
+    records += [{"source": f"C{rng.randrange(concepts)}", "target": f"C{rng.randrange(concepts)}",
+                 "type": rng.choice(["implies", "supports", "related_to"]), "strength": round(rng.random(), 3)}
+                for _ in range(edges)]
+    rng.shuffle(records)
+    return records
+
+def built_by_units(records):
+    """То же поле, построенное по записям через ConceptUnit и add_connection."""
+    graph = ConceptGraph()
+
+    def unit(concept_id):
+        return graph.get(concept_id) or ConceptUnit(None, concept_id, graph=graph)
+
+    for record in records:
+        if 'source' in record:
+            unit(record['source']).add_connection(unit(record['target']), record['type'], record['strength'])
+        else:
+            concept = unit(record['concept_id'])
+            concept.word, concept.description, concept.value = record['word'], record['description'], record['value']
+    return graph
+
+def snapshot(graph):
+    """Понятия и их связи в обе стороны в виде, не зависящем от порядка создания единиц."""
+    def links(connections):
+        return [(conn["concept"].concept_id, conn["type"], conn["strength"]) for conn in connections]
+
+    return {unit.concept_id: (unit.word, unit.description, unit.value, links(unit.get_connections()), links(unit.get_incoming()))
+            for unit in graph}
+
+@pytest.mark.parametrize('batch_size', [1, 7, 1_000_000])
+def test_load_matches_field_built_edge_by_edge(batch_size):
+    records = field_records()
+    loaded = load_field(records, batch_size=batch_size)
+    assert snapshot(loaded) == snapshot(built_by_units(records))
+    assert loaded.edge_count == 600
+
+def test_load_jsonl_and_csv_files(tmp_path):
+    records = field_records(concepts=10, edges=50, seed=1)
+    jsonl = tmp_path / "field.jsonl"
+    jsonl.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in records) + "\n\n", encoding='utf-8')
+    columns = ["concept_id", "word", "description", "value", "source", "target", "type", "strength"]
+    csv_file = tmp_path / "field.csv"
+    csv_file.write_text("\n".join([",".join(columns)] + [",".join(str(record.get(column, "")) for column in columns)
+                                                         for record in records]) + "\n", encoding='utf-8')
+
+    expected = snapshot(built_by_units(records))
+    assert snapshot(load_field(str(jsonl))) == expected
+    assert snapshot(load_field(csv_file)) == expected
+
+def test_concepts_referenced_before_their_record_are_filled_in_later():
+    graph = load_field([
+        '{"source": "C1", "target": "C2", "type": "implies", "strength": 0.5}',
+        '{"concept_id": "C2", "word": "уважение", "value": 2}',
+    ])
+    assert graph.get("C1").word is None
+    assert graph.get("C2").word == "уважение" and graph.get("C2").value == 2.0
+    assert graph.words.lookup("уважение") == [graph.get("C2")]
+    assert graph.get("C1").get_connections() == [{"concept": graph.get("C2"), "type": "implies", "strength": 0.5}]
+
+def test_load_into_existing_graph_reuses_units():
+    graph = ConceptGraph()
+    love = ConceptUnit("любовь", "C1", graph=graph)
+    load_field([{"source": "C1", "target": "C9"}, {"concept_id": "C1", "word": "Любовь"}], graph=graph)
+    assert graph.get("C1") is love and love.word == "Любовь"
+    assert [conn["concept"].concept_id for conn in love.get_connections()] == ["C9"]
+
+def test_bad_record_reports_its_number_and_keeps_loaded_batches():
+    graph = ConceptGraph()
+    lines = ['{"concept_id": "C1"}', '{"source": "C1", "target": "C2"}', '{"source": "C1"}']
+    with pytest.raises(ValueError, match="Запись 3"):
+        load_field(lines, graph=graph, batch_size=1)
+    assert graph.edge_count == 1
+
+    with pytest.raises(ValueError, match="Запись 2"):
+        load_field(['{"concept_id": "C3"}', '{not json'])
+    with pytest.raises(ValueError, match="формат"):
+        load_field("field.txt")
+
+def test_generated_ids_skip_ids_taken_by_records_and_field(monkeypatch):
+    monkeypatch.setattr(ConceptUnit, '_ids', semantic_field.IdAllocator("CONCEPT_"))
+    graph = ConceptGraph()
+    ConceptUnit("в поле", "CONCEPT_2", graph=graph)
+    load_field([{"concept_id": "CONCEPT_1", "word": "explicit"}, {"source": "CONCEPT_1", "target": "X"},
+                {"word": "auto"}, {"word": "auto 2"}], graph=graph)
+
+    assert graph.get("CONCEPT_1").word == "explicit"
+    assert [conn["concept"].concept_id for conn in graph.get("CONCEPT_1").get_connections()] == ["X"]
+    assert graph.get("CONCEPT_2").word == "в поле"
+    assert {unit.word for unit in graph} == {"explicit", None, "в поле", "auto", "auto 2"}
+    assert len({unit.concept_id for unit in graph}) == len(graph) == 5
@@ -0,0 +1,109 @@
+# Тесты хранения смысловых полей в SQLite (semantic_store): save_graph, load_graph и LazyConceptGraph
+
+import gc
+import random
+import sqlite3
+
+import pytest
+
+from semantic_field import ConceptGraph, ConceptUnit
+from semantic_store import LazyConceptGraph, load_graph, save_graph
+
+TYPES = ["implies", "supports", "related_to"]
+
+def random_graph(concepts=40, edges=300, seed=0, prefix="C"):
+    rng = random.Random(seed)
+    graph = ConceptGraph()
+    units = [ConceptUnit(f"слово {i}", f"{prefix}{i}", f"мысль {i}", rng.random(), graph=graph) for i in range(concepts)]
+    for _ in range(edges):
+        rng.choice(units).add_connection(rng.choice(units), rng.choice(TYPES), rng.random())
+    return graph, units
+
+def snapshot(units):
+    """Понятия и их связи в обе стороны, по concept_id - одинаково для ConceptGraph и LazyConceptGraph."""
+    def links(connections):
+        return [(conn["concept"].concept_id, conn["type"], conn["strength"]) for conn in connections]
+
+    return {unit.concept_id: (unit.word, unit.description, unit.value, links(unit.get_connections()), links(unit.get_incoming()))
+            for unit in units}
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    yield conn
+    conn.close()
+
+def test_save_and_load_round_trip(conn):
+    graph, units = random_graph()
+    units[0].remove_connection(units[0].get_connections()[0]["concept"]) # Удаленные связи не сохраняются
+    assert save_graph(conn, graph) == {'concepts': 40, 'edges': graph.edge_count}
+    loaded = load_graph(conn)
+    assert snapshot(loaded) == snapshot(units) # В том числе силы связей - без потери точности
+    assert loaded.edge_count == graph.edge_count
+
+def test_resave_replaces_edges_of_saved_concepts_only(conn):
+    graph, units = random_graph(seed=1)
+    save_graph(conn, graph)
+    other, _ = random_graph(concepts=5, edges=0, seed=2, prefix="D")
+    save_graph(conn, other)
+
+    part = ConceptGraph()
+    first, second = ConceptUnit("первое", "C0", graph=part), ConceptUnit("второе", "C1", graph=part)
+    first.add_connection(second, "implies", 0.5)
+    save_graph(conn, part, batch_size=1) # Меньше связей, чем в базе: индексы не перестраиваются
+
+    loaded = load_graph(conn)
+    assert len(loaded) == 45
+    assert snapshot([loaded.get("C0")])["C0"][:4] == ("первое", None, 0.0, [("C1", "implies", 0.5)])
+    assert snapshot([loaded.get(f"C{i}") for i in range(2, 40)]) == {
+        concept_id: (word, description, value, out, [link for link in incoming if link[0] not in ("C0", "C1")])
+        for concept_id, (word, description, value, out, incoming) in snapshot(units[2:]).items()}
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index';")}
+    assert {"idx_concept_edges_source", "idx_concept_edges_target"} <= indexes
+
+def test_save_restores_foreign_key_checks(conn):
+    conn.execute("PRAGMA foreign_keys = ON;")
+    graph, _ = random_graph(concepts=5, edges=10)
+    save_graph(conn, graph)
+    assert conn.execute("PRAGMA foreign_keys;").fetchone() == (1,)
+
+def test_lazy_graph_reads_the_same_field(conn):
+    graph, units = random_graph(seed=3)
+    save_graph(conn, graph)
+    lazy = LazyConceptGraph(conn)
+    assert len(lazy) == 40 and lazy.edge_count == graph.edge_count and "C7" in lazy and "X" not in lazy
+    lazy_units = [lazy.get(unit.concept_id) for unit in units]
+    assert snapshot(lazy_units) == snapshot(units)
+    assert lazy.get("C3") is lazy_units[3] # Пока на единицу есть ссылки, она одна и та же
+    assert lazy.get("нет такого") is None
+
+def test_lazy_graph_cache_is_bounded_and_invalidated(conn):
+    graph, units = random_graph(concepts=30, edges=200, seed=4)
+    save_graph(conn, graph)
+    lazy = LazyConceptGraph(conn, cache_edges=20)
+    lazy_units = [lazy.get(unit.concept_id) for unit in units]
+    for unit in lazy_units:
+        unit.get_connections()
+        assert lazy._cached_edges <= max(20, len(lazy._cache[('out', unit._index)]))
+    lazy_units[-1].get_connections()
+    assert lazy.hits == 1 and lazy.misses == 30
+
+    source, target = lazy_units[0], lazy_units[1]
+    before = len(source.get_connections())
+    source.add_connection(target, "implies", 0.25)
+    assert source.get_connections()[-1] == {"concept": target, "type": "implies", "strength": 0.25}
+    assert {"concept": source, "type": "implies", "strength": 0.25} in target.get_incoming()
+    assert source.remove_connection(target) >= 1
+    assert all(conn["concept"] is not target for conn in source.get_connections())
+    assert len(source.get_connections()) <= before
+
+def test_lazy_graph_writes_new_concepts(conn):
+    lazy = LazyConceptGraph(conn)
+    unit = ConceptUnit("новое", "N1", graph=lazy)
+    generated = ConceptUnit("без ID", graph=lazy)
+    assert unit.graph is lazy and generated.concept_id in lazy
+    with pytest.raises(ValueError):
+        ConceptUnit("повтор", "N1", graph=lazy)
+    del unit
+    gc.collect()
+    assert load_graph(conn).get("N1").word == "новое"
@@ -0,0 +1,142 @@
+# Тесты запросов обхода смыслового поля (semantic_traversal) против простых эталонных обходов
+
+import heapq
+import math
+import random
+from collections import deque
+
+import pytest
+
+from semantic_field import ConceptGraph, ConceptUnit
+from semantic_traversal import ConceptTraversal
+
+TYPES = ["implies", "supports", "related_to"]
+
+def random_graph(concepts=80, edges=240, seed=0):
+    rng = random.Random(seed)
+    graph = ConceptGraph()
+    units = [ConceptUnit(f"слово {i}", f"C{i}", graph=graph) for i in range(concepts)]
+    for _ in range(edges):
+        rng.choice(units).add_connection(rng.choice(units), rng.choice(TYPES), round(rng.uniform(0.05, 1.0), 3))
+    return graph, units
+
+def steps(graph, unit, relationship_types, direction):
+    """Пары (сосед, сила) по словарям get_connections/get_incoming - независимо от ConceptTraversal."""
+    found = []
+    if direction != 'in':
+        found += [(conn["concept"], conn["strength"]) for conn in unit.get_connections() if conn["type"] in relationship_types]
+    if direction != 'out':
+        found += [(conn["concept"], conn["strength"]) for conn in unit.get_incoming() if conn["type"] in relationship_types]
+    return found
+
+def reference_distances(graph, start, relationship_types=TYPES, direction='out'):
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        unit = queue.popleft()
+        for neighbor, _ in steps(graph, unit, relationship_types, direction):
+            if neighbor not in distances:
+                distances[neighbor] = distances[unit] + 1
+                queue.append(neighbor)
+    return distances
+
+def reference_strengths(graph, start, direction='out'):
+    """Наибольшее произведение сил связей от start до каждого понятия (Дейкстра от одного источника)."""
+    best = {start: 0.0}
+    heap = [(0.0, 0, start)]
+    counter = 1
+    while heap:
+        cost, _, unit = heapq.heappop(heap)
+        if cost > best[unit]:
+            continue
+        for neighbor, strength in steps(graph, unit, TYPES, direction):
+            candidate = cost - math.log(min(strength, 1.0))
+            if candidate < best.get(neighbor, math.inf):
+                best[neighbor] = candidate
+                heapq.heappush(heap, (candidate, counter, neighbor))
+                counter += 1
+    return {unit: math.exp(-cost) for unit, cost in best.items()}
+
+def path_product(graph, path, direction='out'):
+    product = 1.0
+    for unit, following in zip(path, path[1:]):
+        product *= max(strength for neighbor, strength in steps(graph, unit, TYPES, direction) if neighbor is following)
+    return product
+
+@pytest.mark.parametrize('direction', ['out', 'in', 'both'])
+def test_neighborhood_matches_breadth_first_search(direction):
+    graph, units = random_graph(seed=1)
+    traversal = ConceptTraversal(graph)
+    for start in units[:20]:
+        expected = {unit: distance for unit, distance in reference_distances(graph, start, direction=direction).items()
+                    if distance <= 2}
+        assert traversal.neighborhood(start, hops=2, direction=direction) == expected
+
+def test_neighborhood_type_filter_and_budget():
+    graph, units = random_graph(seed=2)
+    traversal = ConceptTraversal(graph)
+    expected = {unit: distance for unit, distance in reference_distances(graph, units[0], ["supports"]).items()
+                if distance <= 3}
+    assert traversal.neighborhood("C0", hops=3, relationship_types="supports") == expected
+
+    limited = traversal.neighborhood(units[0], hops=5, node_budget=5)
+    distances = list(limited.values())
+    assert len(limited) <= 5 and distances == sorted(distances) # Ближние понятия раньше дальних
+
+@pytest.mark.parametrize('direction', ['out', 'both'])
+def test_shortest_path_length_matches_breadth_first_search(direction):
+    graph, units = random_graph(seed=3)
+    traversal = ConceptTraversal(graph)
+    for start in units[:10]:
+        distances = reference_distances(graph, start, direction=direction)
+        for goal in units[::7]:
+            found = traversal.shortest_path(start, goal, direction=direction)
+            if goal not in distances:
+                assert found is None
+                continue
+            path, length = found
+            assert length == distances[goal] == len(path) - 1
+            assert path[0] is start and path[-1] is goal
+            for unit, following in zip(path, path[1:]):
+                assert any(neighbor is following for neighbor, _ in steps(graph, unit, TYPES, direction))
+
+def test_strongest_path_matches_dijkstra():
+    graph, units = random_graph(seed=4)
+    traversal = ConceptTraversal(graph)
+    for start in units[:10]:
+        best = reference_strengths(graph, start)
+        for goal in units[::5]:
+            found = traversal.strongest_path(start, goal)
+            if goal not in best:
+                assert found is None
+                continue
+            path, product = found
+            assert product == pytest.approx(best[goal])
+            assert path[0] is start and path[-1] is goal
+            assert path_product(graph, path) == pytest.approx(product)
+
+def test_cache_is_reset_when_field_changes():
+    graph = ConceptGraph()
+    a, b, c = (ConceptUnit(word, word, graph=graph) for word in "abc")
+    a.add_connection(b, "implies")
+    b.add_connection(c, "implies")
+    traversal = ConceptTraversal(graph)
+
+    assert traversal.shortest_path(a, c) == ([a, b, c], 2)
+    assert traversal.shortest_path(a, c) == ([a, b, c], 2)
+    assert traversal.hits == 1
+    a.add_connection(c, "supports")
+    assert traversal.shortest_path(a, c) == ([a, c], 1)
+    a.remove_connection(c)
+    assert traversal.shortest_path(a, c) == ([a, b, c], 2)
+    assert traversal.shortest_path(a, c, relationship_types="supports") is None
+
+def test_unknown_concepts_and_directions_are_rejected():
+    graph, units = random_graph(concepts=3, edges=0)
+    traversal = ConceptTraversal(graph)
+    with pytest.raises(KeyError):
+        traversal.neighborhood("нет такого")
+    with pytest.raises(ValueError):
+        traversal.neighborhood(units[0], direction="sideways")
+    with pytest.raises(ValueError):
+        traversal.neighborhood(ConceptUnit("чужое", "X", graph=ConceptGraph()))
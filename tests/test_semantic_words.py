@@ -0,0 +1,85 @@
+# Тесты индекса слов смыслового поля (semantic_words.WordIndex через ConceptGraph.words)
+
+import random
+
+import pytest
+
+import semantic_field
+import semantic_words
+from semantic_field import ConceptGraph, ConceptUnit
+from semantic_words import normalize_word
+
+ALPHABET = "абвгдежзиклмнопрст"
+
+def random_words(count, seed):
+    rng = random.Random(seed)
+    return [" ".join("".join(rng.choice(ALPHABET) for _ in range(rng.randint(3, 8))) for _ in range(rng.randint(1, 2)))
+            for _ in range(count)]
+
+def field(words):
+    graph = ConceptGraph()
+    units = graph.add_concepts((f"C{i}", word, None, 0.0) for i, word in enumerate(words))
+    return graph, units
+
+def trigram_similarity(a, b):
+    a, b = semantic_words._trigrams(normalize_word(a)), semantic_words._trigrams(normalize_word(b))
+    return len(a & b) / len(a | b)
+
+def test_lookup_normalizes_words():
+    graph = ConceptGraph()
+    relations = ConceptUnit("Здоровые_Отношения", "C1", graph=graph)
+    assert graph.words.lookup("здоровые отношения") == [relations]
+    assert graph.words.lookup("ЗДОРОВЫЕ-отношения") == [relations]
+    assert "здоровые  отношения" in graph.words and "отношения" not in graph.words
+    assert graph.words.lookup("") == []
+
+def test_prefix_matches_sorted_scan(monkeypatch):
+    monkeypatch.setattr(semantic_words, 'RECENT_WORDS_LIMIT', 16) # Слияние новых слов с основным массивом
+    words = random_words(300, seed=1)
+    graph, units = field(words[:200])
+    graph.words.prefix("а") # Первые слова вливаются в отсортированный массив
+    graph.add_concepts((f"D{i}", word, None, 0.0) for i, word in enumerate(words[200:]))
+
+    for prefix in ["а", "б", "ви", "к", "ст", "я"]:
+        found = graph.words.prefix(prefix, limit=1000)
+        expected = sorted((normalize_word(unit.word), unit.concept_id) for unit in graph if normalize_word(unit.word).startswith(prefix))
+        assert sorted((normalize_word(unit.word), unit.concept_id) for unit in found) == expected
+        keys = [normalize_word(unit.word) for unit in found]
+        assert keys == sorted(keys)
+        assert graph.words.prefix(prefix, limit=3) == found[:3]
+
+def test_index_follows_word_changes():
+    graph, (love, respect) = field(["любовь", "уважение"])
+    assert graph.words.lookup("любовь") == [love]
+    love.word = "Нежность"
+    assert graph.words.lookup("любовь") == []
+    assert graph.words.lookup("нежность") == [love]
+    assert graph.words.prefix("люб") == []
+    assert love not in [unit for unit, _ in graph.words.fuzzy("любовь")]
+    ConceptUnit("любовь", "C3", graph=graph)
+    assert [unit.concept_id for unit in graph.words.lookup("любовь")] == ["C3"]
+
+def test_fuzzy_matches_full_scan_on_small_index():
+    words = random_words(50, seed=2) # Меньше FUZZY_CANDIDATES слов - проверяются все кандидаты
+    graph, units = field(words)
+    for query in random_words(30, seed=3) + words[:10]:
+        found = graph.words.fuzzy(query, k=5)
+        expected = sorted((trigram_similarity(query, word) for word in words), reverse=True)
+        expected = [score for score in expected if score >= semantic_words.FUZZY_THRESHOLD][:5]
+        assert [score for _, score in found] == pytest.approx(expected)
+        for unit, score in found:
+            assert score == pytest.approx(trigram_similarity(query, unit.word))
+
+def test_fuzzy_finds_exact_word_first():
+    graph, units = field(random_words(2000, seed=4))
+    for unit in units[::100]:
+        best, score = graph.words.fuzzy(unit.word, k=3)[0]
+        assert score == 1.0 and normalize_word(best.word) == normalize_word(unit.word)
+
+def test_fuzzy_without_numpy_gives_same_results(monkeypatch):
+    pytest.importorskip('numpy')
+    graph, units = field(random_words(3000, seed=5))
+    queries = random_words(50, seed=6)
+    with_numpy = [graph.words.fuzzy(query, k=5) for query in queries]
+    monkeypatch.setattr(semantic_field, '_numpy', lambda: None)
+    assert [graph.words.fuzzy(query, k=5) for query in queries] == with_numpy
@@ -0,0 +1,97 @@
+# Тесты записи только изменений: sync_contacts (Hypoo_data_store) и конвейер Hypoo_sync.sync
+
+import sqlite3
+import threading
+
+import pytest
+
+import Hypoo_data_store as store
+import Hypoo_get_conract as fetch
+import Hypoo_sync
+from fake_people import FakePeopleService, fake_person
+
+def contact(i, **changes):
+    return dict(fetch.parse_person(fake_person(i), keep_raw=False), **changes)
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    store.create_tables(conn)
+    yield conn
+    conn.close()
+
+def user_ids(conn):
+    return sorted(row[0] for row in conn.execute("SELECT user_id FROM contacts;"))
+
+def test_sync_counts_inserted_updated_unchanged_and_deleted(conn):
+    assert store.sync_contacts(conn, [contact(i) for i in range(5)]) == \
+        {'inserted': 5, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    assert store.sync_contacts(conn, [contact(i) for i in range(5)]) == \
+        {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 5}
+
+    changes = [contact(0, name='Новое имя'), contact(1, emails=['new@example.com']),
+               {'user_id': contact(2)['user_id'], 'deleted': True}, contact(5)]
+    assert store.sync_contacts(conn, changes) == {'inserted': 1, 'updated': 2, 'deleted': 1, 'unchanged': 0}
+    assert user_ids(conn) == sorted(contact(i)['user_id'] for i in (0, 1, 3, 4, 5))
+    assert store.find_by_email(conn, 'new@example.com')[0]['name'] == contact(1)['name']
+    assert store.find_by_email(conn, 'user1@example.com') == []
+
+def test_partial_list_does_not_delete_missing_contacts_by_default(conn):
+    store.sync_contacts(conn, [contact(i) for i in range(5)])
+    assert store.sync_contacts(conn, [contact(0)])['deleted'] == 0
+    assert len(user_ids(conn)) == 5
+
+def test_full_sync_deletes_missing_contacts_except_treasure_vault(conn):
+    store.sync_contacts(conn, [contact(i) for i in range(5)])
+    store.add_to_treasure_vault(conn, contact(4)['user_id'], contact(4)['name'], 'друг')
+    summary = store.sync_contacts(conn, [contact(0), contact(1)], delete_missing=True)
+    assert summary == {'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 2}
+    assert user_ids(conn) == sorted(contact(i)['user_id'] for i in (0, 1, 4))
+
+class FailingPeopleService(FakePeopleService):
+    """Отдает первую страницу, а на следующей падает, как при обрыве сети."""
+
+    def page(self, kwargs):
+        if kwargs.get('pageToken'):
+            raise ConnectionError("сеть недоступна")
+        return super().page(kwargs)
+
+class InterruptedPeopleService(FakePeopleService):
+    """Отдает первую страницу, а на следующей прерывается, как по Ctrl-C."""
+
+    def page(self, kwargs):
+        if kwargs.get('pageToken'):
+            raise KeyboardInterrupt
+        return super().page(kwargs)
+
+def test_sync_pipeline_saves_sync_token_only_after_writing(tmp_path):
+    token_file = str(tmp_path / 'sync_token.json')
+    with store.HypooStore(str(tmp_path / 'hypoo.db'), readers=1) as hypoo:
+        result = Hypoo_sync.sync(hypoo, FakePeopleService(1200), sync_token_file=token_file, batch_size=100)
+        assert result['summary']['inserted'] == 1200 and result['full_sync']
+        token = fetch.load_sync_token(token_file)
+        assert token is not None
+        assert hypoo.get_raw_person(contact(7)['user_id'])['resourceName'] == 'people/c7'
+
+        service = FakePeopleService(1200, changed_ids=[3], deleted_ids=[4])
+        result = Hypoo_sync.sync(hypoo, service, sync_token_file=token_file, batch_size=100)
+        assert not result['full_sync']
+        assert result['summary'] == {'inserted': 0, 'updated': 0, 'deleted': 1, 'unchanged': 1}
+
+        fetch.save_sync_token(None, token_file) # Следующая синхронизация - полная
+        assert Hypoo_sync.sync(hypoo, FailingPeopleService(2500), sync_token_file=token_file, batch_size=100) is None
+        assert fetch.load_sync_token(token_file) is None
+        assert hypoo.status()['contacts'] == 1199 # Прерванная полная синхронизация ничего не удаляет
+
+def test_interrupted_sync_stops_writer_and_reraises(tmp_path):
+    token_file = str(tmp_path / 'sync_token.json')
+    with store.HypooStore(str(tmp_path / 'hypoo.db'), readers=1) as hypoo:
+        Hypoo_sync.sync(hypoo, FakePeopleService(2500), sync_token_file=token_file, batch_size=100)
+        fetch.save_sync_token(None, token_file) # Следующая синхронизация - полная
+
+        with pytest.raises(KeyboardInterrupt):
+            Hypoo_sync.sync(hypoo, InterruptedPeopleService(2500), sync_token_file=token_file,
+                            batch_size=100, queue_size=1)
+        assert fetch.load_sync_token(token_file) is None
+        assert hypoo.status()['contacts'] == 2500 # Контакты с непрочитанных страниц не удалены
+        assert not any(thread.name == 'hypoo-sync-writer' for thread in threading.enumerate())